@@ -0,0 +1,343 @@
+"""
+Streaming archive export of obfuscated scripts, with no dependency on Qt so it can be
+used and tested without the GUI in cookie.py.
+"""
+import os
+import io
+import time
+import json
+import queue
+import threading
+import tarfile
+import zipfile
+import zlib
+try:
+    import zstandard  # Optional, only needed for .tar.zst output
+except ImportError:
+    zstandard = None
+
+# Archive formats the job queue can export to, by file name suffix
+ARCHIVE_FORMATS = {".tar.gz": "tar.gz", ".tgz": "tar.gz", ".tar.zst": "tar.zst", ".tzst": "tar.zst",
+                   ".tar": "tar", ".zip": "zip"}
+
+# Chunk size when streaming files into and out of archives
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# Decompressed bytes kept from the start of each member when rebuilding a missing index;
+# enough for the tar header, including a PAX header for a long name
+ARCHIVE_SCAN_HEADER_SIZE = 64 * 1024
+
+def get_archive_format(path):
+    """Return the archive format for a file name, e.g. "tar.gz"."""
+    for suffix, archive_format in ARCHIVE_FORMATS.items():
+        if str(path).lower().endswith(suffix):
+            return archive_format
+    raise ValueError(f"Unsupported archive type: {path} (use {', '.join(ARCHIVE_FORMATS)})")
+
+def get_archive_index_path(path):
+    """Return where the member index of a tar archive is written."""
+    return f"{path}.index.json"
+
+def load_archive_index(path):
+    """
+    Return the members recorded in the index next to a tar archive, or None if the index
+    is missing or was written for a different file (e.g. the archive was copied on its own).
+    """
+    try:
+        with open(get_archive_index_path(path), encoding="utf-8") as f:
+            index = json.load(f)
+        if index["archive_size"] == os.path.getsize(path):
+            return index["members"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def scan_tar_members(path, archive_format):
+    """
+    Rebuild the member index of a tar archive written by ArchiveSink by reading it once
+    from start to end. Each member sits in a frame of its own, so only frame boundaries
+    and tar headers are needed; member data is decompressed but never kept.
+    """
+    members = {}
+    if archive_format == "tar":
+        with tarfile.open(path, "r:") as tar:
+            for info in tar:
+                length = info.offset_data - info.offset + info.size + (-info.size % tarfile.BLOCKSIZE)
+                members[info.name] = {"offset": info.offset, "length": length,
+                                      "header_size": info.offset_data - info.offset, "size": info.size}
+        return members
+
+    with open(path, "rb") as f:
+        offset = 0
+        pending = b""
+        while True:
+            # Decompress one frame, keeping only the start, where the tar header is
+            decompressor = open_frame_decompressor(archive_format)
+            start = b""
+            frame_length = 0
+            while not decompressor.eof:
+                raw = pending or f.read(ARCHIVE_CHUNK_SIZE)
+                pending = b""
+                if not raw:
+                    if frame_length:
+                        raise ValueError(f"Archive is truncated at offset {offset}")
+                    return members
+                frame_length += len(raw)
+                data = decompressor.decompress(raw)
+                if len(start) < ARCHIVE_SCAN_HEADER_SIZE:
+                    start += data[:ARCHIVE_SCAN_HEADER_SIZE - len(start)]
+            pending = decompressor.unused_data
+            frame_length -= len(pending)
+
+            with tarfile.open(fileobj=io.BytesIO(start), mode="r:") as tar:
+                info = tar.firstmember
+            if info is None:
+                return members  # The end-of-archive frame
+            members[info.name] = {"offset": offset, "length": frame_length,
+                                  "header_size": info.offset_data, "size": info.size}
+            offset += frame_length
+
+def open_frame_compressor(archive_format):
+    """Return a compressor that writes one self-contained gzip member or zstd frame."""
+    if archive_format == "tar.gz":
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 31)  # 31: gzip wrapper
+    if archive_format == "tar.zst":
+        if zstandard is None:
+            raise RuntimeError(".tar.zst archives need the zstandard package")
+        return zstandard.ZstdCompressor().compressobj()
+    return None
+
+def open_frame_decompressor(archive_format):
+    if archive_format == "tar.gz":
+        return zlib.decompressobj(31)
+    if archive_format == "tar.zst":
+        if zstandard is None:
+            raise RuntimeError(".tar.zst archives need the zstandard package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+class ArchiveSink:
+    """
+    Streams obfuscated scripts into one archive instead of one file per script.
+    Each tar member is compressed as its own gzip member or zstd frame, so the file is
+    still a normal .tar.gz/.tar.zst, and the index written next to it lets ArchiveReader
+    decompress one member without touching the rest; without the index, ArchiveReader
+    rebuilds it with one pass over the archive. Zip archives use their own central
+    directory as the index.
+    """
+    def __init__(self, path, archive_format=None):
+        self.path = str(path)
+        self.archive_format = archive_format or get_archive_format(path)
+        self.members = {}  # name -> {"offset", "length", "header_size", "size"} (tar) or {"size"} (zip)
+        self.zip_file = None
+        self.file = None
+        open_frame_compressor(self.archive_format)  # Fail early if zstandard is missing
+        if self.archive_format == "zip":
+            self.zip_file = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self.file = open(self.path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, name, text, mtime=None):
+        """Add a script held in memory."""
+        data = text.encode("utf-8")
+        self.add_stream(name, len(data), [data], mtime)
+
+    def add_file(self, name, file_path):
+        """Add a file from disk without reading it into memory."""
+        with open(file_path, "rb") as f:
+            self.add_stream(name, os.path.getsize(file_path), iter(lambda: f.read(ARCHIVE_CHUNK_SIZE), b""),
+                            os.path.getmtime(file_path))
+
+    def add_stream(self, name, size, chunks, mtime=None):
+        """Add a member of known size from an iterable of byte chunks."""
+        if name in self.members:
+            raise ValueError(f"Duplicate archive member: {name}")
+        mtime = time.time() if mtime is None else mtime
+
+        if self.zip_file is not None:
+            info = zipfile.ZipInfo(name, time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with self.zip_file.open(info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+            self.members[name] = {"size": size}
+            return
+
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+        compressor = open_frame_compressor(self.archive_format)
+        offset = self.file.tell()
+        self.write_frame_data(compressor, header)
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            self.write_frame_data(compressor, chunk)
+        if written != size:
+            raise ValueError(f"Archive member {name} is {written} bytes, expected {size}")
+        # Tar data is padded to whole blocks
+        self.write_frame_data(compressor, tarfile.NUL * (-size % tarfile.BLOCKSIZE))
+        if compressor is not None:
+            self.file.write(compressor.flush())
+        self.members[name] = {"offset": offset, "length": self.file.tell() - offset,
+                              "header_size": len(header), "size": size}
+
+    def write_frame_data(self, compressor, data):
+        self.file.write(compressor.compress(data) if compressor is not None else data)
+
+    def close(self):
+        """Finish the archive and write its index."""
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+        elif self.file is not None:
+            # End-of-archive marker, in a frame of its own
+            compressor = open_frame_compressor(self.archive_format)
+            self.write_frame_data(compressor, tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+            if compressor is not None:
+                self.file.write(compressor.flush())
+            self.file.close()
+            self.file = None
+            with open(get_archive_index_path(self.path), "w", encoding="utf-8") as f:
+                f.write(json.dumps({"format": self.archive_format, "archive_size": os.path.getsize(self.path),
+                                    "members": self.members}))
+
+class ArchiveReader:
+    """Reads single members of an archive written by ArchiveSink, by name."""
+    def __init__(self, path):
+        self.path = str(path)
+        self.archive_format = get_archive_format(path)
+        self.zip_file = None
+        self.file = None
+        if self.archive_format == "zip":
+            self.zip_file = zipfile.ZipFile(self.path, "r")
+            self.members = {info.filename: {"size": info.file_size} for info in self.zip_file.infolist()}
+        else:
+            self.members = load_archive_index(self.path)
+            if self.members is None:
+                print(f"No index for {self.path}, scanning the archive")
+                self.members = scan_tar_members(self.path, self.archive_format)
+            self.file = open(self.path, "rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def names(self):
+        return list(self.members)
+
+    def iter_member(self, name):
+        """Yield the data of one member in chunks, decompressing only its own frame."""
+        if name not in self.members:
+            raise KeyError(f"No archive member named {name}")
+        if self.zip_file is not None:
+            with self.zip_file.open(name) as member:
+                yield from iter(lambda: member.read(ARCHIVE_CHUNK_SIZE), b"")
+            return
+
+        entry = self.members[name]
+        decompressor = open_frame_decompressor(self.archive_format)
+        self.file.seek(entry["offset"])
+        frame_left = entry["length"]
+        skip = entry["header_size"]
+        remaining = entry["size"]
+        while frame_left > 0 and remaining > 0:
+            raw = self.file.read(min(ARCHIVE_CHUNK_SIZE, frame_left))
+            if not raw:
+                raise ValueError(f"Archive is truncated in member {name}")
+            frame_left -= len(raw)
+            data = decompressor.decompress(raw) if decompressor is not None else raw
+            if skip:
+                skipped = min(skip, len(data))
+                data = data[skipped:]
+                skip -= skipped
+            data = data[:remaining]
+            remaining -= len(data)
+            if data:
+                yield data
+        if remaining:
+            raise ValueError(f"Archive is truncated in member {name}")
+
+    def read(self, name):
+        """Return one member as text."""
+        return b"".join(self.iter_member(name)).decode("utf-8")
+
+    def extract(self, name, output_path):
+        """Write one member to output_path."""
+        with open(output_path, "wb") as f:
+            for chunk in self.iter_member(name):
+                f.write(chunk)
+
+    def close(self):
+        if self.zip_file is not None:
+            self.zip_file.close()
+        if self.file is not None:
+            self.file.close()
+
+class ArchiveExport:
+    """
+    Writes job outputs into an ArchiveSink on a thread of its own, in the order they are
+    handed over. Job workers add their output as soon as the job finishes, so a bulk run
+    neither keeps every output in memory nor writes the archive from the GUI thread.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self.sink = ArchiveSink(path)
+        self.items = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.count = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.write_items, daemon=True)
+        self.thread.start()
+
+    def add(self, name, text=None, file_path=None):
+        """Queue one member; returns False if the export is closed or has failed, so the caller keeps its output."""
+        with self.lock:
+            if self.closed or self.error is not None:
+                return False
+            self.items.put((name, text, file_path))
+            return True
+
+    def close(self):
+        """Stop taking members; those already queued are still written before the archive is finished."""
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.items.put(None)
+
+    def wait(self, timeout=None):
+        """Wait for the archive to be finished; returns False on timeout."""
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def write_items(self):
+        try:
+            while True:
+                item = self.items.get()
+                if item is None:
+                    break
+                name, text, file_path = item
+                if file_path:
+                    self.sink.add_file(name, file_path)
+                else:
+                    self.sink.add(name, text)
+                self.count += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                self.sink.close()
+            except Exception as e:
+                self.error = self.error or e
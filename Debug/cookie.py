@@ -1,40 +1,95 @@
-import random
-import string
 import sys
 import os
 import time
-import re
 import html
+import threading
+import queue
+import pathlib
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTextEdit, QHBoxLayout, QProgressBar, QDialog, QMessageBox
+    QPushButton, QTextEdit, QHBoxLayout, QProgressBar, QDialog, QMessageBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, QFileDialog, QAbstractItemView,
+    QCheckBox
 )
 from PyQt6.QtGui import QFont, QFontDatabase, QIcon, QPixmap, QColor
-from PyQt6.QtCore import Qt, QPropertyAnimation, QPoint, QTimer, QSize
+from PyQt6.QtCore import Qt, QPropertyAnimation, QPoint, QTimer, QSize, QThreadPool, QRunnable, QResource, QFile
+from obfuscator import (
+    MAPPED_INPUT_THRESHOLD, MAX_PACKED_LINE_LENGTH, PackingStats, build_obfuscated_script, build_verified_script,
+    obfuscate_file, obfuscate_mapped_file, split_code_lines, verify_obfuscated_output
+)
+from archive import ArchiveExport
+
+def get_resource_dir():
+    """Return the folder assets are loaded from: the unpacked bundle when frozen with PyInstaller, else this script's."""
+    return pathlib.Path(getattr(sys, "_MEIPASS", pathlib.Path(__file__).resolve().parent))
+
+RESOURCE_DIR = get_resource_dir()
+
+# Obfuscated scripts and output.log go to the Output folder next to this script, or next to
+# the executable when frozen (the unpacked bundle is removed when the program exits)
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(sys.executable if getattr(sys, "frozen", False)
+                                                          else __file__)), "Output")
 
-# Add a function to check and validate icon paths
-def validate_icon_path(icon_path):
+# Optional compiled Qt resource bundle holding every asset, so startup is one read
+# instead of a file probe per asset. Build it as described in the README:
+#   pyside6-rcc --binary resources.qrc -o resources.rcc   (or Qt's rcc --binary)
+RESOURCE_BUNDLE = RESOURCE_DIR / "resources.rcc"
+RESOURCE_PREFIX = ":/cookiebatch"
+
+# Shared cache of resolved paths, font families and icons, keyed by (kind, relative path)
+resource_cache = {}
+
+def resolve_resource(relative_path):
     """
-    Check if the icon file exists and is readable.
-    If not, return None to prevent errors.
+    Return the path Qt should load an asset from: the compiled bundle when it has the
+    asset, otherwise the file next to the package. Returns None if it is missing.
     """
-    if os.path.exists(icon_path) and os.path.isfile(icon_path):
-        return icon_path
-    print(f"Icon not found or not accessible: {icon_path}")
-    return None
+    key = ("path", relative_path)
+    if key not in resource_cache:
+        bundled_path = f"{RESOURCE_PREFIX}/{relative_path}"
+        file_path = RESOURCE_DIR / relative_path
+        if resource_bundle_loaded and QFile.exists(bundled_path):
+            resource_cache[key] = bundled_path
+        elif file_path.is_file():
+            resource_cache[key] = str(file_path)
+        else:
+            print(f"Resource not found or not accessible: {file_path}")
+            resource_cache[key] = None
+    return resource_cache[key]
+
+def load_font_family(relative_path, fallback="Arial"):
+    """Register a bundled font once and return its family, or fallback if it cannot be loaded."""
+    key = ("font", relative_path)
+    if key not in resource_cache:
+        family = fallback
+        font_path = resolve_resource(relative_path)
+        if font_path:
+            font_id = QFontDatabase.addApplicationFont(font_path)
+            if font_id != -1:
+                family = QFontDatabase.applicationFontFamilies(font_id)[0]
+        resource_cache[key] = family
+    return resource_cache[key]
+
+def load_icon(relative_path):
+    """Return the shared QIcon for a bundled icon, or None if it is missing."""
+    key = ("icon", relative_path)
+    if key not in resource_cache:
+        icon_path = resolve_resource(relative_path)
+        resource_cache[key] = QIcon(icon_path) if icon_path else None
+    return resource_cache[key]
 
 # Create a global variable to hold a reference to the main window
 main_application_window = None
 
 app = QApplication(sys.argv)
 
+# Use the compiled resource bundle when it has been built
+resource_bundle_loaded = RESOURCE_BUNDLE.is_file() and QResource.registerResource(str(RESOURCE_BUNDLE))
+
 # Load global font with better error handling
 font_family = "Arial"  # Default font as fallback
 try:
-    font_path = "Fonts\\JetBrainsMono-Bold.ttf"
-    font_id = QFontDatabase.addApplicationFont(font_path)
-    if font_id != -1:
-        font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
+    font_family = load_font_family("Fonts/JetBrainsMono-Bold.ttf")
     font = QFont(font_family, 12)
     app.setFont(font)
     print(f"Main font loaded: {font_family}")
@@ -46,10 +101,7 @@ except Exception as e:
 # Load input/output font with better error handling
 input_output_font_family = "Arial"  # Default font as fallback
 try:
-    input_output_font_path = "Fonts\\JetBrainsMono-Medium.ttf"
-    input_output_font_id = QFontDatabase.addApplicationFont(input_output_font_path)
-    if input_output_font_id != -1:
-        input_output_font_family = QFontDatabase.applicationFontFamilies(input_output_font_id)[0]
+    input_output_font_family = load_font_family("Fonts/JetBrainsMono-Medium.ttf")
     input_output_font = QFont(input_output_font_family, 10)
     print(f"Input/output font loaded: {input_output_font_family}")
 except Exception as e:
@@ -121,9 +173,157 @@ PROGRESS_BAR_STYLE = f"""
     }}
 """
 
-def generateGOT():
-    accepted_characters = string.ascii_letters
-    return ''.join(random.choice(accepted_characters) for _ in range(64))
+TABLE_STYLE = f"""
+    QTableWidget {{
+        border: 1px solid {BORDER_COLOR};
+        border-radius: 3px;
+        background-color: {SECONDARY_BG_COLOR};
+        color: {TEXT_COLOR};
+        gridline-color: {BORDER_COLOR};
+    }}
+    QTableWidget::item:selected {{
+        background-color: {SECONDARY_COLOR};
+    }}
+    QHeaderView::section {{
+        background-color: {BACKGROUND_COLOR};
+        color: {DARKER_TEXT_COLOR};
+        border: 1px solid {BORDER_COLOR};
+        padding: 4px;
+    }}
+"""
+
+COMBO_STYLE = f"""
+    QComboBox {{
+        border: 1px solid {BORDER_COLOR};
+        border-radius: 3px;
+        padding: 8px;
+        background-color: {SECONDARY_BG_COLOR};
+        color: {TEXT_COLOR};
+    }}
+"""
+
+# Job states shown in the job queue panel
+JOB_QUEUED = "Queued"
+JOB_RUNNING = "Running"
+JOB_CANCELLING = "Cancelling"
+JOB_CANCELLED = "Cancelled"
+JOB_DONE = "Done"
+JOB_FAILED = "Failed"
+
+# Thread pool priorities for the job queue, highest runs first
+JOB_PRIORITIES = {"High": 2, "Normal": 1, "Low": 0}
+
+# Queue panel refresh interval (~60 fps) and the most job updates applied per refresh
+JOB_REFRESH_INTERVAL_MS = 16
+JOB_UPDATES_PER_FRAME = 500
+
+def reserve_output_path(file_name):
+    """
+    Create an empty file for file_name in OUTPUT_DIR and return its path.
+    A name that is already taken gets a number, so jobs never overwrite each other's output.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    stem, extension = os.path.splitext(file_name)
+    number = 1
+    while True:
+        path = os.path.join(OUTPUT_DIR, file_name if number == 1 else f"{stem} ({number}){extension}")
+        try:
+            with open(path, "x"):
+                return path
+        except FileExistsError:
+            number += 1
+
+def format_size(size):
+    """Format a byte count for display."""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class ObfuscationJob:
+    """A single command or file waiting in the job queue."""
+    def __init__(self, name, divide_method, priority, code=None, file_path=None, max_line_length=None):
+        self.name = name
+        self.divide_method = divide_method
+        self.max_line_length = max_line_length
+        self.priority = priority
+        self.code = code
+        self.file_path = file_path
+        self.status = JOB_QUEUED
+        self.elapsed = None
+        self.output = None
+        self.output_path = None  # Set instead of output when the script was streamed to disk
+        self.output_size = None
+        self.exported_to = None  # Archive that holds the output once it was exported
+        self.error = None
+        self.row = None
+        self.run_id = 0  # Bumped on retry so updates from an old run are ignored
+        self.cancel_event = threading.Event()
+        self.runnable = None
+
+def get_export_member_name(job):
+    """Return the archive member name for a job's output."""
+    # Row numbers keep names unique when two inputs share a file name
+    if job.file_path:
+        return f"{job.row + 1:05d}-{os.path.basename(job.file_path)}"
+    return f"{job.row + 1:05d}-command.bat"
+
+class ObfuscationJobRunnable(QRunnable):
+    """Runs one job on the thread pool and reports back through the update queue."""
+    def __init__(self, job, job_updates):
+        super().__init__()
+        self.setAutoDelete(False)  # The job keeps a reference so it can be taken back off the pool
+        self.job = job
+        self.run_id = job.run_id
+        self.cancel_event = job.cancel_event
+        self.job_updates = job_updates
+
+    def run(self):
+        job = self.job
+        if self.cancel_event.is_set():
+            self.job_updates.put((job, self.run_id, JOB_CANCELLED, None, None, None, None, None))
+            return
+
+        self.job_updates.put((job, self.run_id, JOB_RUNNING, None, None, None, None, None))
+        start_time = time.perf_counter()
+        output_path = None
+        output_size = None
+        packing_stats = PackingStats()
+        try:
+            if job.file_path and os.path.getsize(job.file_path) > MAPPED_INPUT_THRESHOLD:
+                # Too large to keep in memory; stream it to the Output folder instead
+                output_path = reserve_output_path(os.path.basename(job.file_path) + ".obfuscated.bat")
+                completed = False
+                try:
+                    completed = obfuscate_mapped_file(job.file_path, output_path, job.divide_method,
+                                                      cancel_event=self.cancel_event,
+                                                      max_line_length=job.max_line_length,
+                                                      packing_stats=packing_stats)
+                finally:
+                    if not completed:
+                        os.remove(output_path)  # Drop the placeholder of a cancelled or failed job
+                output = f"Output written to {output_path}" if completed else None
+                output_size = os.path.getsize(output_path) if completed else None
+                output_path = output_path if completed else None
+            elif job.file_path:
+                output = obfuscate_file(job.file_path, job.divide_method, self.cancel_event, job.max_line_length,
+                                        packing_stats)
+            else:
+                output = build_verified_script(job.code, job.divide_method, self.cancel_event, job.max_line_length,
+                                               packing_stats)
+            if output is not None and job.max_line_length:
+                print(f"{job.name}: {packing_stats}")
+            if output is not None and output_size is None:
+                output_size = len(output.encode("utf-8"))
+            status = JOB_CANCELLED if output is None else JOB_DONE
+            error = None
+        except Exception as e:
+            output = output_path = None  # The placeholder file was removed above
+            status = JOB_FAILED
+            error = str(e)
+        self.job_updates.put((job, self.run_id, status, output, output_path, output_size, error,
+                              time.perf_counter() - start_time))
 
 class StartScreen(QWidget):
     def __init__(self):
@@ -131,11 +331,10 @@ class StartScreen(QWidget):
         print("Initializing StartScreen")
         self.setWindowTitle("CookieBatch")
         
-        # Improved icon loading with validation
-        window_icon_path = validate_icon_path("Icons\\favicon.ico")
-        
-        if window_icon_path:
-            self.setWindowIcon(QIcon(window_icon_path))
+        # Icons are loaded once and shared between windows
+        window_icon = load_icon("Icons/favicon.ico")
+        if window_icon is not None:
+            self.setWindowIcon(window_icon)
             print("StartScreen window icon loaded")
         
         self.setupUI()
@@ -191,15 +390,29 @@ class ObfuscatorGUI(QWidget):
         print("Initializing ObfuscatorGUI")
         self.setWindowTitle("CookieBatch")
         
-        # Improved icon loading
-        window_icon_path = validate_icon_path("Icons\\favicon.ico")
-        if window_icon_path:
-            self.setWindowIcon(QIcon(window_icon_path))
+        # Icons are loaded once and shared between windows
+        window_icon = load_icon("Icons/favicon.ico")
+        if window_icon is not None:
+            self.setWindowIcon(window_icon)
             print("ObfuscatorGUI window icon loaded")
         
+        # Job queue state; workers only talk to the GUI through job_updates
+        self.jobs = []
+        self.job_updates = queue.SimpleQueue()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max(1, min(4, os.cpu_count() or 1)))
+        self.export = None  # Open ArchiveExport that finished jobs stream into
+        self.closing_exports = []  # Exports still writing their queued members
+
         self.setupUI()
+        self.setAcceptDrops(True)
         self.animation = None  # Store animation reference
         self.original_positions = {}  # Store original positions of widgets
+
+        # Apply job updates in batches so the window keeps redrawing at ~60 fps
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.process_job_updates)
+        self.job_timer.start(JOB_REFRESH_INTERVAL_MS)
         print("ObfuscatorGUI initialization complete")
 
     def setupUI(self):
@@ -245,6 +458,11 @@ class ObfuscatorGUI(QWidget):
         self.divide_input.setStyleSheet(INPUT_STYLE)
         layout.addWidget(self.divide_input)
 
+        # Pack several SET statements onto each line of the output
+        self.pack_lines_checkbox = QCheckBox("Pack SET statements onto fewer lines")
+        self.pack_lines_checkbox.setStyleSheet(f"color: {TEXT_COLOR};")
+        layout.addWidget(self.pack_lines_checkbox)
+
         # Button to trigger obfuscation
         self.obfuscate_button = QPushButton("Obfuscate")
         self.obfuscate_button.setFont(QFont(font_family, 12))
@@ -264,14 +482,282 @@ class ObfuscatorGUI(QWidget):
         self.output_area.setStyleSheet(TEXT_AREA_STYLE)
         layout.addWidget(self.output_area)
 
-        self.setLayout(layout)
-        self.setFixedSize(400, 500)  # Slightly larger to accommodate the title and spacing
+        # Job queue panel next to the single-command controls
+        job_layout = QVBoxLayout()
+        job_layout.setContentsMargins(0, 20, 20, 20)
+        job_layout.setSpacing(10)
+
+        job_label = QLabel("Job Queue (drop scripts or commands here):")
+        job_label.setStyleSheet(f"color: {TEXT_COLOR};")
+        job_layout.addWidget(job_label)
+
+        queue_buttons = QHBoxLayout()
+        self.priority_input = QComboBox()
+        self.priority_input.addItems(list(JOB_PRIORITIES))
+        self.priority_input.setCurrentText("Normal")
+        self.priority_input.setStyleSheet(COMBO_STYLE)
+        queue_buttons.addWidget(self.priority_input)
+
+        self.queue_command_button = QPushButton("Queue Command")
+        self.queue_command_button.setStyleSheet(BUTTON_STYLE)
+        self.queue_command_button.clicked.connect(self.queue_current_command)
+        queue_buttons.addWidget(self.queue_command_button)
+
+        self.queue_files_button = QPushButton("Queue Files...")
+        self.queue_files_button.setStyleSheet(BUTTON_STYLE)
+        self.queue_files_button.clicked.connect(self.queue_files)
+        queue_buttons.addWidget(self.queue_files_button)
+        job_layout.addLayout(queue_buttons)
+
+        self.job_table = QTableWidget(0, 5)
+        self.job_table.setHorizontalHeaderLabels(["Job", "Priority", "Status", "Time", "Output"])
+        self.job_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.job_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.job_table.setStyleSheet(TABLE_STYLE)
+        self.job_table.itemSelectionChanged.connect(self.show_selected_job_output)
+        job_layout.addWidget(self.job_table)
+
+        job_buttons = QHBoxLayout()
+        self.cancel_job_button = QPushButton("Cancel")
+        self.cancel_job_button.setStyleSheet(BUTTON_STYLE)
+        self.cancel_job_button.clicked.connect(self.cancel_selected_jobs)
+        job_buttons.addWidget(self.cancel_job_button)
+
+        self.retry_job_button = QPushButton("Retry")
+        self.retry_job_button.setStyleSheet(BUTTON_STYLE)
+        self.retry_job_button.clicked.connect(self.retry_selected_jobs)
+        job_buttons.addWidget(self.retry_job_button)
+
+        self.export_jobs_button = QPushButton("Export...")
+        self.export_jobs_button.setStyleSheet(BUTTON_STYLE)
+        self.export_jobs_button.clicked.connect(self.export_jobs)
+        job_buttons.addWidget(self.export_jobs_button)
+        job_layout.addLayout(job_buttons)
+
+        main_layout = QHBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.addLayout(layout)
+        main_layout.addLayout(job_layout, 1)
+
+        self.setLayout(main_layout)
+        self.setMinimumSize(900, 500)  # Room for the job queue next to the original 400x500 controls
         print("ObfuscatorGUI UI setup complete")
 
     def closeEvent(self, event):
         print("ObfuscatorGUI window closing")
+        # Stop queued and running jobs before the window goes away
+        self.thread_pool.clear()
+        for job in self.jobs:
+            job.cancel_event.set()
+        # Let exports finish their archives so they are not left truncated
+        if self.export is not None:
+            self.export.close()
+            self.closing_exports.append(self.export)
+            self.export = None
+        for export in self.closing_exports:
+            export.wait()
         event.accept()  # allow the window to be closed
 
+    def read_divide_method(self):
+        """Return the divide method from the input, or None after flagging the field."""
+        try:
+            divide_method = int(self.divide_input.text().strip())
+        except ValueError:
+            divide_method = 0
+        self.set_input_error(self.divide_input, divide_method <= 0)
+        return divide_method if divide_method > 0 else None
+
+    def read_max_line_length(self):
+        """Return the line length limit for packed SET lines, or None for one per line."""
+        return MAX_PACKED_LINE_LENGTH if self.pack_lines_checkbox.isChecked() else None
+
+    def queue_current_command(self):
+        """Add the command in the input field to the job queue."""
+        unobfuscated_code = self.code_input.text()
+        divide_method = self.read_divide_method()
+        self.set_input_error(self.code_input, len(unobfuscated_code) == 0)
+        if not unobfuscated_code or divide_method is None:
+            return
+        self.add_job(ObfuscationJob(unobfuscated_code[:60], divide_method, self.priority_input.currentText(),
+                                    code=unobfuscated_code, max_line_length=self.read_max_line_length()))
+
+    def queue_files(self):
+        """Ask for batch files and add each one to the job queue."""
+        divide_method = self.read_divide_method()
+        if divide_method is None:
+            return
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Batch Files", "", "Batch Files (*.bat *.cmd);;All Files (*)")
+        self.queue_file_paths(file_paths, divide_method)
+
+    def queue_file_paths(self, file_paths, divide_method):
+        priority = self.priority_input.currentText()
+        max_line_length = self.read_max_line_length()
+        self.job_table.setUpdatesEnabled(False)
+        for file_path in file_paths:
+            self.add_job(ObfuscationJob(os.path.basename(file_path), divide_method, priority,
+                                        file_path=file_path, max_line_length=max_line_length))
+        self.job_table.setUpdatesEnabled(True)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls() or event.mimeData().hasText():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        """Queue dropped files, or every line of dropped text as its own command."""
+        divide_method = self.read_divide_method()
+        if divide_method is None:
+            return
+        mime_data = event.mimeData()
+        if mime_data.hasUrls():
+            self.queue_file_paths([url.toLocalFile() for url in mime_data.urls() if url.isLocalFile()], divide_method)
+        else:
+            priority = self.priority_input.currentText()
+            max_line_length = self.read_max_line_length()
+            for command in split_code_lines(mime_data.text()):
+                self.add_job(ObfuscationJob(command[:60], divide_method, priority, code=command,
+                                            max_line_length=max_line_length))
+        event.acceptProposedAction()
+
+    def add_job(self, job):
+        job.row = self.job_table.rowCount()
+        self.job_table.insertRow(job.row)
+        for column in range(5):
+            self.job_table.setItem(job.row, column, QTableWidgetItem())
+        self.jobs.append(job)
+        self.update_job_row(job)
+        self.submit_job(job)
+
+    def submit_job(self, job):
+        job.runnable = ObfuscationJobRunnable(job, self.job_updates)
+        self.thread_pool.start(job.runnable, JOB_PRIORITIES[job.priority])
+
+    def selected_jobs(self):
+        rows = sorted({index.row() for index in self.job_table.selectedIndexes()})
+        return [self.jobs[row] for row in rows]
+
+    def cancel_selected_jobs(self):
+        for job in self.selected_jobs():
+            if job.status == JOB_QUEUED and self.thread_pool.tryTake(job.runnable):
+                job.status = JOB_CANCELLED
+            elif job.status in (JOB_QUEUED, JOB_RUNNING):
+                # Already picked up by a worker; it stops at its next cancellation check
+                job.cancel_event.set()
+                job.status = JOB_CANCELLING
+            else:
+                continue
+            self.update_job_row(job)
+
+    def retry_selected_jobs(self):
+        for job in self.selected_jobs():
+            if job.status not in (JOB_CANCELLED, JOB_FAILED, JOB_DONE):
+                continue
+            job.run_id += 1
+            job.cancel_event = threading.Event()
+            job.status = JOB_QUEUED
+            job.elapsed = job.output = job.output_path = job.output_size = job.exported_to = job.error = None
+            self.update_job_row(job)
+            self.submit_job(job)
+
+    def process_job_updates(self):
+        """Apply a bounded batch of worker updates to the job table."""
+        self.check_exports()
+        changed_jobs = {}
+        for _ in range(JOB_UPDATES_PER_FRAME):
+            try:
+                job, run_id, status, output, output_path, output_size, error, elapsed = self.job_updates.get_nowait()
+            except queue.Empty:
+                break
+            if run_id != job.run_id:
+                continue  # Update from a run that has since been retried
+            if status == JOB_RUNNING and job.status == JOB_CANCELLING:
+                continue
+            job.status = status
+            job.output = output
+            job.output_path = output_path
+            job.output_size = output_size
+            job.error = error
+            job.elapsed = elapsed
+            if status == JOB_DONE and self.export is not None:
+                self.export_job(job)
+            changed_jobs[id(job)] = job
+
+        if changed_jobs:
+            self.job_table.setUpdatesEnabled(False)
+            for job in changed_jobs.values():
+                self.update_job_row(job)
+            self.job_table.setUpdatesEnabled(True)
+
+    def update_job_row(self, job):
+        status_text = job.status if job.error is None else f"{job.status}: {job.error}"
+        time_text = "" if job.elapsed is None else f"{job.elapsed * 1000:.0f} ms"
+        size_text = "" if job.output_size is None else format_size(job.output_size)
+        for column, text in enumerate((job.name, job.priority, status_text, time_text, size_text)):
+            self.job_table.item(job.row, column).setText(text)
+
+    def export_jobs(self):
+        """
+        Start streaming job outputs into one archive: finished jobs are handed over right away
+        and the others as they finish, and the export's own thread writes them. Clicking again
+        stops it. Outputs already exported to an earlier archive are only kept there.
+        """
+        if self.export is not None:
+            self.stop_export()
+            return
+        finished_jobs = [job for job in self.jobs if job.status == JOB_DONE and job.exported_to is None]
+        pending = any(job.status in (JOB_QUEUED, JOB_RUNNING) for job in self.jobs)
+        if not finished_jobs and not pending:
+            QMessageBox.information(self, "Export", "There are no jobs to export.")
+            return
+        archive_path, _ = QFileDialog.getSaveFileName(self, "Export Job Outputs", os.path.join(OUTPUT_DIR, "jobs.tar.gz"),
+                                                      "Archives (*.tar.gz *.tar.zst *.tar *.zip)")
+        if not archive_path:
+            return
+        try:
+            export = ArchiveExport(archive_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Export Error", f"Could not export the job outputs: {e}")
+            return
+        self.export = export
+        for job in finished_jobs:
+            self.export_job(job)
+        self.export_jobs_button.setText("Stop Export")
+        print(f"Exporting to {archive_path}; jobs are added as they finish")
+        if not pending:
+            self.stop_export()
+
+    def export_job(self, job):
+        """Hand a finished job's output to the open export and drop the copy held in memory."""
+        name = get_export_member_name(job)
+        if self.export.add(name, None if job.output_path else job.output, job.output_path):
+            job.exported_to = self.export.path
+            job.output = f"Output exported to {self.export.path} as {name}"
+
+    def stop_export(self):
+        """Stop adding jobs to the open export; it finishes writing in the background."""
+        self.export.close()
+        self.closing_exports.append(self.export)
+        self.export = None
+        self.export_jobs_button.setText("Export...")
+
+    def check_exports(self):
+        """Report exports whose archive has been finished."""
+        for export in [export for export in self.closing_exports if not export.thread.is_alive()]:
+            self.closing_exports.remove(export)
+            if export.error is not None:
+                QMessageBox.warning(self, "Export Error", f"Could not export the job outputs: {export.error}")
+            else:
+                print(f"Exported {export.count} job(s) to {export.path}")
+        if self.export is not None and self.export.error is not None:
+            # A failed export takes no more jobs; they keep their output instead
+            self.stop_export()
+
+    def show_selected_job_output(self):
+        jobs = self.selected_jobs()
+        if len(jobs) == 1 and jobs[0].output is not None:
+            self.output_area.setPlainText(jobs[0].output)
+
     def set_input_error(self, widget, is_error):
         """Sets a red outline on an input field if there's an error, and shakes the widget."""
         if is_error:
@@ -357,39 +843,37 @@ class ObfuscatorGUI(QWidget):
             self.set_input_error(self.code_input, False)
             self.set_input_error(self.divide_input, False)
 
-            # Adjust divide_method if it's larger than the code length
-            code_length = len(unobfuscated_code)
-            divide_method = min(divide_method, code_length)
-
-            code_number_remainder = code_length % divide_method
-            code_number = code_length // divide_method
-            calcs_needed = code_number if code_number_remainder == 0 else code_number + 1
+            packing_stats = PackingStats()
+            try:
+                display_output_text = build_obfuscated_script(unobfuscated_code, divide_method,
+                                                              max_line_length=self.read_max_line_length(),
+                                                              packing_stats=packing_stats)
+            except ValueError as e:
+                self.show_obfuscation_error("The command cannot be obfuscated", str(e))
+                return
 
-            tokens_available = [generateGOT() + str(i + 1) for i in range(calcs_needed)]
-            split_code = [unobfuscated_code[i * divide_method:(i + 1) * divide_method] for i in range(calcs_needed)]
+            # Make sure the script still runs the original command; never show or log one that does not
+            if not verify_obfuscated_output(display_output_text, unobfuscated_code):
+                self.show_obfuscation_error("The obfuscated script does not run the original command",
+                                            "Nothing was written to output.log. Try a different divide method.")
+                return
 
-            # Use double quotes to preserve whitespaces
-            unscrambled_code = [f'SET "{tokens_available[i]}={split_code[i]}"' for i in range(calcs_needed)]
-            concatenated_cmd = "call " + "%" + "%%".join(tokens_available) + "%"
+            if packing_stats.statements:
+                print(packing_stats)
 
             # Generate timestamp
             timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         
             # Prepare output text with timestamp for file
-            file_output_text = f"# Obfuscation Timestamp: {timestamp}  #\n\n" + \
-                                "@echo off\n" + "setlocal enabledelayedexpansion\n" + \
-                                "\n".join(unscrambled_code) + "\n" + concatenated_cmd
-        
-            # Prepare output text without timestamp for display
-            display_output_text = "@echo off\n" + "setlocal enabledelayedexpansion\n" + \
-                                    "\n".join(unscrambled_code) + "\n" + concatenated_cmd
+            file_output_text = f"# Obfuscation Timestamp: {timestamp}  #\n\n" + display_output_text
         
             # Display in output area without timestamp
             self.output_area.setPlainText(display_output_text)
         
             # Write to output.log with timestamp
             try:
-                with open("Output\\output.log", "a") as f:  # Use 'a' for append mode
+                os.makedirs(OUTPUT_DIR, exist_ok=True)
+                with open(os.path.join(OUTPUT_DIR, "output.log"), "a") as f:  # Use 'a' for append mode
                     f.write(file_output_text + "\n\n---\n\n")  # Add separators between multiple outputs
                 print("Output also written to output.log")
             except Exception as e:
@@ -408,6 +892,16 @@ class ObfuscatorGUI(QWidget):
             import traceback
             traceback.print_exc()
 
+    def show_obfuscation_error(self, text, details):
+        print(f"Obfuscation failed: {text}: {details}")
+        self.output_area.clear()
+        error_dialog = QMessageBox()
+        error_dialog.setIcon(QMessageBox.Icon.Critical)
+        error_dialog.setText(text)
+        error_dialog.setInformativeText(details)
+        error_dialog.setWindowTitle("Obfuscation Error")
+        error_dialog.exec()
+
 # Simple modal loading dialog instead of splash screen
 class LoadingDialog(QDialog):
     def __init__(self, parent=None):
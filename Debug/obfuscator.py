@@ -0,0 +1,700 @@
+"""
+Batch obfuscation and verification, with no dependency on Qt so it can be imported
+by scripts and asyncio services as well as by the GUI in cookie.py.
+"""
+import random
+import string
+import time
+import os
+import re
+import mmap
+import codecs
+import asyncio
+import threading
+import array
+import itertools
+import collections
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+def generateGOT(rng=random):
+    accepted_characters = string.ascii_letters
+    return ''.join(rng.choice(accepted_characters) for _ in range(64))
+
+# Maps random bytes to token letters; bytes past the last whole multiple of 52 are dropped to keep it unbiased
+TOKEN_LETTER_TABLE = bytes(string.ascii_letters.encode()[b % 52] if b < 208 else 0 for b in range(256))
+TOKEN_LETTER_REJECTS = bytes(range(208, 256))
+
+def generate_token_letters(count, rng=random):
+    """Return count random token letters at once, for batches that need many tokens."""
+    pieces = []
+    have = 0
+    while have < count:
+        # About 19% of the bytes are rejected, so ask for a little more than what is missing
+        piece = rng.randbytes((count - have) * 5 // 4 + 64).translate(TOKEN_LETTER_TABLE, TOKEN_LETTER_REJECTS)
+        pieces.append(piece)
+        have += len(piece)
+    return b"".join(pieces)[:count].decode("ascii")
+
+# Number of chunks generated between checks for cancellation
+CANCEL_CHECK_INTERVAL = 4096
+
+# Bytes decoded at a time when streaming a memory-mapped input file
+DECODE_WINDOW_SIZE = 1024 * 1024
+
+# Already processed pages of a memory-mapped input are released every this many bytes
+MAPPED_RELEASE_INTERVAL = 16 * 1024 * 1024
+
+# Bytes decoded from the start of a memory-mapped line to decide how it is written
+MAPPED_PREFIX_SIZE = 256
+
+# Files larger than this are obfuscated from a memory map straight to disk by the job queue
+MAPPED_INPUT_THRESHOLD = 16 * 1024 * 1024
+
+# Line length limit for packed SET lines; cmd.exe cannot read longer lines
+MAX_PACKED_LINE_LENGTH = 8191
+
+# Default number of files the async API works on ahead of its consumer
+ASYNC_MAX_IN_FLIGHT = 8
+
+# Shared executor for the async API, created on first use
+obfuscation_executor = None
+
+# Header lines written at the top of every obfuscated script
+OBFUSCATED_HEADER = "@echo off\n" + "setlocal enabledelayedexpansion\n"
+
+# Lines written to the script unchanged: labels, :: comments, REM, GOTO and @ lines such as @echo off
+PASSTHROUGH_LINE_PATTERN = re.compile(r"@|:|(?:rem|goto)(?:\s|$)", re.I)
+
+# Lines CALL cannot run: IF and FOR, and the ( and ) of multi-line blocks
+UNSUPPORTED_LINE_PATTERN = re.compile(r"(?:if|for)(?:\s|$)|[()]", re.I)
+
+# Matches a generated SET "token=chunk" line (cmd.exe uses the last quote on the line)
+SET_LINE_PATTERN = re.compile(r'SET "([^=%"!]+)=(.*)"')
+
+# Characters that decide where cmd.exe splits a line into commands
+COMMAND_SEPARATOR_PATTERN = re.compile(r'["^&]')
+
+# Matches a caret escape or an unescaped operator outside quotes
+CARET_ESCAPE_PATTERN = re.compile(r"\^(.)|([&|<>])", re.S)
+
+# Escape tables for chunk values, indexed by (inside quotes, delayed expansion active).
+# cmd.exe expands %% in phase 1, treats ^ and &|<> as special outside quotes in phase 2
+# and, when the line contains a !, strips carets again during delayed expansion.
+ESCAPE_TABLES = {
+    (True, False): str.maketrans({"%": "%%"}),
+    (True, True): str.maketrans({"%": "%%", "^": "^^", "!": "^!"}),
+    (False, False): str.maketrans({"%": "%%", "^": "^^", "&": "^&", "|": "^|", "<": "^<", ">": "^>"}),
+    (False, True): str.maketrans({"%": "%%", "^": "^^^^", "!": "^^!", "&": "^&", "|": "^|", "<": "^<", ">": "^>"}),
+}
+
+def escape_chunk(chunk):
+    """
+    Escape a chunk so that SET "token=chunk" stores it unchanged.
+    Chunks are escaped after splitting, so an escape sequence never crosses a SET line.
+    """
+    delayed = "!" in chunk
+    if '"' not in chunk:
+        # The whole chunk sits inside the quotes of SET "..."
+        return chunk.translate(ESCAPE_TABLES[True, delayed])
+
+    # Every quote in the chunk toggles the quote state, starting inside the opening quote
+    inside_table = ESCAPE_TABLES[True, delayed]
+    outside_table = ESCAPE_TABLES[False, delayed]
+    pieces = chunk.split('"')
+    return '"'.join([piece.translate(outside_table if i % 2 else inside_table) for i, piece in enumerate(pieces)])
+
+def unescape_chunk(value, delayed_expansion):
+    """
+    Undo escape_chunk the way cmd.exe parses a SET "token=value" line.
+    Raises ValueError if cmd.exe would expand or split something in the value.
+    """
+    # Phase 1: percent expansion
+    if "%" in value:
+        if "%" in value.replace("%%", ""):
+            raise ValueError("unescaped % in SET value")
+        value = value.replace("%%", "%")
+
+    # Phase 2: carets and operators outside quotes
+    if '"' in value:
+        pieces = value.split('"')
+        for i in range(1, len(pieces), 2):
+            piece = pieces[i]
+            if (len(piece) - len(piece.rstrip("^"))) % 2:
+                raise ValueError("trailing ^ in SET value")
+            pieces[i] = CARET_ESCAPE_PATTERN.sub(_unescape_caret_match, piece)
+        value = '"'.join(pieces)
+
+    # Phase 5: delayed expansion strips carets when the line contains a !
+    if delayed_expansion and "!" in value:
+        if "!" in CARET_ESCAPE_PATTERN.sub("", value.replace("^^", "")):
+            raise ValueError("unescaped ! in SET value")
+        value = re.sub(r"\^(.)", r"\1", value, flags=re.S)
+    return value
+
+def _unescape_caret_match(match):
+    if match.group(2):
+        raise ValueError(f"unescaped {match.group(2)} in SET value")
+    return match.group(1)
+
+class PackingStats:
+    """Totals for SetLinePacker: SET statements taken, lines written and seconds spent packing."""
+    def __init__(self):
+        self.statements = 0
+        self.lines = 0
+        self.seconds = 0.0
+
+    @property
+    def lines_saved(self):
+        return self.statements - self.lines
+
+    def __str__(self):
+        return (f"Packed {self.statements} SET statements into {self.lines} lines "
+                f"({self.lines_saved} saved) in {self.seconds:.3f} s")
+
+class SetLinePacker:
+    """
+    Joins SET statements with & into lines of at most max_line_length characters.
+    A chunk with an odd number of quotes leaves the rest of its line quoted, so its
+    statement ends the line; a chunk with a ! gets a line of its own, so the delayed
+    expansion escaping never depends on its neighbours.
+    Pass a PackingStats to add up what several packers saved.
+    """
+    def __init__(self, max_line_length, stats=None):
+        self.max_line_length = max_line_length
+        self.stats = stats if stats is not None else PackingStats()
+        self.current = []
+        self.length = 0
+
+    def add(self, statements):
+        """Add statements in order and return the lines that are complete."""
+        start_time = time.perf_counter()
+        lines = []
+        statement_count = 0
+        current = self.current
+        length = self.length
+        for statement in statements:
+            statement_count += 1
+            if "!" in statement:
+                if current:
+                    lines.append("&".join(current))
+                    current = []
+                lines.append(statement)
+                continue
+            if current and length + 1 + len(statement) > self.max_line_length:
+                lines.append("&".join(current))
+                current = []
+            length = length + 1 + len(statement) if current else len(statement)
+            current.append(statement)
+            # SET "token=chunk" adds two quotes, so the statement has the chunk's parity
+            if statement.count('"') % 2:
+                lines.append("&".join(current))
+                current = []
+        self.current = current
+        self.length = length
+        self.stats.statements += statement_count
+        self.stats.lines += len(lines)
+        self.stats.seconds += time.perf_counter() - start_time
+        return lines
+
+    def flush(self):
+        """Return the last, unfinished line, if any."""
+        lines = ["&".join(self.current)] if self.current else []
+        self.current = []
+        self.stats.lines += len(lines)
+        return lines
+
+def split_command_line(line):
+    """Split a line on the & separators cmd.exe acts on: outside quotes and not escaped."""
+    parts = []
+    start = 0
+    position = 0
+    inside_quotes = False
+    while True:
+        match = COMMAND_SEPARATOR_PATTERN.search(line, position)
+        if match is None:
+            break
+        index = match.start()
+        position = index + 1
+        if match.group() == '"':
+            inside_quotes = not inside_quotes
+        elif inside_quotes:
+            continue
+        elif match.group() == "^":
+            position += 1  # The escaped character is literal
+        else:
+            parts.append(line[start:index])
+            start = index + 1
+    parts.append(line[start:])
+    return parts
+
+def split_code_lines(unobfuscated_code):
+    """Split the code into its non-empty lines."""
+    return [line for line in re.split(r"\r?\n", unobfuscated_code) if line]
+
+def is_obfuscated_line(code_line):
+    """
+    Return True if the line is obfuscated into SET lines and a call, or False if it is
+    written unchanged. Raises ValueError for lines that would behave differently when run
+    through CALL, since each line of a batch file becomes its own call.
+    """
+    command = code_line.lstrip(" \t@")
+    if UNSUPPORTED_LINE_PATTERN.match(command):
+        raise ValueError(f"IF, FOR and ( ) blocks cannot be obfuscated: {code_line.strip()[:80]!r}")
+    return not PASSTHROUGH_LINE_PATTERN.match(code_line.lstrip(" \t"))
+
+def build_obfuscated_script(unobfuscated_code, divide_method, cancel_event=None, max_line_length=None,
+                            packing_stats=None):
+    """
+    Split each line of the code into chunks of divide_method characters, store each
+    chunk in a randomly named variable and return the script that calls them back.
+    Labels, comments and @ lines are kept as they are (see is_obfuscated_line).
+    With max_line_length, SET statements are packed several to a line (see SetLinePacker),
+    and packing_stats, if given, is updated with the lines saved.
+    Returns None if cancel_event is set before the script is complete.
+    """
+    script_lines = []
+    token_number = 0
+    packer = SetLinePacker(max_line_length, packing_stats) if max_line_length else None
+    for code_line in split_code_lines(unobfuscated_code):
+        if "\r" in code_line:
+            raise ValueError("Line breaks cannot be stored in a SET line")
+        if not is_obfuscated_line(code_line):
+            script_lines.append(code_line)
+            continue
+
+        # Adjust divide_method if it's larger than the line length
+        code_length = len(code_line)
+        line_divide_method = min(divide_method, code_length)
+
+        code_number_remainder = code_length % line_divide_method
+        code_number = code_length // line_divide_method
+        calcs_needed = code_number if code_number_remainder == 0 else code_number + 1
+
+        # Work in blocks so a cancelled job stops promptly on very long lines
+        tokens_available = []
+        for start in range(0, calcs_needed, CANCEL_CHECK_INTERVAL):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            stop = min(start + CANCEL_CHECK_INTERVAL, calcs_needed)
+            tokens = [generateGOT() + str(token_number + i + 1) for i in range(start, stop)]
+            split_code = [escape_chunk(code_line[i * line_divide_method:(i + 1) * line_divide_method]) for i in range(start, stop)]
+
+            # Use double quotes to preserve whitespaces
+            statements = [f'SET "{token}={chunk}"' for token, chunk in zip(tokens, split_code)]
+            script_lines.extend(packer.add(statements) if packer else statements)
+            tokens_available.extend(tokens)
+
+        if packer:
+            script_lines.extend(packer.flush())
+        token_number += calcs_needed
+        script_lines.append("call " + "%" + "%%".join(tokens_available) + "%")
+
+    if token_number == 0:
+        raise ValueError("Nothing to obfuscate")
+    return OBFUSCATED_HEADER + "\n".join(script_lines)
+
+class ObfuscatedBatch:
+    """
+    Scripts returned by obfuscate_many, kept as one string of script bodies plus their
+    offsets instead of thousands of separate strings. The shared header is added back
+    when a script is read.
+    """
+    def __init__(self, bodies, offsets):
+        self.bodies = bodies
+        self.offsets = offsets  # offsets[i]:offsets[i + 1] is the body of script i
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def body(self, index):
+        """Return script index without the header."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ObfuscatedBatch index out of range")
+        return self.bodies[self.offsets[index]:self.offsets[index + 1]]
+
+    def __getitem__(self, index):
+        return OBFUSCATED_HEADER + self.body(index)
+
+    def __iter__(self):
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield OBFUSCATED_HEADER + self.bodies[offsets[i]:offsets[i + 1]]
+
+def obfuscate_many(commands, divide_method, cancel_event=None, max_line_length=None, packing_stats=None):
+    """
+    Obfuscate a batch of commands in one pass and return an ObfuscatedBatch with one
+    script per command, each the same as build_obfuscated_script would produce.
+    Everything is validated before any work is done, the tokens for the whole batch
+    are generated at once and repeated chunks are escaped only once. Every script is
+    checked with verify_obfuscated_output before it is added.
+    Raises ValueError naming the first bad command; returns None if cancel_event is set.
+    """
+    if divide_method <= 0:
+        raise ValueError("Divide method must be greater than zero")
+    command_lines = []
+    chunk_count = 0
+    for index, command in enumerate(commands):
+        lines = [command] if "\n" not in command and "\r" not in command else split_code_lines(command)
+        if not lines or not lines[0]:
+            raise ValueError(f"Command {index}: nothing to obfuscate")
+        if any("\r" in line for line in lines):
+            raise ValueError(f"Command {index}: line breaks cannot be stored in a SET line")
+        try:
+            obfuscated = [is_obfuscated_line(line) for line in lines]
+        except ValueError as e:
+            raise ValueError(f"Command {index}: {e}")
+        if not any(obfuscated):
+            raise ValueError(f"Command {index}: nothing to obfuscate")
+        command_lines.append(list(zip(lines, obfuscated)))
+        chunk_count += sum([-(-len(line) // divide_method) for line, is_obfuscated in command_lines[-1] if is_obfuscated])
+
+    letters = generate_token_letters(chunk_count * 64)
+    escaped_chunks = {}
+    bodies = []
+    letter_position = 0
+    for index, lines in enumerate(command_lines):
+        if index % CANCEL_CHECK_INTERVAL == 0 and cancel_event is not None and cancel_event.is_set():
+            return None
+        packer = SetLinePacker(max_line_length, packing_stats) if max_line_length else None
+        script_lines = []
+        token_number = 0
+        for line, obfuscated in lines:
+            if not obfuscated:
+                script_lines.append(line)
+                continue
+            tokens = []
+            statements = []
+            for start in range(0, len(line), divide_method):
+                chunk = line[start:start + divide_method]
+                escaped = escaped_chunks.get(chunk)
+                if escaped is None:
+                    escaped = escaped_chunks[chunk] = escape_chunk(chunk)
+                token_number += 1
+                token = letters[letter_position:letter_position + 64] + str(token_number)
+                letter_position += 64
+                tokens.append(token)
+                statements.append(f'SET "{token}={escaped}"')
+            if packer:
+                script_lines.extend(packer.add(statements))
+                script_lines.extend(packer.flush())
+            else:
+                script_lines.extend(statements)
+            script_lines.append("call %" + "%%".join(tokens) + "%")
+        body = "\n".join(script_lines)
+        if not verify_obfuscated_output(OBFUSCATED_HEADER + body, "\n".join([line for line, _ in lines])):
+            raise ValueError(f"Command {index}: the obfuscated script does not run the original command")
+        bodies.append(body)
+
+    offsets = array.array("q", itertools.accumulate(map(len, bodies), initial=0))
+    return ObfuscatedBatch("".join(bodies), offsets)
+
+def expand_obfuscated_script(script_text):
+    """
+    Expand the SET/call structure of a generated script the way cmd.exe would
+    and return the command(s) it ends up calling, one per line.
+    Raises ValueError if the script does not have the expected structure.
+    """
+    commands = list(iter_expanded_commands(script_text.split("\n")))
+    if not commands:
+        raise ValueError("No call line found")
+    return "\n".join(commands)
+
+def iter_expanded_commands(script_lines):
+    """
+    Yield the commands a generated script runs, one per line, from an iterable of its lines.
+    The variables of a call line are dropped once it is expanded, since every token is only
+    called once, so a script can be checked a line at a time.
+    """
+    variables = {}
+    delayed_expansion = False
+    in_header = True
+    for line_number, line in enumerate(script_lines, 1):
+        if not line:
+            continue
+        if in_header:
+            # Skip the header and the timestamp comment from output.log
+            if line[0] == "#" or line == "@echo off":
+                continue
+            in_header = False
+            if line == "setlocal enabledelayedexpansion":
+                delayed_expansion = True
+                continue
+
+        if line.startswith("SET "):
+            statements = split_command_line(line)
+            if len(statements) > 1 and "!" in line:
+                raise ValueError(f"Line {line_number}: ! in a packed SET line")
+            for statement in statements:
+                match = SET_LINE_PATTERN.fullmatch(statement)
+                if not match:
+                    raise ValueError(f"Line {line_number}: unexpected statement {statement[:80]!r}")
+                try:
+                    variables[match.group(1)] = unescape_chunk(match.group(2), delayed_expansion)
+                except ValueError as e:
+                    raise ValueError(f"Line {line_number}: {e}")
+            continue
+
+        if line.startswith("call %") and line.endswith("%"):
+            try:
+                yield "".join([variables.pop(name) for name in line[6:-1].split("%%")])
+            except KeyError as e:
+                raise ValueError(f"Line {line_number}: variable {e} is never set")
+            continue
+
+        try:
+            if not is_obfuscated_line(line):
+                yield line  # Written unchanged, runs as it is
+                continue
+        except ValueError:
+            pass
+        raise ValueError(f"Line {line_number}: unexpected line {line[:80]!r}")
+
+def verify_obfuscated_output(script_text, original_code):
+    """
+    Check that a generated script expands back to exactly the original code.
+    Returns True if it does, False otherwise.
+    """
+    try:
+        return expand_obfuscated_script(script_text) == "\n".join(split_code_lines(original_code))
+    except ValueError as e:
+        print(f"Verification failed: {e}")
+        return False
+
+def verify_obfuscated_file(script_path, source_path, encoding="utf-8"):
+    """
+    Check a script written by obfuscate_mapped_file against its source file, reading
+    both a line at a time so a large file is never held in memory.
+    Returns True if the script runs exactly the source's lines, False otherwise.
+    """
+    try:
+        with open(script_path, "r", encoding=encoding) as script_file, open(source_path, "rb") as source_file:
+            # Split the source the same way as write_mapped_script: on \n, dropping a \r before it
+            source_lines = (line.rstrip(b"\n").removesuffix(b"\r") for line in source_file)
+            expected_lines = (line.decode(encoding) for line in source_lines if line)
+            commands = iter_expanded_commands(line.rstrip("\n") for line in script_file)
+            for command, expected in itertools.zip_longest(commands, expected_lines):
+                if command != expected:
+                    return False
+        return True
+    except ValueError as e:
+        print(f"Verification failed: {e}")
+        return False
+
+def build_verified_script(unobfuscated_code, divide_method, cancel_event=None, max_line_length=None,
+                          packing_stats=None):
+    """
+    Same as build_obfuscated_script, but the script is checked with verify_obfuscated_output first.
+    Raises ValueError if it does not run the original code; returns None if cancel_event is set.
+    """
+    script = build_obfuscated_script(unobfuscated_code, divide_method, cancel_event, max_line_length, packing_stats)
+    if script is not None and not verify_obfuscated_output(script, unobfuscated_code):
+        raise ValueError("The obfuscated script does not run the original command")
+    return script
+
+def get_obfuscation_executor():
+    """Return the executor shared by all async obfuscation jobs."""
+    global obfuscation_executor
+    if obfuscation_executor is None:
+        obfuscation_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                  thread_name_prefix="CookieBatch")
+    return obfuscation_executor
+
+async def run_cancellable(function, *args, executor=None, **kwargs):
+    """
+    Run function(*args, cancel_event, **kwargs) on the executor without blocking the event loop.
+    Cancelling the awaiting task sets cancel_event so the in-flight job stops as well.
+    """
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+    future = loop.run_in_executor(executor or get_obfuscation_executor(),
+                                  functools.partial(function, *args, cancel_event, **kwargs))
+    try:
+        return await future
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+
+async def obfuscate_async(unobfuscated_code, divide_method, executor=None, max_line_length=None, semaphore=None):
+    """
+    Async version of build_verified_script for use inside asyncio services.
+    Every call goes straight to the executor; pass one asyncio.Semaphore to all calls to
+    bound how many jobs are queued or running at once (obfuscate_files_async does this itself).
+    """
+    if semaphore is None:
+        return await run_cancellable(build_verified_script, unobfuscated_code, divide_method,
+                                     max_line_length=max_line_length, executor=executor)
+    async with semaphore:
+        return await run_cancellable(build_verified_script, unobfuscated_code, divide_method,
+                                     max_line_length=max_line_length, executor=executor)
+
+def obfuscate_file(file_path, divide_method, cancel_event=None, max_line_length=None, packing_stats=None):
+    """Read a batch file and return its obfuscated script, checked with build_verified_script."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        unobfuscated_code = f.read()
+    return build_verified_script(unobfuscated_code, divide_method, cancel_event, max_line_length, packing_stats)
+
+def obfuscate_mapped_file(source_path, output_path, divide_method, encoding="utf-8", cancel_event=None,
+                          max_line_length=None, packing_stats=None):
+    """
+    Obfuscate a large batch file from a memory map straight into output_path.
+    Lines are sliced as zero-copy views of the map and decoded one window at a time,
+    so memory use stays far below the file size. The script is written to
+    <output_path>.part and only renamed once complete, so a cancelled or failed run
+    leaves no truncated output behind, and only after verify_obfuscated_file has checked it.
+    Raises ValueError if the script does not run the original file.
+    Returns False if cancel_event is set before the output is complete.
+    """
+    part_path = output_path + ".part"
+    try:
+        completed = write_mapped_script(source_path, part_path, divide_method, encoding, cancel_event,
+                                        max_line_length, packing_stats)
+        if completed and not verify_obfuscated_file(part_path, source_path, encoding):
+            raise ValueError("The obfuscated script does not run the original file")
+    except BaseException:
+        remove_partial_output(part_path)
+        raise
+    if not completed:
+        remove_partial_output(part_path)
+        return False
+    os.replace(part_path, output_path)
+    return True
+
+def remove_partial_output(part_path):
+    try:
+        os.remove(part_path)
+    except OSError as e:
+        print(f"Could not remove {part_path}: {e}")
+
+def write_mapped_script(source_path, output_path, divide_method, encoding, cancel_event, max_line_length,
+                        packing_stats=None):
+    """Write the obfuscated script for obfuscate_mapped_file; returns False if cancelled."""
+    with open(source_path, "rb") as source_file, open(output_path, "w", encoding=encoding) as output_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            raise ValueError("Nothing to obfuscate")
+
+        output_file.write(OBFUSCATED_HEADER.rstrip("\n"))
+        token_number = 0
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Let the OS read ahead and drop pages we are done with (not available on Windows)
+            can_release_pages = hasattr(mmap, "MADV_DONTNEED")
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            released = 0
+
+            size = len(mapped)
+            start = 0
+            while start < size:
+                end = mapped.find(b"\n", start)
+                if end == -1:
+                    end = size
+                # Drop the \r of a \r\n line ending, the same as split_code_lines
+                line_end = end - 1 if end > start and mapped[end - 1] == 13 else end
+
+                if line_end > start:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return False
+                    chunk_count = write_mapped_line(mapped, start, line_end, output_file, divide_method,
+                                                    encoding, token_number, max_line_length, cancel_event,
+                                                    packing_stats)
+                    if chunk_count is None:
+                        return False
+                    token_number += chunk_count
+                start = end + 1
+
+                if can_release_pages and start - released >= MAPPED_RELEASE_INTERVAL:
+                    release_end = min(start, size) - min(start, size) % mmap.PAGESIZE
+                    mapped.madvise(mmap.MADV_DONTNEED, released, release_end - released)
+                    released = release_end
+
+        if token_number == 0:
+            raise ValueError("Nothing to obfuscate")
+    return True
+
+def write_mapped_line(mapped, start, end, output_file, divide_method, encoding, token_number,
+                      max_line_length=None, cancel_event=None, packing_stats=None):
+    """
+    Write the SET lines and call line for mapped[start:end] and return the number of chunks,
+    or copy the line unchanged and return 0 if it is not obfuscated (see is_obfuscated_line).
+    Returns None if cancel_event is set part way through the line.
+    Tokens come from a seeded generator that is replayed for the call line,
+    so even a single huge line never has to be held in memory.
+    """
+    # The start of the line is enough to tell what kind of line it is
+    obfuscated = is_obfuscated_line(mapped[start:min(end, start + MAPPED_PREFIX_SIZE)].decode(encoding, "ignore"))
+    if not obfuscated:
+        output_file.write("\n")
+    seed = random.getrandbits(64)
+    token_rng = random.Random(seed)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    packer = SetLinePacker(max_line_length, packing_stats) if max_line_length else None
+    chunk_count = 0
+    pending = ""
+
+    with memoryview(mapped) as view:
+        for window_start in range(start, end, DECODE_WINDOW_SIZE):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            window_end = min(window_start + DECODE_WINDOW_SIZE, end)
+            is_last_window = window_end == end
+            with view[window_start:window_end] as window:
+                pending += decoder.decode(window, final=is_last_window)
+            if "\r" in pending:
+                raise ValueError("Line breaks cannot be stored in a SET line")
+            if not obfuscated:
+                output_file.write(pending)
+                pending = ""
+                continue
+
+            # Only whole chunks are written until the end of the line is reached
+            ready_length = len(pending) if is_last_window else len(pending) - len(pending) % divide_method
+            set_lines = []
+            for i in range(0, ready_length, divide_method):
+                chunk_count += 1
+                token = generateGOT(token_rng) + str(token_number + chunk_count)
+                set_lines.append(f'SET "{token}={escape_chunk(pending[i:i + divide_method])}"')
+            if packer:
+                set_lines = packer.add(set_lines)
+            if set_lines:
+                output_file.write("\n" + "\n".join(set_lines))
+            pending = pending[ready_length:]
+
+    if not obfuscated:
+        return 0
+    if packer:
+        output_file.write("".join(["\n" + line for line in packer.flush()]))
+
+    # Replay the token generator to write the call line piece by piece
+    token_rng = random.Random(seed)
+    output_file.write("\ncall ")
+    for i in range(chunk_count):
+        output_file.write("%" + generateGOT(token_rng) + str(token_number + i + 1) + "%")
+    return chunk_count
+
+async def obfuscate_files_async(file_paths, divide_method, max_in_flight=ASYNC_MAX_IN_FLIGHT, executor=None,
+                                max_line_length=None):
+    """
+    Obfuscate many files, yielding (file_path, script) in input order.
+    At most max_in_flight files are worked on ahead of the consumer, and jobs
+    that are still running are cancelled if the consumer stops early.
+    """
+    pending = collections.deque()
+    try:
+        for file_path in file_paths:
+            task = asyncio.ensure_future(run_cancellable(obfuscate_file, file_path, divide_method,
+                                                         max_line_length=max_line_length, executor=executor))
+            pending.append((file_path, task))
+            if len(pending) >= max_in_flight:
+                file_path, task = pending.popleft()
+                yield file_path, await task
+
+        while pending:
+            file_path, task = pending.popleft()
+            yield file_path, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*[task for _, task in pending], return_exceptions=True)
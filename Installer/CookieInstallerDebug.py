@@ -1,12 +1,30 @@
 import os
 import sys
+import json
+import time
+import threading
 import requests
+import urllib3
 import zipfile
 import shutil
 import platform
-import winshell  # Added for Windows shortcut creation
+try:
+    import winshell  # Windows only, used to create the desktop shortcut
+except ImportError:
+    winshell = None
 import ctypes
 import tempfile
+import hashlib
+import io
+import re
+import pathlib
+import ntpath
+import email.utils
+import argparse
+import contextlib
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtWidgets import (QApplication, QFileDialog, QMessageBox, QMainWindow, 
                              QVBoxLayout, QHBoxLayout, QPushButton, QWidget, 
                              QProgressBar, QLabel, QLineEdit, QCheckBox)
@@ -15,6 +33,8 @@ from PyQt6.QtGui import QFont, QIcon
 
 # Configuration
 GITHUB_ZIP_URL = "https://raw.githubusercontent.com/crtentertainment/CookieBatch/main/Official/CookieBatch.zip"
+MANIFEST_URL = "https://raw.githubusercontent.com/crtentertainment/CookieBatch/main/Official/manifest.json"
+VERSION_URL = "https://raw.githubusercontent.com/crtentertainment/CookieBatch/main/Official/installverification.txt"
 APP_NAME = "CookieBatch Installer"
 
 # Use temporary directory for downloads to avoid permission issues
@@ -22,6 +42,53 @@ TEMP_DIR = tempfile.gettempdir()
 ZIP_PATH = os.path.join(TEMP_DIR, "cookiebatch_downloaded.zip")
 EXTRACT_PATH = os.path.join(TEMP_DIR, "cookiebatch_extracted")
 
+# Writes a release manifest: --build-manifest <release dir> <version>
+MANIFEST_FLAG = "--build-manifest"
+
+# Non-interactive install for build agents; see parse_silent_args for the options
+SILENT_FLAG = "--silent"
+
+# Exit codes of the silent install
+EXIT_SUCCESS = 0
+EXIT_INSTALL_FAILED = 1      # No target directory was installed
+EXIT_USAGE = 2               # Bad arguments (argparse's own exit code)
+EXIT_DOWNLOAD_FAILED = 3     # The release archive could not be obtained
+EXIT_PARTIAL_FAILURE = 4     # Some target directories were installed, others failed
+
+# Extra mirrors of the release archive: HTTP(S) URLs of internal caches, or local and
+# UNC paths on file shares, as a ";"-separated list in COOKIEBATCH_MIRRORS
+RELEASE_MIRRORS = [mirror.strip() for mirror in os.environ.get("COOKIEBATCH_MIRRORS", "").split(";") if mirror.strip()]
+
+# Local cache of downloaded release archives
+CACHE_DIR = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+                         "CookieBatch", "downloads")
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Every install appends its per-stage timing report here, one JSON object per line
+INSTALL_REPORT_PATH = os.path.join(os.path.dirname(CACHE_DIR), "install-reports.jsonl")
+
+# Download engine tuning
+DOWNLOAD_RETRIES = 5                  # Attempts per byte range before giving up
+DOWNLOAD_SEGMENTS = 4                 # Parallel ranges used when the server supports them
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024    # Files smaller than this are fetched as one stream
+MIN_READ_SIZE = 64 * 1024             # Adaptive read buffer bounds
+MAX_READ_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 0.1               # Seconds between progress signals
+CONNECT_TIMEOUT = 5                   # Seconds to wait for a connection to a server
+READ_TIMEOUT = 30                     # Seconds without any data before a read is retried
+PROBE_TIMEOUT = 3                     # Seconds each mirror gets to answer the speed probe
+PROBE_BYTES = 256 * 1024              # Bytes read from each mirror to rank them by speed
+EXTRACT_WORKERS = min(8, os.cpu_count() or 1)  # Threads decompressing archive members
+
+# Relative work per install stage, in bytes per byte of release archive. Extraction is
+# re-weighted with the real uncompressed size once the archive has been downloaded.
+INSTALL_STAGE_SIZES = {"download": 1.0, "verify": 0.02, "extract": 2.0, "install": 0.05, "shortcut": 0.01}
+DELTA_STAGE_SIZES = {"download": 1.0, "install": 0.05, "shortcut": 0.01}
+
+# Errors after which a download is resumed instead of failed
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout, urllib3.exceptions.HTTPError, ConnectionError)
+
 # Default Install Directory - use Documents folder instead of home directory
 DEFAULT_INSTALL_DIR = os.path.join(os.path.expanduser("~"), "Documents", "CookieBatch")
 
@@ -135,76 +202,1583 @@ def check_dir_writeable(path):
         except Exception:
             return False
 
+def get_staging_paths(install_dir):
+    """
+    Return (zip_path, extract_path) next to the install directory, so the archive is
+    written and extracted once on the target volume and moving into place is a rename.
+    Falls back to the temp directory if the parent folder is not writeable.
+    """
+    install_dir = os.path.abspath(install_dir)
+    parent_dir = os.path.dirname(install_dir)
+    if not check_dir_writeable(parent_dir):
+        return ZIP_PATH, EXTRACT_PATH
+    name = os.path.basename(install_dir)
+    return (os.path.join(parent_dir, f".{name}.download.zip"),
+            os.path.join(parent_dir, f".{name}.staging"))
+
+def get_previous_install_path(install_dir):
+    """Return where the previous version is kept after a staged install."""
+    install_dir = os.path.abspath(install_dir)
+    return os.path.join(os.path.dirname(install_dir), f".{os.path.basename(install_dir)}.previous")
+
+def get_release_record_path(install_dir):
+    """Return where the contents of the release in install_dir are recorded."""
+    install_dir = os.path.abspath(install_dir)
+    return os.path.join(os.path.dirname(install_dir), f".{os.path.basename(install_dir)}.release.json")
+
+def read_release_record(install_dir):
+    """
+    Return (top-level entries, file paths) of the installed release as recorded by the last
+    staged install or delta update, or two empty sets if nothing was recorded.
+    """
+    try:
+        with open(get_release_record_path(install_dir), "r", encoding="utf-8") as f:
+            record = json.load(f)
+        return set(record["entries"]), set(record["files"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return set(), set()
+
+def write_release_record(install_dir, files, entries=None):
+    """Record the installed release's files (manifest paths) and top-level entries."""
+    if entries is None:
+        entries = {path.split("/")[0] for path in files}
+    try:
+        with open(get_release_record_path(install_dir), "w", encoding="utf-8") as f:
+            json.dump({"entries": sorted(entries), "files": sorted(files)}, f)
+    except OSError as e:
+        # Only means the next install carries over more, and removes less, than it could
+        print(f"Could not record the installed release: {e}")
+
+def list_release_files(release_dir):
+    """Return the path of every file in release_dir, relative and with / separators like a manifest."""
+    files = []
+    for root, _, names in os.walk(release_dir):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), release_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+def move_missing_entries(src_dir, dest_dir, names):
+    """
+    Move the named top-level entries of src_dir that dest_dir does not have into
+    dest_dir, e.g. the Output folder of an existing install. Returns the moved names.
+    """
+    moved = []
+    for item in names:
+        src = os.path.join(src_dir, item)
+        dest = os.path.join(dest_dir, item)
+        if os.path.lexists(src) and not os.path.lexists(dest):
+            os.replace(src, dest)
+            moved.append(item)
+    return moved
+
+def can_swap_in(staging_dir, install_dir):
+    """
+    Check whether staging_dir can be swapped in with renames: the previous version is kept
+    next to install_dir, so its parent must be writeable and on the same volume as staging_dir.
+    """
+    parent_dir = os.path.dirname(os.path.abspath(install_dir))
+    if not os.path.isdir(parent_dir) or not check_dir_writeable(parent_dir):
+        return False
+    return os.stat(staging_dir).st_dev == os.stat(parent_dir).st_dev
+
+def swap_in_staged_install(staging_dir, install_dir):
+    """
+    Replace install_dir with staging_dir using renames only, keeping the old tree as the
+    previous version for rollback. Every top-level entry of the old install that is in
+    neither release, such as the Output folder or files the user added, is carried over;
+    the old release's own entries are only known if a staged install recorded them.
+    The swap takes the same time whatever the size of either tree.
+    """
+    install_dir = os.path.abspath(install_dir)
+    previous_dir = get_previous_install_path(install_dir)
+    release_entries = os.listdir(staging_dir)
+    release_files = list_release_files(staging_dir)
+
+    # Set the older previous version aside; it is only deleted once the swap succeeded
+    trash_dir = None
+    if os.path.exists(previous_dir):
+        trash_dir = previous_dir + ".trash"
+        if os.path.exists(trash_dir):
+            shutil.rmtree(trash_dir, ignore_errors=True)
+        os.replace(previous_dir, trash_dir)
+
+    carried_over = []
+    had_install = os.path.exists(install_dir)
+    try:
+        if had_install:
+            old_release_entries, _ = read_release_record(install_dir)
+            user_entries = [name for name in os.listdir(install_dir) if name not in old_release_entries]
+            carried_over = move_missing_entries(install_dir, staging_dir, user_entries)
+            os.replace(install_dir, previous_dir)
+        os.replace(staging_dir, install_dir)
+    except OSError:
+        # Put everything back the way it was
+        if had_install and not os.path.exists(install_dir):
+            os.replace(previous_dir, install_dir)
+        if carried_over:
+            move_missing_entries(staging_dir, install_dir, carried_over)
+        if trash_dir and not os.path.exists(previous_dir):
+            os.replace(trash_dir, previous_dir)
+        raise
+
+    write_release_record(install_dir, release_files, release_entries)
+    if trash_dir:
+        shutil.rmtree(trash_dir, ignore_errors=True)
+    return had_install
+
+def rollback_install(install_dir):
+    """Swap the previous version back in; the current version becomes the previous one."""
+    previous_dir = get_previous_install_path(install_dir)
+    if not os.path.exists(previous_dir):
+        raise FileNotFoundError("No previous version to roll back to.")
+    rollback_dir = previous_dir + ".rollback"
+    os.replace(previous_dir, rollback_dir)
+    try:
+        swap_in_staged_install(rollback_dir, install_dir)
+    except OSError:
+        if os.path.exists(rollback_dir) and not os.path.exists(previous_dir):
+            os.replace(rollback_dir, previous_dir)
+        raise
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(MAX_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_manifest(release_dir, version):
+    """Build the per-file manifest (path, size, SHA-256, version) for a release directory."""
+    files = []
+    for relative_path in list_release_files(release_dir):
+        path = os.path.join(release_dir, relative_path)
+        files.append({
+            "path": relative_path,
+            "size": os.path.getsize(path),
+            "sha256": hash_file(path),
+            "version": version,
+        })
+    return {"version": version, "files": files}
+
+def get_manifest_path(relative_path):
+    """Convert a manifest path to a local relative path, rejecting paths that escape the install."""
+    local_path = os.path.normpath(relative_path.replace("/", os.sep))
+    # Drive-relative names such as C:evil.bat are not absolute, but still leave the folder on Windows
+    if ntpath.splitdrive(local_path)[0] or os.path.isabs(local_path) or os.pardir in local_path.split(os.sep):
+        raise ValueError(f"Unsafe path in manifest: {relative_path}")
+    return local_path
+
+def get_local_path(base_dir, relative_path):
+    """Join a manifest or archive path onto base_dir, checking that the result stays inside it."""
+    path = os.path.join(base_dir, get_manifest_path(relative_path))
+    root = os.path.realpath(base_dir)
+    if os.path.commonpath([root, os.path.realpath(path)]) != root:
+        raise ValueError(f"Unsafe path in manifest: {relative_path}")
+    return path
+
+def plan_delta_update(manifest, install_dir):
+    """
+    Compare the manifest with the local install.
+    Returns (changed entries, paths to remove, total bytes in the release); sizes are compared
+    before hashing. Only files the recorded release had (see read_release_record) are removed,
+    so files the user added are never touched.
+    """
+    changed = []
+    total_size = 0
+    for entry in manifest["files"]:
+        total_size += entry["size"]
+        local_path = get_local_path(install_dir, entry["path"])
+        if (not os.path.isfile(local_path) or os.path.getsize(local_path) != entry["size"]
+                or hash_file(local_path) != entry["sha256"]):
+            changed.append(entry)
+    release_paths = {entry["path"] for entry in manifest["files"]}
+    _, installed_files = read_release_record(install_dir)
+    removed = [path for path in sorted(installed_files - release_paths)
+               if os.path.isfile(get_local_path(install_dir, path))]
+    return changed, removed, total_size
+
+def apply_delta_update(delta_dir, install_dir, entries, removed=()):
+    """
+    Rename each downloaded file into the install and remove the files the release dropped.
+    The files it replaces or removes are kept until every rename has succeeded, and are
+    put back if one fails. delta_dir must be on the same volume as install_dir.
+    """
+    backup_dir = delta_dir + ".backup"
+    replaced = []
+    try:
+        for path in removed:
+            dest = get_local_path(install_dir, path)
+            backup = os.path.join(backup_dir, get_manifest_path(path))
+            os.makedirs(os.path.dirname(backup), exist_ok=True)
+            os.replace(dest, backup)
+            replaced.append((dest, backup))
+        for entry in entries:
+            local_path = get_manifest_path(entry["path"])
+            dest = get_local_path(install_dir, entry["path"])
+            backup = None
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.exists(dest):
+                backup = os.path.join(backup_dir, local_path)
+                os.makedirs(os.path.dirname(backup), exist_ok=True)
+                os.replace(dest, backup)
+            replaced.append((dest, backup))
+            os.replace(os.path.join(delta_dir, local_path), dest)
+    except OSError:
+        for dest, backup in reversed(replaced):
+            if backup and os.path.exists(backup):
+                os.replace(backup, dest)
+            elif backup is None and os.path.exists(dest):
+                os.remove(dest)  # Newly added by this update
+        raise
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    shutil.rmtree(delta_dir, ignore_errors=True)
+
+def fetch_published_digest(urls):
+    """
+    Return the SHA-256 published next to the archive (<url>.sha256) on the first mirror
+    that has one, or None if no reachable mirror publishes it.
+    """
+    error = None
+    answered = False
+    for url in urls:
+        try:
+            response = get_http_session().get(url + ".sha256")
+        except RETRYABLE_ERRORS as e:
+            error = e
+            continue
+        answered = True
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+        # sha256sum format: "<hex digest>  <file name>"
+        return response.text.split()[0].lower()
+    if error is not None and not answered:
+        raise error
+    return None
+
+def fetch_member_hashes(manifest_url):
+    """Return {path: sha256} from the published manifest, or None if it is not available."""
+    try:
+        response = get_http_session().get(manifest_url)
+        response.raise_for_status()
+        return {entry["path"]: entry["sha256"] for entry in response.json()["files"]}
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return None
+
+def extract_archive(zip_path, extract_path, member_hashes=None, progress_callback=None, cancel_event=None,
+                    workers=EXTRACT_WORKERS):
+    """
+    Extract every member of the archive, hashing each one as it is written.
+    With member_hashes, every file must be listed and match its SHA-256; the CRC-32 of every
+    member is checked by zipfile as it is read. Members are decompressed by a pool
+    of threads, largest first. progress_callback receives (uncompressed bytes
+    written, total uncompressed bytes). Returns {path: sha256}.
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        members = zip_ref.infolist()
+    total_size = sum(info.file_size for info in members)
+
+    # Check every member's path, and that the manifest lists it, before anything is written
+    dests = [get_local_path(extract_path, info.filename) for info in members]
+    if member_hashes:
+        for info in members:
+            if not info.is_dir() and info.filename not in member_hashes:
+                raise ValueError(f"{info.filename} is not in the release manifest")
+    files = []
+    for info, dest in zip(members, dests):
+        if info.is_dir():
+            os.makedirs(dest, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            files.append((info, dest))
+    # Largest first, so a big member never ends up decompressing alone at the end
+    files.sort(key=lambda item: item[0].file_size, reverse=True)
+
+    lock = threading.Lock()
+    failed = threading.Event()
+    local = threading.local()
+    handles = []
+    done_size = 0
+
+    def add_progress(count):
+        nonlocal done_size
+        with lock:
+            done_size += count
+            if progress_callback:
+                progress_callback(done_size, total_size)
+
+    def extract_member(info, dest):
+        # Handles to one ZipFile share a file position and lock, so each thread opens its own
+        if not hasattr(local, "zip_ref"):
+            local.zip_ref = zipfile.ZipFile(zip_path, "r")
+            with lock:
+                handles.append(local.zip_ref)
+        # Small members are read in one go; large ones in blocks up to MAX_READ_SIZE
+        block_size = min(max(info.file_size, MIN_READ_SIZE), MAX_READ_SIZE)
+        digest = hashlib.sha256()
+        with local.zip_ref.open(info) as src, open(dest, "wb", buffering=0) as dst:
+            for block in iter(lambda: src.read(block_size), b""):
+                if failed.is_set():
+                    return None
+                if cancel_event is not None and cancel_event.is_set():
+                    raise InstallCancelled()
+                digest.update(block)
+                dst.write(block)
+                add_progress(len(block))
+        path = info.filename.rstrip("/")
+        if member_hashes and member_hashes[path] != digest.hexdigest():
+            raise ValueError(f"Checksum mismatch for {path}")
+        return path, digest.hexdigest()
+
+    try:
+        if workers <= 1 or len(files) <= 1:
+            results = [extract_member(info, dest) for info, dest in files]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(extract_member, info, dest) for info, dest in files]
+                try:
+                    results = [future.result() for future in futures]
+                except BaseException:
+                    # Stop the other workers before the error propagates
+                    failed.set()
+                    for future in futures:
+                        future.cancel()
+                    raise
+    finally:
+        for handle in handles:
+            handle.close()
+    return dict(results)
+
+def get_uncompressed_size(zip_path):
+    """Return the total uncompressed size of an archive from its central directory."""
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        return sum(info.file_size for info in zip_ref.infolist())
+
+def close_related_applications():
+    """Attempt to close any applications that might be using the installed files."""
+    if platform.system() == "Windows":
+        try:
+            # Attempt to close any CookieBatch instances using taskkill
+            os.system("taskkill /f /im CookieBatch.exe 2>nul")
+            # Also try to close any Python instances that might be running it
+            os.system("taskkill /f /im python.exe /fi \"WINDOWTITLE eq CookieBatch*\" 2>nul")
+            return True
+        except Exception:
+            pass
+    return False
+
+def remove_stale_path(path, status_callback=None, cancel_event=None, close_apps=True, max_attempts=3):
+    """
+    Remove a file or folder left over from an earlier install, retrying while other
+    applications hold it open. The retries wait, so this runs on the worker threads.
+    """
+    for attempt in range(max_attempts):
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            return
+        except FileNotFoundError:
+            return  # If the file doesn't exist, that's fine
+        except PermissionError as e:
+            if attempt == max_attempts - 1:
+                raise PermissionError(f"Failed to clean up temporary files: {e}") from e
+            if status_callback:
+                status_callback("Retrying file operation...")
+            if close_apps:
+                close_related_applications()  # Try to close apps again
+            # Wait a second before retry, returning early on cancel
+            if cancel_event is not None and cancel_event.wait(1):
+                raise DownloadCancelled()
+
+def create_desktop_shortcut(install_path):
+    """Create a desktop shortcut for the installed application and return its path."""
+    # Find the main script or executable
+    possible_scripts = [
+        os.path.join(install_path, "CookieBatch.exe"),
+    ]   
+
+    script_path = None
+    for script in possible_scripts:
+        if os.path.exists(script):
+            script_path = script
+            break
+
+    if not script_path:
+        # Check for any Python script in the directory
+        for file in os.listdir(install_path):
+            if file.endswith('.py'):
+                script_path = os.path.join(install_path, file)
+                break
+
+    if not script_path:
+        raise ValueError("No Python script or executable found in the installation directory")
+
+    # Use winshell to create desktop shortcut on Windows
+    desktop = winshell.desktop()
+    path = os.path.join(desktop, "CookieBatch.lnk")
+
+    # Try to remove existing shortcut if it exists
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except PermissionError:
+            # If we can't remove it, just create a new one with a different name
+            path = os.path.join(desktop, "CookieBatch (New).lnk")
+
+    # Use python executable to run the script if it's a .py file
+    if script_path.endswith('.py'):
+        target = sys.executable
+        arguments = f'"{script_path}"'
+    else:
+        target = script_path
+        arguments = ""
+
+    winshell.CreateShortcut(
+        Path=path,
+        Target=target,
+        Arguments=arguments,
+        Icon=(script_path, 0),
+        Description="CookieBatch - Python Batch Code Obfuscator",
+        StartIn=os.path.dirname(script_path)  # Set working directory to script location
+    )
+    return path
+
+def format_eta(seconds):
+    """Format a remaining time for the status label."""
+    seconds = int(seconds + 0.5)
+    if seconds < 60:
+        return f"{seconds} s"
+    return f"{seconds // 60} min {seconds % 60} s"
+
+def get_release_file_url(archive_url, name):
+    """Return the URL of a file published next to the archive, on the same server or share."""
+    return urllib.parse.urljoin(archive_url, name)
+
+def fetch_release_version(version_url=VERSION_URL):
+    """Return the published release version, or None if it cannot be fetched."""
+    try:
+        response = get_http_session().get(version_url)
+        response.raise_for_status()
+        return response.text.strip()
+    except requests.exceptions.RequestException:
+        return None
+
+class DownloadCache:
+    """
+    Content-addressed cache of release archives. Archives are stored once per SHA-256 and
+    an index maps each URL to its archive, version and the HTTP validators of each mirror
+    that served it. The least recently used archives are evicted when the cache grows past
+    max_bytes.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.entries = self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def blob_path(self, sha256):
+        return os.path.join(self.cache_dir, sha256 + ".zip")
+
+    def lookup(self, url):
+        """Return the cache entry for url, or None if there is no usable cached copy."""
+        entry = self.entries.get(url)
+        if entry and os.path.isfile(self.blob_path(entry["sha256"])):
+            return entry
+        return None
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        Headers that let each source answer 304 Not Modified for the cached copy, as
+        {source: headers}. Validators are only sent to the source that issued them.
+        """
+        conditional_headers = {}
+        for source, validators in entry.get("validators", {}).items():
+            headers = {}
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+            conditional_headers[source] = headers
+        return conditional_headers
+
+    def copy_to(self, url, dest_path):
+        """Copy the cached archive for url to dest_path."""
+        # Always a real copy: a hard link would let later writes to dest_path corrupt the cache
+        entry = self.entries[url]
+        shutil.copyfile(self.blob_path(entry["sha256"]), dest_path)
+        entry["last_used"] = time.time()
+        self.save_index()
+
+    def store(self, url, path, validators, version=None, sha256=None, verified=False):
+        """
+        Add a downloaded archive to the cache and evict old entries if needed.
+        validators maps each source to its {"etag", "last_modified"}; those of other
+        sources are kept while the archive is unchanged. verified records whether it
+        matched a published SHA-256.
+        """
+        sha256 = sha256 or hash_file(path)
+        blob_path = self.blob_path(sha256)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if not os.path.exists(blob_path):
+            temp_path = blob_path + ".tmp"
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, blob_path)
+
+        previous = self.entries.get(url)
+        if previous and previous["sha256"] == sha256:
+            validators = {**previous.get("validators", {}), **validators}
+            version = version or previous.get("version")
+            verified = verified or previous.get("verified", False)
+        self.entries[url] = {
+            "sha256": sha256,
+            "size": os.path.getsize(blob_path),
+            "validators": validators,
+            "version": version,
+            "verified": verified,
+            "last_used": time.time(),
+        }
+        self.evict()
+        self.save_index()
+
+    def evict(self):
+        """Drop least recently used entries until the cached archives fit in max_bytes."""
+        def total_size():
+            return sum({entry["sha256"]: entry["size"] for entry in self.entries.values()}.values())
+
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total_size() <= self.max_bytes or len(self.entries) == 1:
+                break
+            del self.entries[url]
+            # Archives are shared between URLs with the same content
+            if all(other["sha256"] != entry["sha256"] for other in self.entries.values()):
+                try:
+                    os.remove(self.blob_path(entry["sha256"]))
+                except OSError:
+                    pass
+
+# Pooled HTTP session shared by all downloads, created on first use
+http_session = None
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter that applies the connect and read timeouts to every request."""
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        return super().send(request, **kwargs)
+
+class FileRange:
+    """Readable window of a local file, used as the body of a file:// response."""
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1, **kwargs):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+class LocalFileAdapter(requests.adapters.BaseAdapter):
+    """
+    Serves file:// URLs (local folders and UNC file shares) like an HTTP server with
+    byte range support, so mirrors on file shares go through the same download code.
+    """
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.raw = FileRange(io.BytesIO(), 0)
+        path = get_local_source_path(request.url)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            response.status_code = 404
+            return response
+        except OSError as e:
+            # An unreachable share behaves like an unreachable server
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        size = os.fstat(file.fileno()).st_size
+        last_modified = email.utils.formatdate(os.fstat(file.fileno()).st_mtime, usegmt=True)
+        start, end = 0, size
+        response.status_code = 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+        if match and request.headers.get("If-Range", last_modified) == last_modified:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1, size) if match.group(2) else size
+            if start >= size:
+                file.close()
+                response.status_code = 416
+                response.headers["Content-Range"] = f"bytes */{size}"
+                return response
+            response.status_code = 206
+            response.headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        response.headers.update({"Content-Length": str(end - start), "Accept-Ranges": "bytes",
+                                 "Last-Modified": last_modified})
+        if request.method == "HEAD":
+            file.close()
+            return response
+        file.seek(start)
+        response.raw = FileRange(file, end - start)
+        return response
+
+    def close(self):
+        pass
+
+def get_http_session():
+    """Return the pooled session so repeated and segmented requests reuse connections."""
+    global http_session
+    if http_session is None:
+        http_session = requests.Session()
+        adapter = TimeoutHTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_SEGMENTS * 2)
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+        http_session.mount("file://", LocalFileAdapter())
+        # Byte ranges must refer to the file itself, not a compressed transfer encoding
+        http_session.headers["Accept-Encoding"] = "identity"
+    return http_session
+
+def get_mirror_url(mirror):
+    """Return a URL for a mirror given as a URL or as a local or UNC path."""
+    if urllib.parse.urlparse(mirror).scheme in ("http", "https", "file"):
+        return mirror
+    return pathlib.Path(mirror).resolve().as_uri()
+
+def probe_mirror(url):
+    """
+    Time a small read from a mirror. Returns (estimated seconds for PROBE_BYTES, file size),
+    or None if the mirror cannot serve the file.
+    """
+    started = time.monotonic()
+    try:
+        with get_http_session().get(url, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"}, stream=True,
+                                    timeout=(PROBE_TIMEOUT, PROBE_TIMEOUT)) as response:
+            if response.status_code == 206:
+                size = int(response.headers.get("Content-Range", "*/0").rsplit("/", 1)[-1] or 0)
+            elif response.status_code == 200:
+                size = int(response.headers.get("content-length", 0))
+            else:
+                return None
+            # Read the probe window, or as much of it as arrives in time
+            received = 0
+            for chunk in response.iter_content(MIN_READ_SIZE):
+                received += len(chunk)
+                if received >= PROBE_BYTES or time.monotonic() - started > PROBE_TIMEOUT:
+                    break
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError):
+        return None
+    elapsed = time.monotonic() - started
+    return elapsed * PROBE_BYTES / max(1, min(received, PROBE_BYTES)), size
+
+def rank_mirrors(urls):
+    """
+    Probe every mirror in parallel and return the usable ones, fastest first.
+    Mirrors with a different file size than the fastest one are dropped, since a
+    download can only be continued on another mirror that has the same file.
+    """
+    if len(urls) == 1:
+        return list(urls)
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        results = list(executor.map(probe_mirror, urls))
+    ranked = sorted((result[0], url, result[1]) for url, result in zip(urls, results) if result)
+    if not ranked:
+        raise requests.exceptions.ConnectionError("No download mirror is reachable.")
+    for url, result in zip(urls, results):
+        if result is None:
+            print(f"Mirror unavailable: {url}")
+    expected_size = ranked[0][2]
+    usable = []
+    for seconds, url, size in ranked:
+        if expected_size and size and size != expected_size:
+            print(f"Skipping mirror {url}: it has a different file ({size} bytes, expected {expected_size})")
+            continue
+        print(f"Mirror {url}: {seconds:.2f} s per {PROBE_BYTES // 1024} KB")
+        usable.append(url)
+    return usable
+
+class InstallCancelled(Exception):
+    """Raised inside the install pipeline when the user cancels."""
+
+class DownloadCancelled(Exception):
+    """Raised when a download is cancelled."""
+
+class UnverifiedDownload(ValueError):
+    """Raised when no SHA-256 is published for the archive and unverified downloads are not allowed."""
+
+class InstallReport:
+    """
+    Wall time, bytes, throughput and retry counts for each install stage, so slow
+    stages can be tracked across machines. Stages are timed with stage(); what a
+    stage measures is added with record(). Safe to share between threads.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def get_stage(self, name):
+        with self.lock:
+            return self.stages.setdefault(name, {"stage": name, "status": None, "seconds": 0.0, "bytes": 0, "retries": 0})
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a stage; a stage entered again adds to its time."""
+        entry = self.get_stage(name)
+        started = time.monotonic()
+        status = "failed"
+        try:
+            yield entry
+            status = "ok"
+        except (InstallCancelled, DownloadCancelled):
+            status = "cancelled"
+            raise
+        finally:
+            with self.lock:
+                entry["seconds"] += time.monotonic() - started
+                entry["status"] = status
+
+    def record(self, name, byte_count=0, retries=0, **details):
+        """Add bytes processed and retries to a stage, plus any details worth keeping."""
+        entry = self.get_stage(name)
+        with self.lock:
+            entry["bytes"] += byte_count
+            entry["retries"] += retries
+            entry.update(details)
+
+    def to_dict(self):
+        with self.lock:
+            stages = [dict(entry) for entry in self.stages.values()]
+        for entry in stages:
+            seconds = entry["seconds"]
+            entry["seconds"] = round(seconds, 3)
+            entry["bytes_per_second"] = round(entry["bytes"] / seconds) if entry["bytes"] and seconds > 0 else None
+        return {"started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+                "seconds": round(time.time() - self.started, 3), "stages": stages}
+
+def append_install_report(report, path=INSTALL_REPORT_PATH):
+    """Append a finished install report to the report log; failures are only logged."""
+    line = json.dumps(report)
+    print(f"Install report: {line}")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"Report warning: {e}")
+
+class DownloadEngine:
+    """
+    Resumable downloader. Partial data is kept in <save_path>.part and resumed with
+    HTTP Range requests, large files can be fetched as parallel segments, and
+    progress is reported at most every PROGRESS_INTERVAL seconds. When a source
+    keeps failing, the download continues from the same byte on the next mirror.
+    """
+    def __init__(self, progress_callback=None, segments=DOWNLOAD_SEGMENTS, retries=DOWNLOAD_RETRIES, session=None,
+                 cancel_event=None, mirrors=None):
+        self.progress_callback = progress_callback
+        self.mirrors = list(mirrors or [])
+        self.sources = []
+        self.source_index = 0
+        self.validator_source = None  # If-Range validators only mean something to the server that sent them
+        self.segments = segments
+        self.retries = retries
+        self.session = session or get_http_session()
+        self.cancel_event = cancel_event or threading.Event()
+        self.lock = threading.Lock()
+        self.downloaded = 0
+        self.resumed = 0  # Bytes already on disk from an earlier attempt
+        self.retry_count = 0
+        self.failovers = 0
+        self.total_size = 0
+        self.last_progress_time = 0.0
+        self.validators = {}
+        self.sha256 = None  # Digest of the downloaded file, computed while or right after downloading
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def download(self, url, save_path, conditional_headers=None):
+        """
+        Download url to save_path, resuming a previous partial download if possible.
+        conditional_headers maps sources to the headers that revalidate a cached copy with them.
+        Returns None without downloading if a source answers that the cached copy is current.
+        """
+        part_path = save_path + ".part"
+        state_path = part_path + ".json"
+        self.sources = [url] + [mirror for mirror in self.mirrors if mirror != url]
+        self.source_index = 0
+
+        # Only resume data that was downloaded from one of the same sources
+        state = self.load_state(state_path)
+        offset = 0
+        if state and state.get("url") in self.sources and os.path.exists(part_path):
+            if state.get("segmented"):
+                # Segments fill a preallocated file out of order, so its size says nothing about what arrived
+                print("Discarding an interrupted segmented download")
+            else:
+                offset = os.path.getsize(part_path)
+
+        while True:
+            source = self.current_source()
+            headers = dict((conditional_headers or {}).get(source, {}))
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if state.get("validator") and state.get("url") == source:
+                    headers["If-Range"] = state["validator"]
+            try:
+                response = self.open_with_retries(source, headers)
+                if response.status_code >= 400 and response.status_code != 416:
+                    response.close()
+                    response.raise_for_status()
+                break
+            except (requests.exceptions.HTTPError,) + RETRYABLE_ERRORS as e:
+                self.fail_over(source, e)
+
+        if response.status_code == 304:
+            # Not modified since the cached copy was downloaded
+            response.close()
+            return None
+
+        if response.status_code == 416 and offset and offset == state.get("total_size"):
+            # The partial file is already complete
+            response.close()
+            total_size = offset
+            self.validator_source = state["url"]
+            self.validators = state.get("validators", {})
+        else:
+            response.raise_for_status()
+            if response.status_code == 206:
+                total_size = int(response.headers.get("Content-Range", "*/0").rsplit("/", 1)[-1] or 0)
+            else:
+                # Full response: the file changed or the server ignores ranges, so start over
+                offset = 0
+                total_size = int(response.headers.get("content-length", 0))
+                open(part_path, "wb").close()
+
+            validator = self.get_validator(response)
+            self.validator_source = source
+            self.validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            supports_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            segmented = offset == 0 and self.segments > 1 and supports_ranges and total_size >= MIN_SEGMENT_SIZE
+            self.save_state(state_path, {"url": source, "validator": validator, "total_size": total_size,
+                                         "validators": self.validators, "segmented": segmented})
+            self.total_size = total_size
+            self.downloaded = offset
+            self.resumed = offset
+
+            if segmented:
+                response.close()
+                try:
+                    self.download_segments(part_path, total_size, validator)
+                except BaseException:
+                    # A partly filled preallocated file cannot be resumed, so do not keep it
+                    for path in (part_path, state_path):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    raise
+            else:
+                # Hash blocks as they arrive; only a resumed prefix has to be read back
+                digest = hashlib.sha256()
+                if offset:
+                    with open(part_path, "rb") as f:
+                        for block in iter(lambda: f.read(MAX_READ_SIZE), b""):
+                            digest.update(block)
+                self.download_range(part_path, offset, total_size or None, validator, response, digest)
+                self.sha256 = digest.hexdigest()
+
+        if total_size and os.path.getsize(part_path) != total_size:
+            raise ValueError("Download incomplete: size does not match the server.")
+
+        os.replace(part_path, save_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        self.report_progress()
+        return os.path.getsize(save_path)
+
+    def download_segments(self, part_path, total_size, validator):
+        """
+        Fetch the file as parallel byte ranges written into a preallocated file, then set
+        sha256. The first segment is hashed as it arrives, the others are read back in order.
+        """
+        with open(part_path, "wb") as file:
+            file.truncate(total_size)
+
+        segment_size = -(-total_size // self.segments)
+        ranges = [(start, min(start + segment_size, total_size)) for start in range(0, total_size, segment_size)]
+        digest = hashlib.sha256()
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(self.download_range, part_path, start, end, validator,
+                                       digest=digest if start == 0 else None) for start, end in ranges]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Stop the other segments before reporting the failure
+                self.cancel_event.set()
+                raise
+
+        with open(part_path, "rb") as f:
+            f.seek(ranges[0][1])
+            for block in iter(lambda: f.read(MAX_READ_SIZE), b""):
+                if self.cancel_event.is_set():
+                    raise DownloadCancelled()
+                digest.update(block)
+        self.sha256 = digest.hexdigest()
+
+    def download_range(self, path, start, end, validator=None, response=None, digest=None):
+        """
+        Write bytes [start, end) of the file into path at the same offset, resuming from the
+        last written byte after a dropped connection, on the next mirror if the current one
+        keeps failing. end is None when the size is unknown.
+        """
+        position = start
+        attempt = 0
+        source = self.current_source()
+        while True:
+            try:
+                if response is None:
+                    source = self.current_source()
+                    headers = {"Range": f"bytes={position}-" + (str(end - 1) if end else "")}
+                    if validator and source == self.validator_source:
+                        headers["If-Range"] = validator
+                    response = self.session.get(source, headers=headers, stream=True)
+                    if response.status_code != 206:
+                        response.close()
+                        response.raise_for_status()
+                        raise ValueError("Server does not support resuming this download.")
+
+                with response, open(path, "r+b") as file:
+                    file.seek(position)
+                    read_size = MIN_READ_SIZE
+                    while end is None or position < end:
+                        if self.cancel_event.is_set():
+                            raise DownloadCancelled()
+                        started = time.monotonic()
+                        data = response.raw.read(read_size)
+                        if not data:
+                            break
+                        if end is not None:
+                            data = data[:end - position]
+                        file.write(data)
+                        if digest is not None:
+                            digest.update(data)
+                        position += len(data)
+                        attempt = 0  # Progress was made, so the retry budget starts over
+                        self.add_progress(len(data))
+
+                        # Grow the buffer while reads complete quickly, shrink it when they stall
+                        elapsed = time.monotonic() - started
+                        if elapsed < 0.05 and len(data) == read_size:
+                            read_size = min(read_size * 2, MAX_READ_SIZE)
+                        elif elapsed > 0.5:
+                            read_size = max(read_size // 2, MIN_READ_SIZE)
+
+                if end is None or position >= end:
+                    return position
+                raise requests.exceptions.ChunkedEncodingError("Connection closed before the download finished.")
+            except RETRYABLE_ERRORS as e:
+                # Keep the bytes already written and ask for the rest
+                response = None
+                attempt += 1
+                if self.cancel_event.is_set():
+                    raise
+                if attempt >= self.retries:
+                    self.fail_over(source, e)
+                    attempt = 0
+                else:
+                    self.count_retry()
+                    time.sleep(min(2 ** attempt, 8))
+            except (requests.exceptions.HTTPError, ValueError) as e:
+                # This source cannot serve the range at all; continue on the next mirror
+                response = None
+                if self.cancel_event.is_set():
+                    raise DownloadCancelled()
+                self.fail_over(source, e)
+                attempt = 0
+
+    def current_source(self):
+        with self.lock:
+            return self.sources[self.source_index]
+
+    def fail_over(self, failed_source, error):
+        """Move on to the next mirror after failed_source stopped working; re-raises error if none is left."""
+        with self.lock:
+            if self.sources[self.source_index] != failed_source:
+                return  # Another segment already moved on
+            if self.source_index + 1 >= len(self.sources):
+                raise error
+            self.source_index += 1
+            self.failovers += 1
+            print(f"Download source failed ({error}), continuing from {self.sources[self.source_index]}")
+
+    def open_with_retries(self, url, headers):
+        for attempt in range(1, self.retries + 1):
+            try:
+                return self.session.get(url, headers=headers, stream=True)
+            except RETRYABLE_ERRORS:
+                if attempt == self.retries or self.cancel_event.is_set():
+                    raise
+                self.count_retry()
+                time.sleep(min(2 ** attempt, 8))
+
+    def count_retry(self):
+        with self.lock:
+            self.retry_count += 1
+
+    def add_progress(self, count):
+        with self.lock:
+            self.downloaded += count
+            now = time.monotonic()
+            if now - self.last_progress_time < PROGRESS_INTERVAL:
+                return
+            self.last_progress_time = now
+        self.report_progress()
+
+    def report_progress(self):
+        if self.progress_callback:
+            self.progress_callback(self.downloaded, self.total_size)
+
+    @staticmethod
+    def get_validator(response):
+        """Return a validator for If-Range: a strong ETag, or else Last-Modified."""
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified")
+
+    @staticmethod
+    def load_state(state_path):
+        try:
+            with open(state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def save_state(state_path, state):
+        with open(state_path, "w") as f:
+            json.dump(state, f)
+
+def download_release_archive(url, save_path, cache=None, progress_callback=None, cancel_event=None, mirrors=None,
+                             report=None, allow_unverified=False, status_callback=None):
+    """
+    Download (or revalidate from the cache) the release archive at url into save_path,
+    checking it against the published SHA-256. Without one, the download is refused
+    unless allow_unverified is set, in which case status_callback is warned instead.
+    The fastest of url and mirrors is used, with the others as fallbacks. Stage timings
+    go to report if given. Returns the published member hashes, or None if there is no manifest.
+    """
+    report = report or InstallReport()
+    # Create directory for the download file if it doesn't exist
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
+    # Check if we have permission to write to the target file
+    try:
+        with open(save_path, 'w') as test_file:
+            test_file.write("test")
+    except PermissionError:
+        raise PermissionError("Permission denied when writing to download location.") from None
+
+    # Remove test file if it was created
+    if os.path.exists(save_path):
+        os.remove(save_path)
+
+    # Revalidate a cached copy instead of downloading it again
+    cached_entry = cache.lookup(url) if cache else None
+    conditional_headers = DownloadCache.conditional_headers(cached_entry) if cached_entry else None
+
+    # Fastest reachable mirror first, then the published digest for the archive
+    sources = []
+    try:
+        with report.stage("resolve"):
+            sources = rank_mirrors([url] + [get_mirror_url(mirror) for mirror in mirrors or [] if mirror != url])
+            expected_sha256 = fetch_published_digest(sources)
+        report.record("resolve", mirrors=len(sources))
+    except RETRYABLE_ERRORS:
+        if cached_entry is None:
+            raise
+        expected_sha256 = None
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise DownloadCancelled()
+
+    # Download with resume and throttled progress; the engine hashes what it downloads
+    engine = DownloadEngine(progress_callback=progress_callback, cancel_event=cancel_event, mirrors=sources[1:])
+    used_source = None  # The source that served or revalidated the archive
+    try:
+        if not sources:
+            raise requests.exceptions.ConnectionError("No download mirror is reachable.")
+        with report.stage("download"):
+            try:
+                downloaded_size = engine.download(sources[0], save_path, conditional_headers)
+            finally:
+                report.record("download", engine.downloaded - engine.resumed, engine.retry_count,
+                              source=engine.current_source(), failovers=engine.failovers,
+                              resumed_bytes=engine.resumed)
+        used_source = engine.current_source()
+    except RETRYABLE_ERRORS:
+        if cached_entry is None:
+            raise
+        print("Server unreachable, installing from the download cache")
+        downloaded_size = None
+
+    with report.stage("verify"):
+        if downloaded_size is None:
+            actual_sha256 = cached_entry["sha256"]
+        elif engine.sha256:
+            actual_sha256 = engine.sha256  # Hashed while it downloaded
+        else:
+            actual_sha256 = hash_file(save_path)
+            report.record("verify", downloaded_size)
+
+        # Check the archive before anything is extracted
+        if expected_sha256 and actual_sha256 != expected_sha256:
+            if downloaded_size is not None:
+                os.remove(save_path)
+            raise ValueError("checksum does not match the published SHA-256.")
+        # Offline, a cached copy that was checked when it was stored is still trusted
+        verified = bool(expected_sha256) or (downloaded_size is None and cached_entry.get("verified", False))
+        report.record("verify", verified=verified)
+        if not verified:
+            if not allow_unverified:
+                if downloaded_size is not None:
+                    os.remove(save_path)
+                raise UnverifiedDownload("No SHA-256 is published for the release archive, so it cannot be "
+                                         "verified. Allow unverified downloads to install it anyway.")
+            if status_callback:
+                status_callback("Warning: no SHA-256 is published for the release archive; installing it unverified.")
+
+    if downloaded_size is None:
+        with report.stage("cache"):
+            cache.copy_to(url, save_path)
+        report.record("cache", os.path.getsize(save_path), from_cache=True)
+        print(f"Using cached archive (version {cached_entry.get('version') or 'unknown'})")
+        if progress_callback:
+            progress_callback(1, 1)
+    elif cache:
+        with report.stage("cache"):
+            # Validators and version belong to the source that served the archive, which may be a mirror
+            version = fetch_release_version(get_release_file_url(used_source, "installverification.txt"))
+            cache.store(url, save_path, {engine.validator_source: engine.validators}, version, actual_sha256,
+                        verified)
+        report.record("cache", downloaded_size, from_cache=False)
+
+    # Verify the downloaded file
+    if not os.path.exists(save_path) or os.path.getsize(save_path) == 0:
+        raise ValueError("File is empty or doesn't exist.")
+
+    # Member hashes come from the manifest published next to the archive that was used
+    if used_source is None:
+        return None
+    with report.stage("resolve"):
+        return fetch_member_hashes(get_release_file_url(used_source, "manifest.json"))
+
 class DownloadThread(QThread):
     """Thread to handle file download with progress updates."""
     progress_updated = pyqtSignal(int)
+    status_changed = pyqtSignal(str)
     download_complete = pyqtSignal()
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, url, save_path):
+    def __init__(self, url, save_path, cache=None, mirrors=None, report=None, allow_unverified=False,
+                 stale_paths=(), close_apps=True):
         super().__init__()
         self.url = url
         self.save_path = save_path
+        self.cache = cache
+        self.mirrors = mirrors
+        self.report = report
+        self.allow_unverified = allow_unverified
+        self.stale_paths = stale_paths  # Left over from an earlier install; removed before downloading
+        self.close_apps = close_apps
+        self.member_hashes = None
+        self.cancel_event = threading.Event()
+
+    def on_progress(self, downloaded_size, total_size):
+        """Emit download progress as a percentage."""
+        if total_size > 0:
+            self.progress_updated.emit(int((downloaded_size / total_size) * 100))
+
+    def cancel(self):
+        self.cancel_event.set()
         
     def run(self):
         try:
-            # Create directory for the download file if it doesn't exist
-            os.makedirs(os.path.dirname(self.save_path), exist_ok=True)
-            
-            # Check if we have permission to write to the target file
-            try:
-                with open(self.save_path, 'w') as test_file:
-                    test_file.write("test")
-            except PermissionError:
-                self.error_occurred.emit("Permission denied when writing to download location.")
-                return
-                
-            # Remove test file if it was created
-            if os.path.exists(self.save_path):
-                os.remove(self.save_path)
-                
-            # Send a GET request to the URL
-            response = requests.get(self.url, stream=True)
-            response.raise_for_status()
-
-            # Get the total file size
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024  # 1 Kibibyte
-            downloaded_size = 0
-
-            # Open the file and write downloaded content
-            with open(self.save_path, 'wb') as file:
-                for data in response.iter_content(block_size):
-                    file.write(data)
-                    downloaded_size += len(data)
-                    
-                    # Calculate and emit progress
-                    if total_size > 0:
-                        progress = int((downloaded_size / total_size) * 100)
-                        self.progress_updated.emit(progress)
-
-            # Verify the downloaded file
-            if not os.path.exists(self.save_path) or os.path.getsize(self.save_path) == 0:
-                self.error_occurred.emit("Download failed: File is empty or doesn't exist.")
-                return
-                
+            for path in self.stale_paths:
+                remove_stale_path(path, self.status_changed.emit, self.cancel_event, self.close_apps)
+            self.member_hashes = download_release_archive(self.url, self.save_path, self.cache,
+                                                          self.on_progress, self.cancel_event, self.mirrors,
+                                                          self.report, self.allow_unverified,
+                                                          self.status_changed.emit)
             # Emit download complete signal
             self.download_complete.emit()
 
-        except requests.exceptions.ConnectionError:
-            self.error_occurred.emit("Connection error: Please check your internet connection.")
+        except DownloadCancelled:
+            self.error_occurred.emit("Download cancelled.")
         except requests.exceptions.HTTPError as e:
             self.error_occurred.emit(f"HTTP error: {str(e)}")
-        except PermissionError:
-            self.error_occurred.emit("Permission denied when writing files.")
+        except RETRYABLE_ERRORS:
+            self.error_occurred.emit("Connection error: Please check your internet connection.")
+        except PermissionError as e:
+            # OS errors carry (errno, strerror); the download location check carries a message
+            self.error_occurred.emit(e.args[0] if len(e.args) == 1 else "Permission denied when writing files.")
         except Exception as e:
             self.error_occurred.emit(f"Download failed: {str(e)}")
 
+class DeltaUpdateThread(QThread):
+    """Thread that updates an existing install by downloading only the files that changed."""
+    progress_updated = pyqtSignal(int)
+    status_changed = pyqtSignal(str)
+    update_complete = pyqtSignal(dict)
+    full_install_required = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, manifest_url, install_dir, delta_dir, report=None, stale_paths=(), close_apps=True):
+        super().__init__()
+        self.manifest_url = manifest_url
+        self.install_dir = install_dir
+        self.delta_dir = delta_dir
+        self.report = report or InstallReport()
+        self.stale_paths = stale_paths  # Left over from an earlier install; removed before updating
+        self.close_apps = close_apps
+        self.completed_bytes = 0
+        self.changed_bytes = 0
+        self.engine = None
+        self.cancel_event = threading.Event()
+
+    def on_progress(self, downloaded_size, total_size):
+        if self.changed_bytes > 0:
+            self.progress_updated.emit(int(((self.completed_bytes + downloaded_size) / self.changed_bytes) * 100))
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.engine is not None:
+            self.engine.cancel()
+
+    def run(self):
+        try:
+            for path in self.stale_paths:
+                remove_stale_path(path, self.status_changed.emit, self.cancel_event, self.close_apps)
+            with self.report.stage("delta_manifest"):
+                response = get_http_session().get(self.manifest_url)
+                if response.status_code == 404:
+                    # No manifest published for this release
+                    self.full_install_required.emit()
+                    return
+                response.raise_for_status()
+                manifest = response.json()
+
+                changed, removed, total_size = plan_delta_update(manifest, self.install_dir)
+                self.changed_bytes = sum(entry["size"] for entry in changed)
+
+                # Downloads are renamed into place, which cannot cross volumes
+                os.makedirs(self.delta_dir, exist_ok=True)
+                if not can_swap_in(self.delta_dir, self.install_dir):
+                    print("Delta folder cannot be renamed into the install, doing a full install")
+                    shutil.rmtree(self.delta_dir, ignore_errors=True)
+                    self.full_install_required.emit()
+                    return
+
+            # Download every changed file and check it before touching the install
+            for entry in changed:
+                if self.cancel_event.is_set():
+                    raise DownloadCancelled()
+                save_path = get_local_path(self.delta_dir, entry["path"])
+                os.makedirs(os.path.dirname(save_path), exist_ok=True)
+                url = entry.get("url") or urllib.parse.urljoin(self.manifest_url, urllib.parse.quote(entry["path"]))
+                self.engine = DownloadEngine(progress_callback=self.on_progress, segments=1)
+                with self.report.stage("delta_download"):
+                    try:
+                        self.engine.download(url, save_path)
+                    finally:
+                        self.report.record("delta_download", self.engine.downloaded - self.engine.resumed,
+                                           self.engine.retry_count)
+                with self.report.stage("delta_verify"):
+                    # Hashed as it downloaded; only a file completed by an earlier attempt is read back
+                    if (self.engine.sha256 or hash_file(save_path)) != entry["sha256"]:
+                        raise ValueError(f"Checksum mismatch for {entry['path']}")
+                self.report.record("delta_verify", entry["size"])
+                self.completed_bytes += entry["size"]
+
+            # Last point at which a cancel leaves the install untouched
+            if self.cancel_event.is_set():
+                raise DownloadCancelled()
+            with self.report.stage("delta_install"):
+                apply_delta_update(self.delta_dir, self.install_dir, changed, removed)
+                write_release_record(self.install_dir, [entry["path"] for entry in manifest["files"]])
+            self.report.record("delta_install", self.changed_bytes, files=len(changed), removed=len(removed))
+            self.update_complete.emit({
+                "version": manifest.get("version"),
+                "files_updated": len(changed),
+                "files_removed": len(removed),
+                "bytes_downloaded": self.changed_bytes,
+                "bytes_saved": total_size - self.changed_bytes,
+            })
+
+        except DownloadCancelled:
+            shutil.rmtree(self.delta_dir, ignore_errors=True)
+            self.error_occurred.emit("Update cancelled.")
+        except requests.exceptions.HTTPError as e:
+            self.error_occurred.emit(f"HTTP error: {str(e)}")
+        except RETRYABLE_ERRORS:
+            self.error_occurred.emit("Connection error: Please check your internet connection.")
+        except PermissionError as e:
+            # OS errors carry (errno, strerror); the stale file cleanup carries a message
+            self.error_occurred.emit(e.args[0] if len(e.args) == 1 else "Permission denied when writing files.")
+        except Exception as e:
+            self.error_occurred.emit(f"Update failed: {str(e)}")
+
+class StageProgress:
+    """
+    Overall install progress across stages, weighted by the bytes each stage handles.
+    Stage sizes can be refined mid-install; the work left is then re-spread over the
+    rest of the bar, so progress never moves backwards.
+    """
+    def __init__(self, stage_sizes):
+        self.stage_sizes = dict(stage_sizes)
+        self.stage_done = {stage: 0.0 for stage in stage_sizes}
+        self.started = time.monotonic()
+        self.rebase()
+
+    def rebase(self, base=0.0):
+        self.base = base
+        self.base_done = dict(self.stage_done)
+        self.base_remaining = sum(size * (1 - self.base_done[stage]) for stage, size in self.stage_sizes.items())
+
+    def set_stage_size(self, stage, size):
+        """Change the weight of a stage, keeping the progress shown so far."""
+        current = self.fraction()
+        self.stage_sizes[stage] = size
+        self.rebase(current)
+
+    def fraction(self):
+        if self.base_remaining <= 0:
+            return 1.0
+        done = sum(size * (self.stage_done[stage] - self.base_done[stage]) for stage, size in self.stage_sizes.items())
+        return min(1.0, self.base + (1 - self.base) * done / self.base_remaining)
+
+    def update(self, stage, fraction):
+        """Record progress within a stage; returns (overall fraction, seconds left or None)."""
+        self.stage_done[stage] = max(self.stage_done[stage], min(1.0, fraction))
+        overall = self.fraction()
+        elapsed = time.monotonic() - self.started
+        # No estimate until some time has passed with some progress made
+        eta = elapsed * (1 - overall) / overall if overall > 0 and elapsed > 0 else None
+        return overall, eta
+
+class InstallPipeline:
+    """
+    Extracts, installs and cleans up a downloaded archive without touching any widgets.
+    A failure or cancel before the install finishes leaves the previous files in place
+    and is re-raised to the caller.
+    """
+    def __init__(self, zip_path, extract_path, install_dir, member_hashes=None, staged=True, close_apps=True,
+                 remove_archive=True, cancel_event=None, progress_callback=None, status_callback=None, report=None):
+        self.zip_path = zip_path
+        self.extract_path = extract_path
+        self.install_dir = install_dir
+        self.member_hashes = member_hashes
+        self.staged = staged
+        self.close_apps = close_apps
+        self.remove_archive = remove_archive  # False when the archive is shared by several installs
+        self.backup_dir = extract_path + ".backup"
+        self.cancel_event = cancel_event or threading.Event()
+        self.progress_callback = progress_callback or (lambda stage, fraction: None)
+        self.status_callback = status_callback or (lambda text: None)
+        self.report = report or InstallReport()
+        self.last_progress = 0
+        self.extracted_bytes = 0
+        # (installed path, backup of what it replaced or None) for rolling back
+        self.replaced = []
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise InstallCancelled()
+
+    def on_extract_progress(self, done_size, total_size):
+        """Report extraction progress, throttled like the download progress."""
+        self.extracted_bytes = done_size
+        now = time.monotonic()
+        if done_size == total_size or now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.progress_callback("extract", done_size / total_size if total_size else 1.0)
+
+    def run(self):
+        """Run every stage; raises InstallCancelled or the error after rolling back."""
+        try:
+            self.status_callback("Extracting files...")
+            with self.report.stage("extract"):
+                try:
+                    if not zipfile.is_zipfile(self.zip_path):
+                        raise ValueError("Downloaded file is not a valid ZIP archive.")
+
+                    # Extract files with progress, verifying each member as it is written
+                    os.makedirs(self.extract_path, exist_ok=True)
+                    extracted = extract_archive(self.zip_path, self.extract_path, self.member_hashes,
+                                                self.on_extract_progress, self.cancel_event)
+                finally:
+                    self.report.record("extract", self.extracted_bytes)
+                self.report.record("extract", files=len(extracted))
+                self.progress_callback("extract", 1.0)
+                if not os.listdir(self.extract_path):
+                    raise ValueError("Extraction failed: No files found.")
+
+            self.check_cancelled()
+            self.status_callback("Installing files...")
+
+            with self.report.stage("install"):
+                # Try to close any applications that might be using the files one more time
+                if self.close_apps:
+                    close_related_applications()
+
+                if self.staged and not can_swap_in(self.extract_path, self.install_dir):
+                    # Renames cannot cross volumes, and the previous version needs a writeable parent
+                    print("Staging folder cannot be swapped in, installing item by item")
+                    self.staged = False
+                    self.report.record("install", staged=False)
+                if self.staged:
+                    # Swap the staged tree in with renames; the old version is kept for rollback
+                    try:
+                        self.retry(lambda: swap_in_staged_install(self.extract_path, self.install_dir))
+                    except PermissionError:
+                        raise PermissionError(f"Permission denied when swapping in {self.install_dir}. Make sure no applications are using these files.")
+                else:
+                    self.install_items()
+                self.progress_callback("install", 1.0)
+
+        except BaseException:
+            with self.report.stage("rollback"):
+                self.rollback()
+            raise
+
+        # Clean up temporary files; the install itself is finished
+        self.status_callback("Cleaning up...")
+        with self.report.stage("cleanup"):
+            if self.remove_archive:
+                try:
+                    os.remove(self.zip_path)
+                except OSError as e:
+                    # Just log this error, don't abort the installation
+                    print(f"Cleanup warning: {e}")
+            shutil.rmtree(self.extract_path, ignore_errors=True)
+            shutil.rmtree(self.backup_dir, ignore_errors=True)
+
+    def install_items(self):
+        """Move extracted items into the install directory, setting replaced items aside."""
+        os.makedirs(self.install_dir, exist_ok=True)
+        items = os.listdir(self.extract_path)
+        for i, item in enumerate(items, 1):
+            self.check_cancelled()
+            src = os.path.join(self.extract_path, item)
+            dest = os.path.join(self.install_dir, item)
+            backup = None
+            try:
+                if os.path.lexists(dest):
+                    os.makedirs(self.backup_dir, exist_ok=True)
+                    backup = os.path.join(self.backup_dir, item)
+                    self.retry(lambda: shutil.move(dest, backup))
+                self.replaced.append((dest, backup))
+                self.retry(lambda: shutil.move(src, dest))
+            except PermissionError:
+                raise PermissionError(f"Permission denied when moving {item} to {dest}. Make sure no applications are using these files.")
+            self.progress_callback("install", i / len(items))
+
+    def retry(self, operation, max_attempts=3):
+        """Run a file operation, retrying while files are locked by other applications."""
+        for attempt in range(max_attempts):
+            try:
+                return operation()
+            except PermissionError:
+                if attempt == max_attempts - 1:
+                    raise
+                self.report.record("install", retries=1)
+                self.status_callback("Retrying file operation...")
+                if self.close_apps:
+                    close_related_applications()  # Try to close apps again
+                # Wait a second before retry, returning early on cancel
+                if self.cancel_event.wait(1):
+                    raise InstallCancelled()
+
+    def rollback(self):
+        """Put back anything the install replaced and remove the staging files."""
+        restored = True
+        for dest, backup in reversed(self.replaced):
+            try:
+                if os.path.isdir(dest) and not os.path.islink(dest):
+                    shutil.rmtree(dest)
+                elif os.path.lexists(dest):
+                    os.remove(dest)
+                if backup is not None:
+                    shutil.move(backup, dest)
+            except OSError as e:
+                restored = False
+                print(f"Rollback warning: {e}")
+        self.replaced = []
+        shutil.rmtree(self.extract_path, ignore_errors=True)
+        if restored:
+            shutil.rmtree(self.backup_dir, ignore_errors=True)
+        else:
+            print(f"Replaced files that could not be restored are kept in {self.backup_dir}")
+
+class InstallWorker(QThread):
+    """Runs an InstallPipeline off the GUI thread."""
+    stage_progress = pyqtSignal(str, float)
+    status_changed = pyqtSignal(str)
+    install_complete = pyqtSignal()
+    install_cancelled = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, zip_path, extract_path, install_dir, member_hashes=None, staged=True, close_apps=True,
+                 report=None):
+        super().__init__()
+        self.cancel_event = threading.Event()
+        self.pipeline = InstallPipeline(zip_path, extract_path, install_dir, member_hashes, staged, close_apps,
+                                        cancel_event=self.cancel_event,
+                                        progress_callback=self.stage_progress.emit,
+                                        status_callback=self.status_changed.emit,
+                                        report=report)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            self.pipeline.run()
+            self.install_complete.emit()
+        except InstallCancelled:
+            self.install_cancelled.emit()
+        except PermissionError as e:
+            self.error_occurred.emit(f"Permission denied: {str(e)}\nSome files may be locked by other applications.")
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
 class Installer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle(APP_NAME)
-        self.setFixedSize(500, 450)  # Slightly smaller since we don't need the admin button
+        self.setFixedSize(500, 535)  # Room for the staged install, delta update and verification options
         self.setStyleSheet(f"background-color: {BACKGROUND_COLOR};")
         
         # Title with larger font
@@ -272,14 +1846,47 @@ class Installer(QMainWindow):
         self.close_apps_checkbox.setStyleSheet(f"color: {TEXT_COLOR};")
         self.close_apps_checkbox.setChecked(True)
         main_layout.addWidget(self.close_apps_checkbox)
+
+        # Staged install checkbox
+        self.staged_install_checkbox = QCheckBox("Staged install (keep previous version for rollback)")
+        self.staged_install_checkbox.setStyleSheet(f"color: {TEXT_COLOR};")
+        self.staged_install_checkbox.setChecked(True)
+        main_layout.addWidget(self.staged_install_checkbox)
+
+        # Delta update checkbox
+        self.delta_update_checkbox = QCheckBox("Only download changed files when updating")
+        self.delta_update_checkbox.setStyleSheet(f"color: {TEXT_COLOR};")
+        self.delta_update_checkbox.setChecked(True)
+        main_layout.addWidget(self.delta_update_checkbox)
+
+        # Unverified download checkbox; off, so an archive without a published SHA-256 is refused
+        self.allow_unverified_checkbox = QCheckBox("Allow downloads without a published SHA-256")
+        self.allow_unverified_checkbox.setStyleSheet(f"color: {TEXT_COLOR};")
+        self.allow_unverified_checkbox.setChecked(False)
+        main_layout.addWidget(self.allow_unverified_checkbox)
         
-        # Install button
+        # Install and rollback buttons
+        button_layout = QHBoxLayout()
         self.install_button = QPushButton("Install")
         self.install_button.setMinimumHeight(50)
         self.install_button.setStyleSheet(BUTTON_STYLE)
         self.install_button.setEnabled(True)
         self.install_button.clicked.connect(self.start_installation)
-        main_layout.addWidget(self.install_button)
+        button_layout.addWidget(self.install_button, 3)
+
+        self.rollback_button = QPushButton("Roll Back")
+        self.rollback_button.setMinimumHeight(50)
+        self.rollback_button.setStyleSheet(BUTTON_STYLE)
+        self.rollback_button.clicked.connect(self.rollback_installation)
+        button_layout.addWidget(self.rollback_button, 1)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setMinimumHeight(50)
+        self.cancel_button.setStyleSheet(BUTTON_STYLE)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_installation)
+        button_layout.addWidget(self.cancel_button, 1)
+        main_layout.addLayout(button_layout)
         
         # Progress bar
         self.progress_bar = QProgressBar()
@@ -304,6 +1911,15 @@ class Installer(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
         
+        # Worker threads and progress of the running installation
+        self.download_thread = None
+        self.delta_thread = None
+        self.install_worker = None
+        self.install_report = None
+        self.stage_progress = None
+        self.stage_status = ""
+        self.cancel_requested = False
+
         # Set default install directory
         self.install_dir = DEFAULT_INSTALL_DIR
         self.path_input.setText(self.install_dir)
@@ -323,6 +1939,9 @@ class Installer(QMainWindow):
             if is_admin():
                 self.permission_label.setText("❌ No write permission even with admin rights")
 
+        # Rollback is only possible once a staged install kept a previous version
+        self.rollback_button.setEnabled(os.path.exists(get_previous_install_path(self.install_dir)))
+
     def select_install_path(self):
         """Opens a dialog to select an installation directory."""
         path = QFileDialog.getExistingDirectory(
@@ -340,71 +1959,12 @@ class Installer(QMainWindow):
         """Attempt to close any applications that might be using target files."""
         if not self.close_apps_checkbox.isChecked():
             return
-            
-        if platform.system() == "Windows":
-            try:
-                # Attempt to close any CookieBatch instances using taskkill
-                os.system("taskkill /f /im CookieBatch.exe 2>nul")
-                # Also try to close any Python instances that might be running it
-                os.system("taskkill /f /im python.exe /fi \"WINDOWTITLE eq CookieBatch*\" 2>nul")
-                return True
-            except Exception:
-                pass
-        return False
+        return close_related_applications()
 
     def create_desktop_shortcut(self, install_path):
         """Create desktop shortcut for the application."""
         try:
-            # Find the main script or executable
-            possible_scripts = [
-                os.path.join(install_path, "CookieBatch.exe"),
-            ]   
-        
-            script_path = None
-            for script in possible_scripts:
-                if os.path.exists(script):
-                    script_path = script
-                    break
-        
-            if not script_path:
-                # Check for any Python script in the directory
-                for file in os.listdir(install_path):
-                    if file.endswith('.py'):
-                        script_path = os.path.join(install_path, file)
-                        break
-        
-            if not script_path:
-                raise ValueError("No Python script or executable found in the installation directory")
-        
-            # Use winshell to create desktop shortcut on Windows
-            desktop = winshell.desktop()
-            path = os.path.join(desktop, "CookieBatch.lnk")
-        
-            # Try to remove existing shortcut if it exists
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except PermissionError:
-                    # If we can't remove it, just create a new one with a different name
-                    path = os.path.join(desktop, "CookieBatch (New).lnk")
-        
-            # Use python executable to run the script if it's a .py file
-            if script_path.endswith('.py'):
-                target = sys.executable
-                arguments = f'"{script_path}"'
-            else:
-                target = script_path
-                arguments = ""
-        
-            winshell.CreateShortcut(
-                Path=path,
-                Target=target,
-                Arguments=arguments,
-                Icon=(script_path, 0),
-                Description="CookieBatch - Python Batch Code Obfuscator",
-                StartIn=os.path.dirname(script_path)  # Set working directory to script location
-            )
-        
+            create_desktop_shortcut(install_path)
             return True
         except PermissionError:
             QMessageBox.warning(self, "Shortcut Creation Warning", 
@@ -415,52 +1975,20 @@ class Installer(QMainWindow):
                             f"Could not create desktop shortcut: {e}")
             return False
 
-    def safe_remove(self, path):
-        """Safely remove a file or directory with retries."""
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
-                else:
-                    os.remove(path)
-                return True
-            except PermissionError:
-                # If permission error, wait a bit and retry
-                if attempt < max_attempts - 1:
-                    self.status_label.setText(f"Retrying file operation...")
-                    self.close_related_applications()  # Try to close apps again
-                    import time
-                    time.sleep(1)  # Wait a second before retry
-                else:
-                    raise
-            except FileNotFoundError:
-                # If the file doesn't exist, that's fine
-                return True
-        return False
-
-    def safe_move(self, src, dest):
-        """Safely move files with retries."""
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                # If destination exists, try to remove it first
-                if os.path.exists(dest):
-                    self.safe_remove(dest)
-                
-                # Move the file/directory
-                shutil.move(src, dest)
-                return True
-            except PermissionError:
-                # If permission error, wait a bit and retry
-                if attempt < max_attempts - 1:
-                    self.status_label.setText(f"Retrying file operation...")
-                    self.close_related_applications()  # Try to close apps again
-                    import time
-                    time.sleep(1)  # Wait a second before retry
-                else:
-                    raise
-        return False
+    def rollback_installation(self):
+        """Swap the previously installed version back in."""
+        reply = QMessageBox.question(self, "Roll Back",
+                                     f"Restore the previous version of CookieBatch in:\n{self.install_dir}?")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            self.close_related_applications()
+            rollback_install(self.install_dir)
+            self.status_label.setText("Previous version restored")
+            QMessageBox.information(self, "Roll Back Complete", f"The previous version was restored in:\n{self.install_dir}")
+        except Exception as e:
+            QMessageBox.critical(self, "Roll Back Error", f"Roll back failed: {e}")
+        self.update_permission_status()
 
     def start_installation(self):
         """Start the installation process."""
@@ -472,117 +2000,181 @@ class Installer(QMainWindow):
             
         # Close any applications that might be using the files
         self.close_related_applications()
+
+        # Timings for every stage of this install, written out when it ends
+        self.install_report = InstallReport()
             
         # Disable buttons during installation
         self.install_button.setEnabled(False)
         self.browse_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.cancel_requested = False
         
         # Reset progress bar
         self.progress_bar.setValue(0)
         
-        # Clean up any existing temporary files before starting
-        try:
-            if os.path.exists(ZIP_PATH):
-                self.safe_remove(ZIP_PATH)
-            if os.path.exists(EXTRACT_PATH):
-                self.safe_remove(EXTRACT_PATH)
-        except Exception as e:
-            self.on_installation_error(f"Failed to clean up temporary files: {str(e)}")
+        # Download and extract on the same volume as the install directory
+        self.zip_path, self.extract_path = get_staging_paths(self.install_dir)
+
+        # Temporary files of an earlier install are removed by the worker threads, which may wait on locked files
+        self.stale_paths = [self.zip_path, self.extract_path]
+
+        # Existing installs are updated file by file when a manifest is available
+        if self.delta_update_checkbox.isChecked() and os.path.isdir(self.install_dir) and os.listdir(self.install_dir):
+            self.stage_progress = StageProgress(DELTA_STAGE_SIZES)
+            self.delta_thread = DeltaUpdateThread(MANIFEST_URL, self.install_dir, self.extract_path + ".delta",
+                                                  self.install_report, self.stale_paths,
+                                                  self.close_apps_checkbox.isChecked())
+            self.delta_thread.progress_updated.connect(self.update_progress)
+            self.delta_thread.status_changed.connect(self.set_stage_status)
+            self.delta_thread.update_complete.connect(self.on_delta_update_complete)
+            self.delta_thread.full_install_required.connect(self.start_full_download)
+            self.delta_thread.error_occurred.connect(self.on_installation_error)
+            self.set_stage_status("Checking for changed files...")
+            self.delta_thread.start()
+        else:
+            self.start_full_download()
+
+    def start_full_download(self):
+        """Download the complete release archive."""
+        if self.cancel_requested:
+            self.on_installation_cancelled()
             return
-            
+        self.stage_progress = StageProgress(INSTALL_STAGE_SIZES)
+
         # Start download thread
-        self.download_thread = DownloadThread(GITHUB_ZIP_URL, ZIP_PATH)
+        self.download_thread = DownloadThread(GITHUB_ZIP_URL, self.zip_path, DownloadCache(), RELEASE_MIRRORS,
+                                              self.install_report, self.allow_unverified_checkbox.isChecked(),
+                                              self.stale_paths, self.close_apps_checkbox.isChecked())
         self.download_thread.progress_updated.connect(self.update_progress)
+        self.download_thread.status_changed.connect(self.set_stage_status)
         self.download_thread.download_complete.connect(self.on_download_complete)
         self.download_thread.error_occurred.connect(self.on_installation_error)
         
         # Update status and start download
-        self.status_label.setText("Downloading files...")
+        self.set_stage_status("Downloading files...")
         self.download_thread.start()
 
     def update_progress(self, value):
         """Update progress bar during download."""
-        self.progress_bar.setValue(value)
+        self.show_stage_progress("download", value / 100)
+
+    def set_stage_status(self, text):
+        """Show the current stage; the ETA is appended as progress comes in."""
+        self.stage_status = text
+        self.status_label.setText(text)
+
+    def show_stage_progress(self, stage, fraction):
+        """Show overall progress, weighted across all install stages, with an ETA."""
+        overall, eta = self.stage_progress.update(stage, fraction)
+        self.progress_bar.setValue(int(overall * 100))
+        if eta is not None and overall < 1:
+            self.status_label.setText(f"{self.stage_status} (about {format_eta(eta)} left)")
 
     def on_download_complete(self):
-        """Handle successful download and start extraction."""
-        try:
-            self.status_label.setText("Extracting files...")
-            
-            if not zipfile.is_zipfile(ZIP_PATH):
-                raise ValueError("Downloaded file is not a valid ZIP archive.")
-                
-            # Create extraction directory
-            os.makedirs(EXTRACT_PATH, exist_ok=True)
-
-            # Extract files with progress
-            with zipfile.ZipFile(ZIP_PATH, "r") as zip_ref:
-                total_files = len(zip_ref.namelist())
-                for i, file in enumerate(zip_ref.namelist(), 1):
-                    zip_ref.extract(file, EXTRACT_PATH)
-                    # Update progress based on file extraction
-                    self.progress_bar.setValue(int((i / total_files) * 100))
-
-            if not os.listdir(EXTRACT_PATH):
-                raise ValueError("Extraction failed: No files found.")
-
-            # Create install directory
-            os.makedirs(self.install_dir, exist_ok=True)
-            
-            self.status_label.setText("Installing files...")
+        """Handle successful download and start extraction on a worker thread."""
+        # The archive digest is checked while it downloads, so verification is done too
+        self.show_stage_progress("download", 1.0)
+        self.show_stage_progress("verify", 1.0)
+        if self.cancel_requested:
+            self.on_installation_cancelled()
+            return
 
-            # Try to close any applications that might be using the files one more time
-            self.close_related_applications()
+        # Weight extraction by the real uncompressed size now that it is known
+        try:
+            self.stage_progress.set_stage_size("extract", get_uncompressed_size(self.zip_path)
+                                               / max(1, os.path.getsize(self.zip_path)))
+        except (OSError, zipfile.BadZipFile):
+            pass  # The worker reports an invalid archive
 
-            # Move extracted files
-            total_items = len(os.listdir(EXTRACT_PATH))
-            for i, item in enumerate(os.listdir(EXTRACT_PATH), 1):
-                src = os.path.join(EXTRACT_PATH, item)
-                dest = os.path.join(self.install_dir, item)
+        self.install_worker = InstallWorker(self.zip_path, self.extract_path, self.install_dir,
+                                            self.download_thread.member_hashes,
+                                            self.staged_install_checkbox.isChecked(),
+                                            self.close_apps_checkbox.isChecked(),
+                                            self.install_report)
+        self.install_worker.stage_progress.connect(self.show_stage_progress)
+        self.install_worker.status_changed.connect(self.set_stage_status)
+        self.install_worker.install_complete.connect(self.finish_installation)
+        self.install_worker.install_cancelled.connect(self.on_installation_cancelled)
+        self.install_worker.error_occurred.connect(self.on_installation_error)
+        self.install_worker.start()
 
-                try:
-                    self.safe_move(src, dest)
-                    # Update progress based on file moving
-                    self.progress_bar.setValue(int((i / total_items) * 100))
-                except PermissionError:
-                    raise PermissionError(f"Permission denied when moving {item} to {dest}. Make sure no applications are using these files.")
-                    
-            self.status_label.setText("Cleaning up...")
-
-            # Clean up temporary files
-            try:
-                self.safe_remove(ZIP_PATH)
-                self.safe_remove(EXTRACT_PATH)
-            except Exception as e:
-                # Just log this error, don't abort the installation
-                print(f"Cleanup warning: {e}")
+    def on_delta_update_complete(self, summary):
+        """Handle a finished delta update."""
+        print(f"Delta update: {summary}")
+        self.finish_installation(f"{summary['files_updated']} changed file(s) updated, "
+                                 f"{summary['bytes_saved'] / (1024 * 1024):.1f} MB not downloaded.")
 
+    def finish_installation(self, details=None):
+        """Create the shortcut if requested and report success."""
+        # The files are in place; there is nothing left to cancel
+        self.cancel_button.setEnabled(False)
+        self.show_stage_progress("install", 1.0)
+        try:
             # Create desktop shortcut if checkbox is checked
             shortcut_created = False
             if self.create_shortcut_checkbox.isChecked():
                 # Only create shortcut on Windows
                 if platform.system() == "Windows":
-                    self.status_label.setText("Creating desktop shortcut...")
-                    shortcut_created = self.create_desktop_shortcut(self.install_dir)
+                    self.set_stage_status("Creating desktop shortcut...")
+                    with self.install_report.stage("shortcut"):
+                        shortcut_created = self.create_desktop_shortcut(self.install_dir)
+                    self.install_report.record("shortcut", created=shortcut_created)
+            self.show_stage_progress("shortcut", 1.0)
+            self.write_install_report("success")
 
             # Final status update
             self.status_label.setText("Installation completed successfully!")
             self.progress_bar.setValue(100)
+            self.rollback_button.setEnabled(os.path.exists(get_previous_install_path(self.install_dir)))
             
             # Prepare completion message
             message = f"CookieBatch installed successfully in:\n{self.install_dir}"
+            if details:
+                message += f"\n\n{details}"
             if shortcut_created:
                 message += "\n\nDesktop shortcut created."
             
             QMessageBox.information(self, "Installation Complete", message)
 
-        except PermissionError as e:
-            self.on_installation_error(f"Permission denied: {str(e)}\nSome files may be locked by other applications.")
         except Exception as e:
             self.on_installation_error(str(e))
 
+    def cancel_installation(self):
+        """Cancel the running installation; each stage rolls back what it changed."""
+        self.cancel_requested = True
+        self.cancel_button.setEnabled(False)
+        self.set_stage_status("Cancelling...")
+        for thread in (self.download_thread, self.delta_thread, self.install_worker):
+            if thread is not None and thread.isRunning():
+                thread.cancel()
+
+    def write_install_report(self, status, error=None):
+        """Append the stage timings of the install that just ended to the report log."""
+        if self.install_report is None:
+            return
+        append_install_report(dict(self.install_report.to_dict(), status=status, mode="gui",
+                                   install_dir=self.install_dir, error=error))
+        self.install_report = None  # Written once, even if another error follows
+
+    def on_installation_cancelled(self):
+        """Reset the window after a cancelled installation."""
+        self.write_install_report("cancelled")
+        self.status_label.setText("Installation cancelled")
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(False)
+        self.install_button.setEnabled(True)
+        self.browse_button.setEnabled(True)
+        self.update_permission_status()
+
     def on_installation_error(self, error_message):
         """Handle any errors during installation."""
+        if self.cancel_requested:
+            # Errors raised by a cancelled download are expected
+            self.on_installation_cancelled()
+            return
+
+        self.write_install_report("failed", error_message)
         QMessageBox.critical(self, "Installation Error", 
                             f"Installation failed: {error_message}")
             
@@ -590,10 +2182,171 @@ class Installer(QMainWindow):
         self.progress_bar.setValue(0)
         
         # Re-enable buttons
+        self.cancel_button.setEnabled(False)
         self.install_button.setEnabled(True)
         self.browse_button.setEnabled(True)
 
+def parse_silent_args(argv):
+    """Parse the command line of a silent install."""
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description="Install CookieBatch without the installer window. "
+                                                 "Prints a JSON result on stdout.")
+    parser.add_argument(SILENT_FLAG, action="store_true", required=True, help="run without a window")
+    parser.add_argument("--install-dir", action="append", dest="install_dirs", metavar="DIR",
+                        help="install into DIR; repeat to install into several directories from one "
+                             f"download (default: {DEFAULT_INSTALL_DIR})")
+    parser.add_argument("--source", default=GITHUB_ZIP_URL, metavar="URL_OR_PATH",
+                        help="release archive URL, or a local .zip path or file:// URL (default: official release)")
+    parser.add_argument("--mirror", action="append", dest="mirrors", default=list(RELEASE_MIRRORS), metavar="URL_OR_PATH",
+                        help="another copy of the release archive (HTTP(S) URL, local or UNC path); repeatable. "
+                             "The fastest one is used and the others take over if it fails")
+    parser.add_argument("--no-shortcut", dest="shortcut", action="store_false",
+                        help="do not create a desktop shortcut")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, metavar="DIR",
+                        help=f"download cache location (default: {CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the download cache")
+    parser.add_argument("--allow-unverified", action="store_true",
+                        help="install even if no SHA-256 is published for the release archive")
+    parser.add_argument("--no-close-apps", dest="close_apps", action="store_false",
+                        help="do not close running CookieBatch instances first")
+    parser.add_argument("--report-file", default=INSTALL_REPORT_PATH, metavar="PATH",
+                        help=f"append the JSON result with per-stage timings to PATH (default: {INSTALL_REPORT_PATH})")
+    parser.add_argument(ADMIN_FLAG, action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # The same directory twice would have two installs race for one staging area
+    install_dirs = []
+    for install_dir in args.install_dirs or [DEFAULT_INSTALL_DIR]:
+        install_dir = os.path.abspath(install_dir)
+        if os.path.normcase(install_dir) not in map(os.path.normcase, install_dirs):
+            install_dirs.append(install_dir)
+    args.install_dirs = install_dirs
+    return args
+
+def parse_manifest_args(argv):
+    """Parse the command line of --build-manifest."""
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description="Print the manifest (path, size, SHA-256, version of every file) "
+                                                 "of a release directory as JSON.")
+    parser.add_argument(MANIFEST_FLAG, nargs=2, required=True, dest="manifest", metavar=("RELEASE_DIR", "VERSION"),
+                        help="release directory and the version to record for its files")
+    args = parser.parse_args(argv)
+    args.release_dir, args.version = args.manifest
+    if not os.path.isdir(args.release_dir):
+        parser.error(f"not a directory: {args.release_dir}")
+    return args
+
+def get_local_source_path(source):
+    """Return the local path for a file:// URL or plain path, or None for an HTTP(S) URL."""
+    parsed = urllib.parse.urlparse(source)
+    if parsed.scheme in ("http", "https"):
+        return None
+    if parsed.scheme == "file":
+        # file://server/share/... is a UNC path
+        unc = parsed.netloc not in ("", "localhost")
+        return urllib.request.url2pathname(f"//{parsed.netloc}{parsed.path}" if unc else parsed.path)
+    return source
+
+def silent_install(args):
+    """
+    Download the release once and install it into every target directory concurrently.
+    Returns (result, exit code); the result is JSON-serialisable. Shared stages are
+    timed in result["stages"] and the stages of each target in its own "stages".
+    """
+    started = time.monotonic()
+    report = InstallReport()
+    result = {"status": None, "source": args.source, "targets": [], "shortcut": None, "error": None, "warnings": []}
+
+    # Concurrent runs must not share a download or a fallback staging area
+    run_dir = tempfile.mkdtemp(prefix="cookiebatch_")
+    local_path = get_local_source_path(args.source)
+    try:
+        if local_path is not None:
+            # Local archives are trusted as given; published hashes belong to the official release
+            with report.stage("verify"):
+                if not zipfile.is_zipfile(local_path):
+                    raise ValueError(f"{local_path} is not a valid ZIP archive.")
+            zip_path, member_hashes = local_path, None
+        else:
+            zip_path = os.path.join(run_dir, "CookieBatch.zip")
+            cache = None if args.no_cache else DownloadCache(args.cache_dir)
+            member_hashes = download_release_archive(args.source, zip_path, cache, mirrors=args.mirrors, report=report,
+                                                     allow_unverified=args.allow_unverified,
+                                                     status_callback=result["warnings"].append)
+    except Exception as e:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        result.update(status="failed", error=f"Download failed: {e}", elapsed=round(time.monotonic() - started, 3),
+                      stages=report.to_dict()["stages"])
+        return result, EXIT_DOWNLOAD_FAILED
+
+    def install_target(index, install_dir):
+        target = {"install_dir": install_dir, "status": "installed", "previous_install_dir": None, "error": None}
+        target_report = InstallReport()
+        try:
+            if not check_dir_writeable(install_dir):
+                raise PermissionError(f"Cannot write to {install_dir}.")
+            _, extract_path = get_staging_paths(install_dir)
+            if extract_path == EXTRACT_PATH:
+                # Targets that fall back to the temp directory each need their own staging area
+                extract_path = os.path.join(run_dir, f"extracted.{index}")
+            shutil.rmtree(extract_path, ignore_errors=True)
+            InstallPipeline(zip_path, extract_path, install_dir, member_hashes, staged=True,
+                            close_apps=args.close_apps, remove_archive=False, report=target_report).run()
+            previous_path = get_previous_install_path(install_dir)
+            if os.path.exists(previous_path):
+                target["previous_install_dir"] = previous_path
+        except Exception as e:
+            target.update(status="failed", error=str(e))
+        target["stages"] = target_report.to_dict()["stages"]
+        return target
+
+    with ThreadPoolExecutor(max_workers=len(args.install_dirs)) as executor:
+        result["targets"] = list(executor.map(install_target, range(len(args.install_dirs)), args.install_dirs))
+
+    with report.stage("cleanup"):
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    # The desktop has one CookieBatch shortcut; it points at the first installed directory
+    installed = [target for target in result["targets"] if target["status"] == "installed"]
+    if args.shortcut and installed and platform.system() == "Windows":
+        try:
+            with report.stage("shortcut"):
+                result["shortcut"] = create_desktop_shortcut(installed[0]["install_dir"])
+        except Exception as e:
+            print(f"Shortcut warning: {e}")
+
+    result["elapsed"] = round(time.monotonic() - started, 3)
+    result["stages"] = report.to_dict()["stages"]
+    if len(installed) == len(result["targets"]):
+        result["status"] = "success"
+        return result, EXIT_SUCCESS
+    if installed:
+        result["status"] = "partial"
+        return result, EXIT_PARTIAL_FAILURE
+    result["status"] = "failed"
+    return result, EXIT_INSTALL_FAILED
+
+def run_silent_install(argv):
+    """Run a silent install and print its JSON result; returns the exit code."""
+    args = parse_silent_args(argv)
+    # Progress and warnings go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result, exit_code = silent_install(args)
+        append_install_report(dict(result, mode="silent"), args.report_file)
+    print(json.dumps(result, indent=2))
+    return exit_code
+
 def main():
+    # Release tooling: print the manifest for a release directory and exit
+    if MANIFEST_FLAG in sys.argv:
+        args = parse_manifest_args(sys.argv[1:])
+        print(json.dumps(build_manifest(args.release_dir, args.version), indent=2))
+        return
+
+    # Build agents: install without a window or an elevation prompt
+    if SILENT_FLAG in sys.argv:
+        sys.exit(run_silent_install(sys.argv[1:]))
+
     # Check if admin flag is present, which means we're already trying to run as admin
     # or we already have admin privileges
     skip_admin_request = ADMIN_FLAG in sys.argv or is_admin()
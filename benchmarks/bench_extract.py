@@ -0,0 +1,68 @@
+"""
+Time extract_archive with one worker against the parallel pool on a synthetic release.
+
+    python benchmarks/bench_extract.py [--size-mb 400] [--members 200] [--runs 3]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Installer"))
+import CookieInstallerDebug as installer
+
+def build_archive(zip_path, size_mb, members, seed=20261019):
+    """Write a deflated archive of about size_mb uncompressed, with members of mixed sizes."""
+    rng = random.Random(seed)
+    # A few large members and many small ones, like a release with fonts, icons and scripts
+    weights = [rng.paretovariate(1.2) for _ in range(members)]
+    total_size = size_mb * 1024 * 1024
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, weight in enumerate(weights):
+            size = max(1024, int(total_size * weight / sum(weights)))
+            # Half random, half repeated text, so deflate has real work on both kinds of data
+            data = rng.randbytes(size // 2) + (b"echo CookieBatch %%i\r\n" * (size // 40 + 1))[:size - size // 2]
+            archive.writestr(f"Release/{i // 50}/member{i}.bin", data)
+
+def time_extract(zip_path, extract_path, workers, runs):
+    best = None
+    for _ in range(runs):
+        shutil.rmtree(extract_path, ignore_errors=True)
+        started = time.perf_counter()
+        installer.extract_archive(zip_path, extract_path, workers=workers)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=400, help="Uncompressed size of the archive")
+    parser.add_argument("--members", type=int, default=200, help="Number of files in the archive")
+    parser.add_argument("--workers", type=int, default=installer.EXTRACT_WORKERS, help="Threads for the parallel run")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode; the best time is reported")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="cookiebatch_bench_")
+    try:
+        zip_path = os.path.join(work_dir, "release.zip")
+        print(f"Building a {args.size_mb} MB archive with {args.members} members...")
+        build_archive(zip_path, args.size_mb, args.members)
+        uncompressed = installer.get_uncompressed_size(zip_path)
+        print(f"Archive: {os.path.getsize(zip_path) / 1024 / 1024:.0f} MB compressed, "
+              f"{uncompressed / 1024 / 1024:.0f} MB uncompressed")
+
+        extract_path = os.path.join(work_dir, "extracted")
+        sequential = time_extract(zip_path, extract_path, 1, args.runs)
+        parallel = time_extract(zip_path, extract_path, args.workers, args.runs)
+        for label, seconds in (("sequential (1 worker)", sequential), (f"parallel ({args.workers} workers)", parallel)):
+            print(f"{label:<24} {seconds:7.2f} s  {uncompressed / seconds / 1024 / 1024:8.1f} MB/s")
+        print(f"Speedup: {sequential / parallel:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
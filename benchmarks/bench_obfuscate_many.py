@@ -0,0 +1,62 @@
+"""
+Compare the per-command cost of obfuscate_many with one build_obfuscated_script call per command.
+
+    python benchmarks/bench_obfuscate_many.py [--count 20000] [--divide-method 4] [--runs 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Debug"))
+from obfuscator import PackingStats, build_obfuscated_script, obfuscate_many, verify_obfuscated_output
+
+def generate_commands(count, seed=20261019):
+    """One-line commands like those a config generator writes."""
+    rng = random.Random(seed)
+    templates = ['set "CFG_{0}={1}"', "echo {1} >> config_{0}.ini", 'reg add HKCU\\Software\\Cookie /v K{0} /d "{1}" /f',
+                 "copy /y %TEMP%\\{1}.cfg C:\\Cookie\\{0}.cfg"]
+    return [rng.choice(templates).format(i, "".join(rng.choice("abcdefXYZ0189_-") for _ in range(rng.randint(4, 24))))
+            for i in range(count)]
+
+def best_time(function, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="Number of commands")
+    parser.add_argument("--divide-method", type=int, default=4, help="Characters per SET chunk")
+    parser.add_argument("--max-line-length", type=int, default=None, help="Pack SET lines up to this length")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode; the best time is reported")
+    args = parser.parse_args()
+
+    commands = generate_commands(args.count)
+    # Both paths produce every script as a string, so the comparison includes reading the batch back
+    single = best_time(lambda: [build_obfuscated_script(command, args.divide_method, max_line_length=args.max_line_length)
+                                for command in commands], args.runs)
+    batched = best_time(lambda: list(obfuscate_many(commands, args.divide_method,
+                                                    max_line_length=args.max_line_length)), args.runs)
+
+    # Spot-check that the batch is correct before reporting its speed
+    packing_stats = PackingStats()
+    batch = obfuscate_many(commands, args.divide_method, max_line_length=args.max_line_length,
+                           packing_stats=packing_stats)
+    for index in range(0, len(commands), max(1, len(commands) // 100)):
+        assert verify_obfuscated_output(batch[index], commands[index]), commands[index]
+
+    print(f"{args.count} commands, divide method {args.divide_method}")
+    for label, seconds in (("single calls", single), ("obfuscate_many", batched)):
+        print(f"{label:<16} {seconds:7.3f} s  {seconds / args.count * 1e6:7.1f} us per command")
+    print(f"Speedup: {single / batched:.2f}x")
+    if args.max_line_length:
+        print(packing_stats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import http.server
+import os
+import re
+import sys
+import threading
+from time import sleep  # Bound here so tests can patch the installer's retry sleeps
+
+import pytest
+
+# The obfuscator and the installer are standalone scripts, so import them from their folders
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "Debug"), os.path.join(ROOT, "Installer")]
+
+# Bytes written per block by the stand-in server
+BLOCK_SIZE = 64 * 1024
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server.stand_in
+        range_header = self.headers.get("Range")
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            stall = server.stalls > 0
+            if stall:
+                server.stalls -= 1
+            drop = server.drops > 0
+            if drop:
+                server.drops -= 1
+
+        data = server.files.get(self.path.lstrip("/"))
+        if server.status or data is None:
+            self.send_empty(server.status or 404)
+            return
+
+        if self.headers.get("If-None-Match") == server.etag:
+            self.send_empty(304, {"ETag": server.etag})
+            return
+
+        start, end, status = 0, len(data), 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match and server.ranges and self.headers.get("If-Range", server.etag) == server.etag:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1, len(data)) if match.group(2) else len(data)
+            if start >= len(data):
+                self.send_empty(416, {"Content-Range": f"bytes */{len(data)}"})
+                return
+            status = 206
+
+        self.send_response(status)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(end - start))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        self.end_headers()
+
+        body = data[start:end]
+        limit = min(server.drop_after, len(body)) if drop else len(body)
+        if stall:
+            sleep(server.stall_time)
+        try:
+            for i in range(0, limit, BLOCK_SIZE):
+                block = body[i:min(i + BLOCK_SIZE, limit)]
+                self.wfile.write(block)
+                with server.lock:
+                    server.bytes_sent += len(block)
+                if server.block_delay:
+                    sleep(server.block_delay)
+        except OSError:
+            return  # The client went away, e.g. after a cancel
+        if drop:
+            # Hang up with the rest of the promised body missing
+            self.close_connection = True
+
+class StandInServer:
+    """
+    Local stand-in for a release host. Serves files with byte ranges and can answer
+    with an error status, drop connections part way, throttle or stall on request.
+    """
+    def __init__(self):
+        self.files = {}
+        self.etag = '"v1"'
+        self.ranges = True
+        self.status = None       # Answer every request with this status instead
+        self.drops = 0           # Number of responses that hang up...
+        self.drop_after = 0      # ...after this many body bytes
+        self.stalls = 0          # Number of responses that wait...
+        self.stall_time = 0.0    # ...this long before sending the body
+        self.block_delay = 0.0   # Seconds between blocks, to throttle
+        self.requests = []
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stand_in = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/{name}"
+
+    def ranges_requested(self, name):
+        return [headers.get("Range") for path, headers in self.requests if path == "/" + name]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def make_stand_in():
+    """Start as many stand-in servers as a test needs."""
+    servers = []
+    def start():
+        servers.append(StandInServer())
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.close()
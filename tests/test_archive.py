@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import CookieInstallerDebug as installer
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("name", ["../evil.bat", "a/../../evil.bat", "/evil.bat", "C:evil.bat", "C:/evil.bat",
+                                  "//server/share/evil.bat", "a/../.."])
+def test_unsafe_paths_are_rejected(name):
+    with pytest.raises(ValueError):
+        installer.get_manifest_path(name)
+
+@pytest.mark.parametrize("name", ["..foo", "a/..b/c.txt", "Output/x..bat", "a/./b.txt"])
+def test_names_starting_with_dots_are_allowed(name):
+    assert ".." not in installer.get_manifest_path(name).split(os.sep)
+
+def test_extract_rejects_members_outside_the_folder(tmp_path):
+    zip_path = tmp_path / "release.zip"
+    zip_path.write_bytes(make_archive({"ok.txt": b"ok", "C:evil.bat": b"evil"}))
+    with pytest.raises(ValueError):
+        installer.extract_archive(str(zip_path), str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
+
+def test_extract_rejects_members_through_a_symlink(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    extract_path = tmp_path / "out"
+    extract_path.mkdir()
+    os.symlink(outside, extract_path / "link")
+    zip_path = tmp_path / "release.zip"
+    zip_path.write_bytes(make_archive({"link/evil.bat": b"evil"}))
+    with pytest.raises(ValueError):
+        installer.extract_archive(str(zip_path), str(extract_path))
+    assert list(outside.iterdir()) == []
+
+def test_member_hashes_come_from_the_source_used(make_stand_in, tmp_path):
+    files = {"cookie.bat": b"echo v2", "..foo": b"dots"}
+    archive = make_archive(files)
+    manifest = {"version": "2.0", "files": [{"path": name, "size": len(data), "sha256": installer.hashlib.sha256(data).hexdigest()}
+                                            for name, data in files.items()]}
+    primary, mirror = make_stand_in(), make_stand_in()
+    primary.status = 503
+    mirror.files["CookieBatch.zip"] = archive
+    mirror.files["manifest.json"] = json.dumps(manifest).encode()
+    mirror.files["CookieBatch.zip.sha256"] = f"{installer.hashlib.sha256(archive).hexdigest()}  CookieBatch.zip".encode()
+
+    member_hashes = installer.download_release_archive(primary.url("CookieBatch.zip"), str(tmp_path / "release.zip"),
+                                                       mirrors=[mirror.url("CookieBatch.zip")])
+    assert member_hashes == {entry["path"]: entry["sha256"] for entry in manifest["files"]}
+    assert not any(path == "/manifest.json" for path, _ in primary.requests)
+    extracted = installer.extract_archive(str(tmp_path / "release.zip"), str(tmp_path / "out"), member_hashes)
+    assert extracted == member_hashes
+
+def test_extract_rejects_members_missing_from_the_manifest(tmp_path):
+    zip_path = tmp_path / "release.zip"
+    zip_path.write_bytes(make_archive({"cookie.bat": b"echo v2", "extra.bat": b"echo extra"}))
+    member_hashes = {"cookie.bat": installer.hashlib.sha256(b"echo v2").hexdigest()}
+    with pytest.raises(ValueError, match="extra.bat is not in the release manifest"):
+        installer.extract_archive(str(zip_path), str(tmp_path / "out"), member_hashes)
+    assert not (tmp_path / "out").exists()
+
+def test_archive_without_a_published_digest_is_refused(stand_in, tmp_path):
+    stand_in.files["CookieBatch.zip"] = make_archive({"cookie.bat": b"echo v2"})
+    save_path = str(tmp_path / "release.zip")
+    report = installer.InstallReport()
+    with pytest.raises(installer.UnverifiedDownload):
+        installer.download_release_archive(stand_in.url("CookieBatch.zip"), save_path, report=report)
+    assert not os.path.exists(save_path)
+    assert report.get_stage("verify")["verified"] is False
+
+    # Only an explicit opt-in installs it, with the warning on the status channel
+    warnings = []
+    installer.download_release_archive(stand_in.url("CookieBatch.zip"), save_path, allow_unverified=True,
+                                       status_callback=warnings.append)
+    assert open(save_path, "rb").read() == stand_in.files["CookieBatch.zip"]
+    assert len(warnings) == 1 and "unverified" in warnings[0]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+import CookieInstallerDebug as installer
+
+ARCHIVE = os.urandom(512 * 1024)
+
+@pytest.fixture
+def mirrors(make_stand_in):
+    """A slow primary server and a fast mirror with the same archive but their own ETags."""
+    primary, mirror = make_stand_in(), make_stand_in()
+    for server, etag, version in ((primary, '"primary"', "1.0"), (mirror, '"mirror"', "2.0")):
+        server.etag = etag
+        server.files["CookieBatch.zip"] = ARCHIVE
+        server.files["installverification.txt"] = version.encode()
+        server.files["CookieBatch.zip.sha256"] = f"{installer.hashlib.sha256(ARCHIVE).hexdigest()}  CookieBatch.zip".encode()
+    primary.block_delay = 0.1
+    return primary, mirror
+
+def download(primary, mirror, cache, save_path):
+    return installer.download_release_archive(primary.url("CookieBatch.zip"), save_path, cache,
+                                              mirrors=[mirror.url("CookieBatch.zip")])
+
+def test_cache_keeps_validators_per_source(mirrors, tmp_path):
+    primary, mirror = mirrors
+    cache = installer.DownloadCache(str(tmp_path / "cache"))
+    save_path = str(tmp_path / "release.zip")
+
+    download(primary, mirror, cache, save_path)
+    entry = cache.lookup(primary.url("CookieBatch.zip"))
+    assert entry["validators"] == {mirror.url("CookieBatch.zip"): {"etag": '"mirror"', "last_modified": None}}
+    # The version published next to the archive that was actually downloaded
+    assert entry["version"] == "2.0"
+
+    # The mirror revalidates its own ETag and answers 304; the primary never sees it
+    os.remove(save_path)
+    download(primary, mirror, cache, save_path)
+    assert open(save_path, "rb").read() == ARCHIVE
+    archive_requests = [headers for path, headers in mirror.requests if path == "/CookieBatch.zip"]
+    assert archive_requests[-1].get("If-None-Match") == '"mirror"'
+    assert all("If-None-Match" not in headers for _, headers in primary.requests)
+
+def test_conditional_headers_only_go_to_their_source(tmp_path):
+    entry = {"validators": {"http://a/x.zip": {"etag": '"a"', "last_modified": None},
+                            "http://b/x.zip": {"etag": None, "last_modified": "Mon, 19 Oct 2026 00:00:00 GMT"}}}
+    assert installer.DownloadCache.conditional_headers(entry) == {
+        "http://a/x.zip": {"If-None-Match": '"a"'},
+        "http://b/x.zip": {"If-Modified-Since": "Mon, 19 Oct 2026 00:00:00 GMT"},
+    }
+
+def test_store_merges_validators_while_the_archive_is_unchanged(tmp_path):
+    cache = installer.DownloadCache(str(tmp_path / "cache"))
+    path = tmp_path / "release.zip"
+    path.write_bytes(b"v1")
+    cache.store("url", str(path), {"a": {"etag": '"a"'}}, "1.0")
+    cache.store("url", str(path), {"b": {"etag": '"b"'}})
+    assert set(cache.lookup("url")["validators"]) == {"a", "b"}
+    assert cache.lookup("url")["version"] == "1.0"
+
+    path.write_bytes(b"v2")
+    cache.store("url", str(path), {"b": {"etag": '"b2"'}}, "2.0")
+    assert cache.lookup("url")["validators"] == {"b": {"etag": '"b2"'}}
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import CookieInstallerDebug as installer
+from test_install import read_tree, write_tree
+
+OLD_RELEASE = {"cookie.exe": "v1", "legacy.exe": "v1", "readme.txt": "same", "Fonts/old.ttf": "v1"}
+NEW_RELEASE = {"cookie.exe": "v2", "readme.txt": "same", "Fonts/new.ttf": "v2"}
+
+@pytest.fixture
+def install_dir(tmp_path):
+    """An install of the old release, with a file the user added."""
+    install_dir = str(tmp_path / "CookieBatch")
+    write_tree(install_dir, dict(OLD_RELEASE, **{"my_own_notes.txt": "mine"}))
+    installer.write_release_record(install_dir, list(OLD_RELEASE))
+    return install_dir
+
+@pytest.fixture
+def manifest(tmp_path):
+    release_dir = str(tmp_path / "release")
+    write_tree(release_dir, NEW_RELEASE)
+    return installer.build_manifest(release_dir, "2.0")
+
+def run_delta_update(manifest_url, install_dir, delta_dir):
+    """Run a DeltaUpdateThread on this thread and return the signals it emitted."""
+    signals = []
+    thread = installer.DeltaUpdateThread(manifest_url, install_dir, delta_dir)
+    thread.update_complete.connect(lambda summary: signals.append(("complete", summary)))
+    thread.full_install_required.connect(lambda: signals.append(("full", None)))
+    thread.error_occurred.connect(lambda message: signals.append(("error", message)))
+    thread.run()
+    return signals
+
+def test_plan_lists_changed_files_and_files_the_release_dropped(install_dir, manifest):
+    changed, removed, total_size = installer.plan_delta_update(manifest, install_dir)
+    assert [entry["path"] for entry in changed] == ["Fonts/new.ttf", "cookie.exe"]
+    assert removed == ["Fonts/old.ttf", "legacy.exe"]
+    assert total_size == sum(len(text) for text in NEW_RELEASE.values())
+
+def test_plan_removes_nothing_without_a_record(install_dir, manifest):
+    os.remove(installer.get_release_record_path(install_dir))
+    assert installer.plan_delta_update(manifest, install_dir)[1] == []
+
+def test_delta_update_replaces_and_removes_files(stand_in, install_dir, manifest, tmp_path):
+    stand_in.files["manifest.json"] = installer.json.dumps(manifest).encode()
+    for path, text in NEW_RELEASE.items():
+        stand_in.files[path] = text.encode()
+    delta_dir = str(tmp_path / ".CookieBatch.staging.delta")
+
+    signals = run_delta_update(stand_in.url("manifest.json"), install_dir, delta_dir)
+    assert signals == [("complete", {"version": "2.0", "files_updated": 2, "files_removed": 2,
+                                     "bytes_downloaded": 4, "bytes_saved": 4})]
+    assert read_tree(install_dir) == dict(NEW_RELEASE, **{"my_own_notes.txt": "mine"})
+    assert installer.read_release_record(install_dir)[1] == set(NEW_RELEASE)
+    assert not os.path.exists(delta_dir) and not os.path.exists(delta_dir + ".backup")
+    # Unchanged files are not downloaded
+    assert "/readme.txt" not in [path for path, _ in stand_in.requests]
+
+def test_failed_rename_puts_the_install_back(install_dir, manifest, tmp_path, monkeypatch):
+    changed, removed, _ = installer.plan_delta_update(manifest, install_dir)
+    delta_dir = str(tmp_path / "delta")
+    for entry in changed:
+        write_tree(delta_dir, {entry["path"]: NEW_RELEASE[entry["path"]]})
+
+    real_replace = os.replace
+    def replace(src, dest):
+        if src == os.path.join(delta_dir, "cookie.exe"):
+            raise PermissionError("cookie.exe is in use")
+        real_replace(src, dest)
+    monkeypatch.setattr(installer.os, "replace", replace)
+
+    with pytest.raises(PermissionError):
+        installer.apply_delta_update(delta_dir, install_dir, changed, removed)
+    assert read_tree(install_dir) == dict(OLD_RELEASE, **{"my_own_notes.txt": "mine"})
+
+def test_missing_manifest_falls_back_to_a_full_install(stand_in, install_dir, tmp_path):
+    signals = run_delta_update(stand_in.url("manifest.json"), install_dir, str(tmp_path / "delta"))
+    assert signals == [("full", None)]
+    assert read_tree(install_dir) == dict(OLD_RELEASE, **{"my_own_notes.txt": "mine"})
+
+def test_delta_folder_on_another_volume_falls_back_to_a_full_install(stand_in, install_dir, manifest, tmp_path,
+                                                                     monkeypatch):
+    stand_in.files["manifest.json"] = installer.json.dumps(manifest).encode()
+    monkeypatch.setattr(installer, "can_swap_in", lambda staging_dir, install_dir: False)
+    delta_dir = str(tmp_path / "delta")
+    assert run_delta_update(stand_in.url("manifest.json"), install_dir, delta_dir) == [("full", None)]
+    assert not os.path.exists(delta_dir)
+    assert [path for path, _ in stand_in.requests] == ["/manifest.json"]
+
+@pytest.mark.parametrize("argv", [[], ["release"], ["missing_dir", "2.0"]])
+def test_build_manifest_arguments_are_checked(argv, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("release")
+    with pytest.raises(SystemExit) as exit_info:
+        installer.parse_manifest_args([installer.MANIFEST_FLAG, *argv])
+    assert exit_info.value.code == installer.EXIT_USAGE
+    assert installer.parse_manifest_args([installer.MANIFEST_FLAG, "release", "2.0"]).version == "2.0"
@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+
+import pytest
+
+import CookieInstallerDebug as installer
+
+FILE_SIZE = 8 * 1024 * 1024
+DATA = os.urandom(FILE_SIZE)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Retries back off for seconds; the stand-in server fails on cue, so skip the waits
+    monkeypatch.setattr(installer.time, "sleep", lambda seconds: None)
+
+@pytest.fixture
+def release(stand_in):
+    stand_in.files["CookieBatch.zip"] = DATA
+    return stand_in.url("CookieBatch.zip")
+
+def test_download_single_stream(release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    progress = []
+    engine = installer.DownloadEngine(progress_callback=lambda done, total: progress.append(done), segments=1)
+    assert engine.download(release, save_path) == FILE_SIZE
+    assert open(save_path, "rb").read() == DATA
+    assert engine.sha256 == installer.hash_file(save_path)
+    # Progress is throttled instead of reported for every read
+    assert progress[-1] == FILE_SIZE
+    assert len(progress) < FILE_SIZE // installer.MIN_READ_SIZE
+    assert not os.path.exists(save_path + ".part")
+
+def test_resume_from_partial_file(stand_in, release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    offset = 3 * 1024 * 1024
+    with open(save_path + ".part", "wb") as f:
+        f.write(DATA[:offset])
+    installer.DownloadEngine.save_state(save_path + ".part.json", {"url": release, "validator": stand_in.etag,
+                                                                   "total_size": FILE_SIZE})
+    engine = installer.DownloadEngine(segments=1)
+    engine.download(release, save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert stand_in.ranges_requested("CookieBatch.zip") == [f"bytes={offset}-"]
+    assert engine.downloaded - engine.resumed == FILE_SIZE - offset
+    assert engine.sha256 == installer.hash_file(save_path)
+
+def test_changed_file_restarts_download(stand_in, release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    with open(save_path + ".part", "wb") as f:
+        f.write(b"x" * 1000)
+    installer.DownloadEngine.save_state(save_path + ".part.json", {"url": release, "validator": '"old"',
+                                                                   "total_size": FILE_SIZE})
+    installer.DownloadEngine(segments=1).download(release, save_path)
+    assert open(save_path, "rb").read() == DATA
+
+def test_dropped_connections_resume_where_they_stopped(stand_in, release, tmp_path):
+    stand_in.drops = 3
+    stand_in.drop_after = 1024 * 1024
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1)
+    engine.download(release, save_path)
+    assert open(save_path, "rb").read() == DATA
+    ranges = stand_in.ranges_requested("CookieBatch.zip")
+    assert ranges[0] is None and len(ranges) == 4
+    assert all(re.fullmatch(r"bytes=[1-9]\d*-\d*", r) for r in ranges[1:])
+    assert stand_in.bytes_sent == FILE_SIZE
+    assert engine.retry_count == 3
+
+def test_server_errors_are_raised(stand_in, release, tmp_path):
+    stand_in.status = 500
+    with pytest.raises(installer.requests.exceptions.HTTPError):
+        installer.DownloadEngine(segments=1).download(release, str(tmp_path / "release.zip"))
+
+@pytest.fixture
+def segmented(monkeypatch):
+    monkeypatch.setattr(installer, "MIN_SEGMENT_SIZE", 1024 * 1024)
+
+def test_segmented_download(segmented, stand_in, release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=4)
+    engine.download(release, save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.sha256 == installer.hashlib.sha256(DATA).hexdigest()
+    ranges = stand_in.ranges_requested("CookieBatch.zip")
+    assert len([r for r in ranges if r and r.endswith(str(FILE_SIZE - 1))]) == 1
+    assert len(ranges) == 5  # The first request only reads the headers
+
+def test_segmented_download_survives_dropped_segments(segmented, stand_in, release, tmp_path):
+    stand_in.drops = 4
+    stand_in.drop_after = 512 * 1024
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=4)
+    engine.download(release, save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.sha256 == installer.hashlib.sha256(DATA).hexdigest()
+    assert engine.retry_count >= 3
+
+def test_segmented_failure_removes_preallocated_file(segmented, stand_in, release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    # Every segment hangs up after the headers, so retries make no progress
+    stand_in.drops = 100
+    stand_in.drop_after = 0
+    with pytest.raises(installer.RETRYABLE_ERRORS):
+        installer.DownloadEngine(segments=4, retries=2).download(release, save_path)
+    assert os.listdir(tmp_path) == []
+
+def test_segmented_cancel_then_resume(segmented, stand_in, release, tmp_path):
+    save_path = str(tmp_path / "release.zip")
+    stand_in.block_delay = 0.01
+    engine = installer.DownloadEngine(segments=4)
+    # Cancel once about a quarter of the file has arrived
+    engine.progress_callback = lambda done, total: done > FILE_SIZE // 4 and engine.cancel()
+    with pytest.raises(installer.DownloadCancelled):
+        engine.download(release, save_path)
+    assert os.listdir(tmp_path) == []
+
+    stand_in.block_delay = 0.0
+    assert installer.DownloadEngine(segments=4).download(release, save_path) == FILE_SIZE
+    assert open(save_path, "rb").read() == DATA
+
+def test_interrupted_segmented_file_is_not_resumed(segmented, stand_in, release, tmp_path):
+    # What a crash mid-download leaves behind: a preallocated, partly filled file
+    save_path = str(tmp_path / "release.zip")
+    with open(save_path + ".part", "wb") as f:
+        f.write(DATA[:1024 * 1024])
+        f.truncate(FILE_SIZE)
+    installer.DownloadEngine.save_state(save_path + ".part.json", {"url": release, "validator": stand_in.etag,
+                                                                   "total_size": FILE_SIZE, "segmented": True})
+    for segments in (1, 4):
+        installer.DownloadEngine(segments=segments).download(release, save_path)
+        assert open(save_path, "rb").read() == DATA
+
+def test_cancel_from_another_thread(stand_in, release, tmp_path):
+    stand_in.block_delay = 0.01
+    cancel_event = threading.Event()
+    engine = installer.DownloadEngine(segments=1, cancel_event=cancel_event)
+    engine.progress_callback = lambda done, total: done > 1024 * 1024 and cancel_event.set()
+    with pytest.raises(installer.DownloadCancelled):
+        engine.download(release, str(tmp_path / "release.zip"))
+    # A single stream keeps its partial file so the next attempt can resume it
+    assert os.path.getsize(str(tmp_path / "release.zip.part")) < FILE_SIZE
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tarfile
+import threading
+
+import pytest
+
+import archive
+
+@pytest.mark.parametrize("suffix", [".tar.gz", ".tar", ".zip"])
+def test_export_streams_outputs_from_many_threads(tmp_path, suffix):
+    archive_path = tmp_path / f"jobs{suffix}"
+    large_path = tmp_path / "large.bat"
+    large_path.write_bytes(b"x" * (3 * archive.ARCHIVE_CHUNK_SIZE + 5))
+    export = archive.ArchiveExport(archive_path)
+
+    def worker(index):
+        for i in range(50):
+            assert export.add(f"{index:02d}-{i:03d}.bat", f"echo {index} {i}")
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    assert export.add("large.bat", file_path=str(large_path))
+    for thread in threads:
+        thread.join()
+    export.close()
+    assert export.wait(30)
+    assert export.error is None and export.count == 201
+    assert not export.add("late.bat", "echo late")
+
+    with archive.ArchiveReader(archive_path) as reader:
+        assert len(reader.names()) == 201
+        assert reader.read("03-049.bat") == "echo 3 49"
+        assert b"".join(reader.iter_member("large.bat")) == large_path.read_bytes()
+
+def test_failed_export_stops_taking_members(tmp_path):
+    export = archive.ArchiveExport(tmp_path / "jobs.tar")
+    assert export.add("a.bat", "echo a")
+    assert export.add("a.bat", "echo duplicate")  # Rejected by the writer thread
+    export.close()
+    export.wait(30)
+    assert isinstance(export.error, ValueError)
+    assert not export.add("b.bat", "echo b")
+
+FORMATS = [".tar.gz", ".tar", pytest.param(".tar.zst", marks=pytest.mark.skipif(archive.zstandard is None,
+                                                                                reason="needs zstandard"))]
+
+def write_sample(path, large_path):
+    with archive.ArchiveSink(path) as sink:
+        for i in range(20):
+            sink.add(f"{i:02d}-" + "long-name-" * 20 + ".bat", f"echo {i}")
+        sink.add_file("large.bat", str(large_path))
+        sink.add("last.bat", "echo last")
+
+@pytest.mark.parametrize("suffix", FORMATS)
+def test_archive_copied_without_its_index_is_scanned(tmp_path, suffix):
+    large_path = tmp_path / "large.bat"
+    large_path.write_bytes(os.urandom(2 * archive.ARCHIVE_CHUNK_SIZE + 7))
+    archive_path = tmp_path / f"jobs{suffix}"
+    write_sample(archive_path, large_path)
+    with archive.ArchiveReader(archive_path) as reader:
+        indexed = reader.members
+
+    copy_path = tmp_path / "copy" / f"jobs{suffix}"
+    copy_path.parent.mkdir()
+    shutil.copyfile(archive_path, copy_path)
+    assert archive.load_archive_index(str(copy_path)) is None
+    with archive.ArchiveReader(copy_path) as reader:
+        assert reader.members == indexed
+        assert reader.read("last.bat") == "echo last"
+        assert b"".join(reader.iter_member("large.bat")) == large_path.read_bytes()
+
+    if suffix != ".tar.zst":  # tarfile cannot read zstd itself
+        with tarfile.open(copy_path) as tar:
+            assert len(tar.getnames()) == 22
+
+def test_index_of_another_archive_is_not_trusted(tmp_path):
+    archive_path = tmp_path / "jobs.tar.gz"
+    with archive.ArchiveSink(archive_path) as sink:
+        sink.add("a.bat", "echo a")
+    index_path = archive.get_archive_index_path(str(archive_path))
+    old_index = open(index_path).read()
+    with archive.ArchiveSink(archive_path) as sink:
+        sink.add("b.bat", "echo b" * 100)
+    with open(index_path, "w") as f:
+        f.write(old_index)
+    with archive.ArchiveReader(archive_path) as reader:
+        assert reader.names() == ["b.bat"]
+        assert reader.read("b.bat") == "echo b" * 100
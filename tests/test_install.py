@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+import CookieInstallerDebug as installer
+
+def write_tree(root, files):
+    for name, text in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+def read_tree(root):
+    tree = {}
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dir_path, name)
+            with open(path) as f:
+                tree[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+    return tree
+
+def write_release(zip_path, files):
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+
+def test_swap_carries_over_everything_outside_the_release(tmp_path):
+    install_dir = str(tmp_path / "CookieBatch")
+    # Installed without staging, so which entries came with the old release is unknown
+    write_tree(install_dir, {"cookie.exe": "v1", "legacy.exe": "v1", "Output/result.bat": "mine",
+                             "my_own_notes.txt": "mine"})
+    staging_dir = str(tmp_path / "staging")
+    write_tree(staging_dir, {"cookie.exe": "v2", "readme.txt": "v2"})
+
+    installer.swap_in_staged_install(staging_dir, install_dir)
+    assert read_tree(install_dir) == {"cookie.exe": "v2", "readme.txt": "v2", "legacy.exe": "v1",
+                                      "Output/result.bat": "mine", "my_own_notes.txt": "mine"}
+    assert read_tree(installer.get_previous_install_path(install_dir)) == {"cookie.exe": "v1"}
+    assert installer.read_release_record(install_dir) == ({"cookie.exe", "readme.txt"}, {"cookie.exe", "readme.txt"})
+
+    # Rolling back restores v1 with the user's entries, leaving v2's own entries behind
+    installer.rollback_install(install_dir)
+    assert read_tree(install_dir) == {"cookie.exe": "v1", "legacy.exe": "v1", "Output/result.bat": "mine",
+                                      "my_own_notes.txt": "mine"}
+    assert read_tree(installer.get_previous_install_path(install_dir)) == {"cookie.exe": "v2", "readme.txt": "v2"}
+
+def test_user_files_survive_consecutive_staged_installs(tmp_path):
+    install_dir = str(tmp_path / "CookieBatch")
+    releases = [{"cookie.exe": "v1", "legacy.exe": "v1"}, {"cookie.exe": "v2", "readme.txt": "v2"},
+                {"cookie.exe": "v3"}]
+    for number, files in enumerate(releases, 1):
+        zip_path = str(tmp_path / f"release{number}.zip")
+        write_release(zip_path, files)
+        installer.InstallPipeline(zip_path, str(tmp_path / "staging"), install_dir, staged=True,
+                                  close_apps=False).run()
+        if number == 1:
+            write_tree(install_dir, {"my_own_notes.txt": "mine", "Output/result.bat": "mine"})
+
+    # Entries of the older releases went to the previous version instead of being carried over
+    assert read_tree(install_dir) == {"cookie.exe": "v3", "my_own_notes.txt": "mine", "Output/result.bat": "mine"}
+    assert read_tree(installer.get_previous_install_path(install_dir)) == {"cookie.exe": "v2", "readme.txt": "v2"}
+    assert sorted(os.listdir(tmp_path)) == [".CookieBatch.previous", ".CookieBatch.release.json", "CookieBatch"]
+
+def test_staged_install_falls_back_when_parent_is_not_writeable(tmp_path, monkeypatch):
+    install_dir = str(tmp_path / "CookieBatch")
+    write_tree(install_dir, {"cookie.exe": "v1", "Output/result.bat": "mine"})
+    zip_path = str(tmp_path / "release.zip")
+    write_release(zip_path, {"cookie.exe": "v2", "readme.txt": "v2"})
+    monkeypatch.setattr(installer, "check_dir_writeable", lambda path: False)
+
+    report = installer.InstallReport()
+    installer.InstallPipeline(zip_path, str(tmp_path / "temp" / "extracted"), install_dir, staged=True,
+                              close_apps=False, report=report).run()
+    assert read_tree(install_dir) == {"cookie.exe": "v2", "readme.txt": "v2", "Output/result.bat": "mine"}
+    assert not os.path.exists(installer.get_previous_install_path(install_dir))
+    assert report.get_stage("install")["staged"] is False
+
+def test_staging_on_another_volume_is_not_swapped(tmp_path, monkeypatch):
+    install_dir = str(tmp_path / "CookieBatch")
+    staging_dir = str(tmp_path / "staging")
+    os.makedirs(staging_dir)
+    assert installer.can_swap_in(staging_dir, install_dir)
+
+    real_stat = os.stat
+    def stat(path, *args, **kwargs):
+        result = real_stat(path, *args, **kwargs)
+        if os.path.abspath(path) == staging_dir:
+            return os.stat_result((result.st_mode, result.st_ino, result.st_dev + 1) + tuple(result)[3:])
+        return result
+    monkeypatch.setattr(installer.os, "stat", stat)
+    assert not installer.can_swap_in(staging_dir, install_dir)
+
+def test_cancel_mid_extract_leaves_the_install_untouched(tmp_path):
+    install_dir = str(tmp_path / "CookieBatch")
+    write_tree(install_dir, {"cookie.exe": "v1", "Output/result.bat": "mine"})
+    zip_path = str(tmp_path / "release.zip")
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for i in range(4):
+            archive.writestr(f"data{i}.bin", os.urandom(3 * installer.MAX_READ_SIZE))
+        archive.writestr("cookie.exe", "v2")
+
+    # Cancel as soon as the first block has been extracted
+    cancel_event = threading.Event()
+    def progress(stage, fraction):
+        if stage == "extract" and fraction < 1:
+            cancel_event.set()
+
+    report = installer.InstallReport()
+    pipeline = installer.InstallPipeline(zip_path, str(tmp_path / "staging"), install_dir, cancel_event=cancel_event,
+                                         close_apps=False, progress_callback=progress, report=report)
+    with pytest.raises(installer.InstallCancelled):
+        pipeline.run()
+    assert read_tree(install_dir) == {"cookie.exe": "v1", "Output/result.bat": "mine"}
+    assert sorted(os.listdir(tmp_path)) == ["CookieBatch", "release.zip"]
+    assert report.get_stage("extract")["status"] == "cancelled"
+    assert 0 < report.get_stage("extract")["bytes"] < 12 * installer.MAX_READ_SIZE
+    assert report.get_stage("rollback")["status"] == "ok"
+
+def test_failed_item_install_puts_replaced_items_back(tmp_path, monkeypatch):
+    install_dir = str(tmp_path / "CookieBatch")
+    write_tree(install_dir, {"a.exe": "v1", "b.exe": "v1", "Output/result.bat": "mine"})
+    zip_path = str(tmp_path / "release.zip")
+    write_release(zip_path, {"a.exe": "v2", "b.exe": "v2", "c.exe": "v2"})
+
+    # The last item stays locked through every retry
+    real_move = installer.shutil.move
+    def move(src, dest):
+        if src.endswith("c.exe"):
+            raise PermissionError("c.exe is in use")
+        return real_move(src, dest)
+    monkeypatch.setattr(installer.shutil, "move", move)
+    monkeypatch.setattr(installer.os, "listdir", lambda path, real_listdir=os.listdir: sorted(real_listdir(path)))
+
+    pipeline = installer.InstallPipeline(zip_path, str(tmp_path / "staging"), install_dir, staged=False,
+                                         close_apps=False, cancel_event=threading.Event())
+    pipeline.cancel_event.wait = lambda timeout: False  # Skip the waits between retries
+    with pytest.raises(PermissionError, match="c.exe"):
+        pipeline.run()
+    assert read_tree(install_dir) == {"a.exe": "v1", "b.exe": "v1", "Output/result.bat": "mine"}
+
+def test_stale_files_are_retried_off_the_gui_thread(tmp_path, monkeypatch):
+    stale_path = tmp_path / "CookieBatch.download.zip"
+    stale_path.write_bytes(b"old")
+    real_remove = os.remove
+    attempts = []
+    def remove(path):
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise PermissionError("in use")
+        real_remove(path)
+    monkeypatch.setattr(installer.os, "remove", remove)
+
+    statuses = []
+    installer.remove_stale_path(str(stale_path), statuses.append, threading.Event(), close_apps=False)
+    assert not stale_path.exists() and len(attempts) == 2
+    assert statuses == ["Retrying file operation..."]
+
+    # A cancel ends the wait between retries at once
+    stale_path.write_bytes(b"old")
+    attempts.clear()
+    cancel_event = threading.Event()
+    cancel_event.set()
+    started = time.monotonic()
+    with pytest.raises(installer.DownloadCancelled):
+        installer.remove_stale_path(str(stale_path), None, cancel_event, close_apps=False)
+    assert time.monotonic() - started < 1
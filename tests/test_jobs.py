@@ -0,0 +1,87 @@
+import os
+import queue
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+cookie = pytest.importorskip("cookie")
+import obfuscator
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    # Not created yet: the queue has to make it, wherever the program was started from
+    output_dir = tmp_path / "install" / "Output"
+    monkeypatch.setattr(cookie, "OUTPUT_DIR", str(output_dir))
+    monkeypatch.chdir(tmp_path)
+    return output_dir
+
+def run_job(job):
+    updates = queue.Queue()
+    cookie.ObfuscationJobRunnable(job, updates).run()
+    return [updates.get_nowait() for _ in range(updates.qsize())]
+
+def test_reserve_output_path_numbers_taken_names(output_dir):
+    paths = [cookie.reserve_output_path("a.bat") for _ in range(3)]
+    assert paths == [str(output_dir / "a.bat"), str(output_dir / "a (2).bat"), str(output_dir / "a (3).bat")]
+    assert all(os.path.isfile(path) for path in paths)
+
+def test_command_job_reports_running_then_done(output_dir):
+    job = cookie.ObfuscationJob("echo", 3, "Normal", code="echo hello")
+    running, done = run_job(job)
+    assert running[2] == cookie.JOB_RUNNING
+    _, run_id, status, output, output_path, output_size, error, elapsed = done
+    assert (run_id, status, output_path, error) == (0, cookie.JOB_DONE, None, None)
+    assert obfuscator.verify_obfuscated_output(output, "echo hello")
+    assert output_size == len(output.encode("utf-8")) and elapsed >= 0
+
+def test_large_file_job_streams_into_the_output_folder(output_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(cookie, "MAPPED_INPUT_THRESHOLD", 0)
+    source_path = tmp_path / "big.bat"
+    source_path.write_bytes(b"echo one\r\necho two\r\n")
+    job = cookie.ObfuscationJob("big.bat", 2, "High", file_path=str(source_path))
+    for expected_name in ("big.bat.obfuscated.bat", "big.bat.obfuscated (2).bat"):
+        status, output, output_path, output_size = run_job(job)[-1][2:6]
+        assert status == cookie.JOB_DONE
+        assert output_path == str(output_dir / expected_name)
+        assert output_size == os.path.getsize(output_path)
+        assert obfuscator.verify_obfuscated_file(output_path, str(source_path))
+    assert not os.path.exists(tmp_path / "Output")
+
+def test_failed_and_cancelled_jobs_leave_no_output(output_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(cookie, "MAPPED_INPUT_THRESHOLD", 0)
+    source_path = tmp_path / "bad.bat"
+    source_path.write_bytes(b"echo one\nif x==y echo two\n")
+    status, output, output_path, output_size, error = run_job(cookie.ObfuscationJob("bad.bat", 2, "Low",
+                                                                                    file_path=str(source_path)))[-1][2:7]
+    assert (status, output, output_path) == (cookie.JOB_FAILED, None, None)
+    assert "IF, FOR" in error
+
+    job = cookie.ObfuscationJob("echo", 3, "Normal", code="echo hello")
+    job.cancel_event.set()
+    assert [update[2] for update in run_job(job)] == [cookie.JOB_CANCELLED]
+    assert os.listdir(output_dir) == []
+
+def test_queue_applies_updates_and_ignores_retried_runs(output_dir):
+    window = cookie.ObfuscatorGUI()
+    try:
+        jobs = [cookie.ObfuscationJob(f"job {i}", 2, priority, code=f"echo {i}")
+                for i, priority in enumerate(["Low", "Normal", "High", "Normal"])]
+        jobs.append(cookie.ObfuscationJob("bad", 2, "Normal", code="for %%i in (a) do echo %%i"))
+        for job in jobs:
+            window.add_job(job)
+        window.thread_pool.waitForDone()
+        window.process_job_updates()
+        assert [job.status for job in jobs] == [cookie.JOB_DONE] * 4 + [cookie.JOB_FAILED]
+        assert all(obfuscator.verify_obfuscated_output(job.output, job.code) for job in jobs[:4])
+
+        # An update still queued from the previous run must not overwrite the retried job
+        stale_update = (jobs[0], jobs[0].run_id, cookie.JOB_FAILED, None, None, None, "stale", 0.0)
+        window.job_table.selectRow(0)
+        window.retry_selected_jobs()
+        window.job_updates.put(stale_update)
+        window.thread_pool.waitForDone()
+        window.process_job_updates()
+        assert (jobs[0].run_id, jobs[0].status, jobs[0].error) == (1, cookie.JOB_DONE, None)
+    finally:
+        window.thread_pool.waitForDone()
+        window.close()
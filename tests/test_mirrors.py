@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import CookieInstallerDebug as installer
+
+FILE_SIZE = 4 * 1024 * 1024
+DATA = os.urandom(FILE_SIZE)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(installer.time, "sleep", lambda seconds: None)
+
+@pytest.fixture
+def servers(make_stand_in):
+    """Three mirrors with the same archive."""
+    servers = [make_stand_in() for _ in range(3)]
+    for server in servers:
+        server.files["CookieBatch.zip"] = DATA
+    return servers
+
+def urls(servers):
+    return [server.url("CookieBatch.zip") for server in servers]
+
+def test_rank_mirrors_puts_the_fastest_first(servers):
+    slow, fast, broken = servers
+    slow.block_delay = 0.2
+    broken.status = 503
+    assert installer.rank_mirrors(urls(servers)) == [fast.url("CookieBatch.zip"), slow.url("CookieBatch.zip")]
+
+def test_rank_mirrors_drops_a_different_file(servers):
+    # Sizes are compared with the fastest mirror, so the odd one out must be slower
+    servers[2].files["CookieBatch.zip"] = DATA[:-1]
+    servers[2].block_delay = 0.2
+    assert sorted(installer.rank_mirrors(urls(servers))) == sorted(urls(servers[:2]))
+
+def test_rank_mirrors_fails_when_nothing_answers(servers):
+    for server in servers:
+        server.status = 500
+    with pytest.raises(installer.requests.exceptions.ConnectionError):
+        installer.rank_mirrors(urls(servers))
+
+def test_failover_continues_from_the_same_byte(servers, tmp_path):
+    first, second, _ = servers
+    # The first mirror keeps hanging up after 1 MB; retries make progress, so cap them
+    first.drops = 100
+    first.drop_after = 1024 * 1024
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1, retries=1, mirrors=[second.url("CookieBatch.zip")])
+    engine.download(first.url("CookieBatch.zip"), save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.failovers == 1
+    # The second mirror was asked for the rest, not the whole file
+    [second_range] = second.ranges_requested("CookieBatch.zip")
+    assert first.bytes_sent == 1024 * 1024
+    assert second_range == f"bytes={first.bytes_sent}-{FILE_SIZE - 1}"
+
+def test_failover_to_a_file_share(servers, tmp_path):
+    first = servers[0]
+    first.drops = 100
+    first.drop_after = 1024 * 1024
+    share_path = tmp_path / "share" / "CookieBatch.zip"
+    share_path.parent.mkdir()
+    share_path.write_bytes(DATA)
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1, retries=1, mirrors=[installer.get_mirror_url(str(share_path))])
+    engine.download(first.url("CookieBatch.zip"), save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.failovers == 1
+    assert engine.current_source().startswith("file://")
+    assert engine.sha256 == installer.hashlib.sha256(DATA).hexdigest()
+
+def test_failover_when_a_mirror_stops_answering(servers, tmp_path):
+    first, second, _ = servers
+    first.status = 503
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1, mirrors=[second.url("CookieBatch.zip")])
+    engine.download(first.url("CookieBatch.zip"), save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.failovers == 1
+
+def test_stalled_read_times_out_and_resumes(servers, tmp_path, monkeypatch):
+    server = servers[0]
+    monkeypatch.setattr(installer, "READ_TIMEOUT", 0.5)
+    # Send 1 MB, then stall longer than the read timeout once
+    server.stalls = 1
+    server.stall_time = 2.0
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1)
+    engine.download(server.url("CookieBatch.zip"), save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.retry_count >= 1
+    assert engine.failovers == 0
+
+def test_connect_timeout_moves_to_the_next_mirror(servers, tmp_path, monkeypatch):
+    monkeypatch.setattr(installer, "CONNECT_TIMEOUT", 0.5)
+    # A non-routable address never completes the TCP handshake
+    unreachable = "http://10.255.255.1/CookieBatch.zip"
+    save_path = str(tmp_path / "release.zip")
+    engine = installer.DownloadEngine(segments=1, retries=1, mirrors=[servers[0].url("CookieBatch.zip")])
+    engine.download(unreachable, save_path)
+    assert open(save_path, "rb").read() == DATA
+    assert engine.failovers == 1
@@ -0,0 +1,163 @@
+import random
+
+import pytest
+
+import obfuscator
+
+# Characters cmd.exe treats specially, a few ordinary ones and some non-ASCII text
+ALPHABET = 'abc XYZ019%"^&|<>!()=;,:@\té€'
+SEED = 20261019
+CASES = 1500
+
+def random_code(rng, max_lines=3, max_length=60):
+    """Return random batch code with at least one line that gets obfuscated."""
+    while True:
+        lines = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, max_length)))
+                 for _ in range(rng.randint(1, max_lines))]
+        try:
+            if any([obfuscator.is_obfuscated_line(line) for line in lines]):
+                return "\n".join(lines)
+        except ValueError:
+            pass  # IF, FOR and ( ) blocks are rejected; see test_unsupported_lines_are_rejected
+
+@pytest.mark.parametrize("max_line_length", [None, 40, obfuscator.MAX_PACKED_LINE_LENGTH])
+def test_round_trip(max_line_length):
+    rng = random.Random(SEED)
+    for _ in range(CASES):
+        code = random_code(rng)
+        divide_method = rng.randint(1, 70)
+        script = obfuscator.build_obfuscated_script(code, divide_method, max_line_length=max_line_length)
+        assert obfuscator.verify_obfuscated_output(script, code), (code, divide_method)
+
+def test_tampered_value_fails_verification():
+    rng = random.Random(SEED + 1)
+    for _ in range(CASES):
+        code = random_code(rng)
+        lines = obfuscator.build_obfuscated_script(code, rng.randint(1, 10)).split("\n")
+        index = rng.choice([i for i, line in enumerate(lines) if line.startswith("SET ")])
+        match = obfuscator.SET_LINE_PATTERN.fullmatch(lines[index])
+        position = rng.randrange(match.start(2), match.end(2))
+        replacement = "Q" if lines[index][position] != "Q" else "R"
+        lines[index] = lines[index][:position] + replacement + lines[index][position + 1:]
+        assert not obfuscator.verify_obfuscated_output("\n".join(lines), code), (code, lines[index])
+
+def test_missing_set_line_fails_verification():
+    rng = random.Random(SEED + 2)
+    for _ in range(200):
+        code = random_code(rng)
+        lines = obfuscator.build_obfuscated_script(code, rng.randint(1, 10)).split("\n")
+        del lines[rng.choice([i for i, line in enumerate(lines) if line.startswith("SET ")])]
+        assert not obfuscator.verify_obfuscated_output("\n".join(lines), code)
+
+def test_mapped_file_round_trip(tmp_path, monkeypatch):
+    rng = random.Random(SEED + 3)
+    source_path = tmp_path / "input.bat"
+    output_path = tmp_path / "output.bat"
+    for _ in range(300):
+        code = random_code(rng, max_lines=5)
+        source_path.write_bytes(rng.choice(["\n", "\r\n"]).join(code.split("\n")).encode("utf-8"))
+        # Small windows split multi-byte characters and chunks across reads
+        monkeypatch.setattr(obfuscator, "DECODE_WINDOW_SIZE", rng.choice([1, 2, 7, 1024]))
+        obfuscator.obfuscate_mapped_file(str(source_path), str(output_path), rng.randint(1, 10),
+                                         max_line_length=rng.choice([None, 40]))
+        assert obfuscator.verify_obfuscated_output(output_path.read_text(encoding="utf-8"), code), code
+        assert obfuscator.verify_obfuscated_file(str(output_path), str(source_path)), code
+
+def test_file_verification_needs_every_source_line(tmp_path):
+    source_path = tmp_path / "input.bat"
+    output_path = tmp_path / "output.bat"
+    source_path.write_bytes(b"echo one\r\n\r\necho two\n")
+    obfuscator.obfuscate_mapped_file(str(source_path), str(output_path), 3)
+    source_path.write_bytes(b"echo one\necho two\necho three\n")
+    assert not obfuscator.verify_obfuscated_file(str(output_path), str(source_path))
+    source_path.write_bytes(b"echo one\n")
+    assert not obfuscator.verify_obfuscated_file(str(output_path), str(source_path))
+
+def test_unverified_scripts_are_never_returned(tmp_path, monkeypatch):
+    # Without escaping, the % is expanded by cmd.exe and the script runs something else
+    monkeypatch.setattr(obfuscator, "escape_chunk", lambda chunk: chunk)
+    code = "echo 100% done"
+    source_path = tmp_path / "input.bat"
+    source_path.write_text(code, encoding="utf-8")
+    output_path = tmp_path / "output.bat"
+    with pytest.raises(ValueError, match="does not run the original"):
+        obfuscator.build_verified_script(code, 3)
+    with pytest.raises(ValueError, match="does not run the original"):
+        obfuscator.obfuscate_file(str(source_path), 3)
+    with pytest.raises(ValueError, match="Command 1: the obfuscated script does not run"):
+        obfuscator.obfuscate_many(["echo fine", code], 3)
+    with pytest.raises(ValueError, match="does not run the original file"):
+        obfuscator.obfuscate_mapped_file(str(source_path), str(output_path), 3)
+    assert list(tmp_path.iterdir()) == [source_path]
+
+def test_labels_and_comments_are_kept():
+    code = "@echo off\n:start\n:: comment\nREM note\necho one & echo two\n  goto start"
+    script = obfuscator.build_obfuscated_script(code, 3)
+    lines = script.split("\n")
+    assert lines[2:6] == ["@echo off", ":start", ":: comment", "REM note"]
+    assert lines[-1] == "  goto start"
+    assert obfuscator.verify_obfuscated_output(script, code)
+
+@pytest.mark.parametrize("line", ["if exist x echo y", "FOR %%i in (a) do echo %%i", "@if x==y (", ")", ") else ("])
+def test_unsupported_lines_are_rejected(line):
+    with pytest.raises(ValueError):
+        obfuscator.build_obfuscated_script("echo a\n" + line, 3)
+
+def test_mapped_file_leaves_nothing_on_failure(tmp_path):
+    source_path = tmp_path / "input.bat"
+    output_path = tmp_path / "output.bat"
+    source_path.write_bytes(b"echo one\necho a\rb\n")
+    with pytest.raises(ValueError):
+        obfuscator.obfuscate_mapped_file(str(source_path), str(output_path), 3)
+    assert list(tmp_path.iterdir()) == [source_path]
+
+def test_mapped_file_cancels_inside_a_long_line(tmp_path, monkeypatch):
+    source_path = tmp_path / "input.bat"
+    output_path = tmp_path / "output.bat"
+    source_path.write_bytes(b"echo " + b"x" * 100000)
+    monkeypatch.setattr(obfuscator, "DECODE_WINDOW_SIZE", 1000)
+
+    # The line loop checks once, then every window; cancel at the second window
+    class CancelAtSecondWindow:
+        checks = 0
+        def is_set(self):
+            self.checks += 1
+            return self.checks > 2
+
+    cancel_event = CancelAtSecondWindow()
+    assert obfuscator.obfuscate_mapped_file(str(source_path), str(output_path), 3, cancel_event=cancel_event) is False
+    assert cancel_event.checks == 3
+    assert list(tmp_path.iterdir()) == [source_path]
+
+def test_obfuscate_many_matches_single_scripts():
+    rng = random.Random(SEED + 4)
+    commands = [random_code(rng, max_lines=1) for _ in range(CASES)]
+    for max_line_length in (None, 40):
+        batch = obfuscator.obfuscate_many(commands, 5, max_line_length=max_line_length)
+        assert len(batch) == len(commands)
+        for script, command in zip(batch, commands):
+            assert obfuscator.verify_obfuscated_output(script, command), command
+
+def test_obfuscate_many_names_the_bad_command():
+    with pytest.raises(ValueError, match="Command 2"):
+        obfuscator.obfuscate_many(["echo a", "echo b", "if x==y echo c"], 3)
+
+def test_packing_stats_count_the_lines_saved(tmp_path):
+    code = "echo " + "x" * 95 + "\necho 100%% done"
+    packing_stats = obfuscator.PackingStats()
+    script = obfuscator.build_obfuscated_script(code, 10, max_line_length=200, packing_stats=packing_stats)
+    set_lines = [line for line in script.split("\n") if line.startswith("SET ")]
+    assert packing_stats.statements == 10 + 2 and packing_stats.lines == len(set_lines) < 12
+    assert packing_stats.lines_saved == 12 - len(set_lines) and packing_stats.seconds > 0
+    assert f"({packing_stats.lines_saved} saved)" in str(packing_stats)
+
+    # One PackingStats adds up every packer, across commands and mapped-file lines
+    packing_stats = obfuscator.PackingStats()
+    obfuscator.obfuscate_many(code.split("\n"), 10, max_line_length=200, packing_stats=packing_stats)
+    assert packing_stats.statements == 12
+    source_path = tmp_path / "input.bat"
+    source_path.write_text(code, encoding="utf-8")
+    obfuscator.obfuscate_mapped_file(str(source_path), str(tmp_path / "output.bat"), 10, max_line_length=200,
+                                     packing_stats=packing_stats)
+    assert packing_stats.statements == 24
+    assert obfuscator.verify_obfuscated_output(script, code)
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import obfuscator
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield executor
+    executor.shutdown(wait=True)
+
+class ConcurrencyProbe:
+    """Wraps a function to record how many calls run at the same time."""
+    def __init__(self, function, delay=0.02):
+        self.function = function
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.started = []
+        self.cancel_events = []
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.started.append(args[0])
+        self.cancel_events.append(args[2])
+        try:
+            time.sleep(self.delay)
+            return self.function(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+def test_obfuscate_async_round_trip(executor):
+    code = "@echo off\necho one & echo two"
+    script = asyncio.run(obfuscator.obfuscate_async(code, 3, executor=executor))
+    assert obfuscator.verify_obfuscated_output(script, code)
+
+def test_semaphore_bounds_concurrent_jobs(executor, monkeypatch):
+    probe = ConcurrencyProbe(obfuscator.build_obfuscated_script)
+    monkeypatch.setattr(obfuscator, "build_obfuscated_script", probe)
+
+    async def main():
+        semaphore = asyncio.Semaphore(3)
+        return await asyncio.gather(*[obfuscator.obfuscate_async(f"echo {i}", 2, executor=executor, semaphore=semaphore)
+                                      for i in range(20)])
+    scripts = asyncio.run(main())
+    assert probe.peak == 3
+    assert all(obfuscator.verify_obfuscated_output(script, f"echo {i}") for i, script in enumerate(scripts))
+
+def test_cancelling_the_awaiting_task_stops_the_job(executor, monkeypatch):
+    probe = ConcurrencyProbe(obfuscator.build_obfuscated_script, delay=0)
+    monkeypatch.setattr(obfuscator, "build_obfuscated_script", probe)
+    code = "echo " + "x" * 2_000_000
+
+    async def main():
+        task = asyncio.ensure_future(obfuscator.obfuscate_async(code, 1, executor=executor))
+        while not probe.started:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())
+    assert probe.cancel_events[0].is_set()
+    started = time.monotonic()
+    executor.shutdown(wait=True)
+    # The job saw the cancel at its next check instead of building two million SET lines
+    assert time.monotonic() - started < 5
+
+@pytest.fixture
+def batch_files(tmp_path):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"{i:02d}.bat"
+        # Larger files first, so later files finish before earlier ones
+        path.write_text(f"echo {i} " + "y" * (300 * (12 - i)), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+def test_files_async_yields_in_input_order_with_backpressure(batch_files, executor, monkeypatch):
+    probe = ConcurrencyProbe(obfuscator.obfuscate_file, delay=0)
+    monkeypatch.setattr(obfuscator, "obfuscate_file", probe)
+
+    async def main():
+        results = []
+        async for file_path, script in obfuscator.obfuscate_files_async(batch_files, 2, max_in_flight=3,
+                                                                          executor=executor):
+            # A slow consumer: no more than max_in_flight files are taken on ahead of it
+            await asyncio.sleep(0.01)
+            assert len(probe.started) <= len(results) + 3
+            results.append((file_path, script))
+        return results
+    results = asyncio.run(main())
+    assert [file_path for file_path, _ in results] == batch_files
+    for file_path, script in results:
+        with open(file_path, encoding="utf-8") as f:
+            assert obfuscator.verify_obfuscated_output(script, f.read())
+
+def test_files_async_cancels_the_rest_when_the_consumer_stops(batch_files, monkeypatch):
+    probe = ConcurrencyProbe(obfuscator.obfuscate_file, delay=0.2)
+    monkeypatch.setattr(obfuscator, "obfuscate_file", probe)
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    async def main():
+        async with contextlib.aclosing(obfuscator.obfuscate_files_async(batch_files, 2, max_in_flight=4,
+                                                                         executor=executor)) as scripts:
+            async for file_path, _ in scripts:
+                if file_path == batch_files[1]:
+                    break
+    asyncio.run(main())
+    executor.shutdown(wait=True)
+    # Only the files in flight were taken on; those still running when the consumer stopped were cancelled
+    assert set(batch_files[:2]) <= set(probe.started) <= set(batch_files[:4])
+    assert [event.is_set() for event in probe.cancel_events].count(True) == len(probe.started) - 2
@@ -0,0 +1,39 @@
+import pytest
+
+import CookieInstallerDebug as installer
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves forward by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(installer.time, "monotonic", lambda: now[0])
+    return now
+
+def test_stages_are_weighted_by_size(clock):
+    progress = installer.StageProgress({"download": 1.0, "extract": 2.0, "install": 1.0})
+    assert progress.update("download", 0.5) == (0.125, None)  # No time has passed yet
+    assert progress.update("download", 1.0)[0] == 0.25
+    assert progress.update("extract", 0.5)[0] == 0.5
+    # A stage never goes backwards, and never past its end
+    assert progress.update("extract", 0.25)[0] == 0.5
+    assert progress.update("install", 3.0)[0] == 0.75
+
+def test_eta_follows_the_average_rate(clock):
+    progress = installer.StageProgress({"download": 1.0, "extract": 3.0})
+    clock[0] += 10
+    overall, eta = progress.update("download", 1.0)
+    assert overall == 0.25 and eta == pytest.approx(30.0)
+    clock[0] += 10
+    overall, eta = progress.update("extract", 1 / 3)
+    assert overall == 0.5 and eta == pytest.approx(20.0)
+    assert progress.update("extract", 1.0) == (1.0, 0.0)
+
+def test_resizing_a_stage_keeps_the_progress_shown(clock):
+    progress = installer.StageProgress({"download": 1.0, "extract": 1.0})
+    assert progress.update("download", 0.5)[0] == 0.25
+    # The archive turns out to expand to three times its size
+    progress.set_stage_size("extract", 3.0)
+    assert progress.fraction() == 0.25
+    # The rest of the bar is spread over what is left: 0.5 of download and 3.0 of extract
+    assert progress.update("download", 1.0)[0] == pytest.approx(0.25 + 0.75 * 0.5 / 3.5)
+    assert progress.update("extract", 1.0)[0] == 1.0
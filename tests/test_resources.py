@@ -0,0 +1,42 @@
+import os
+import pathlib
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+cookie = pytest.importorskip("cookie")
+
+DEBUG_DIR = pathlib.Path(cookie.__file__).resolve().parent
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(cookie, "resource_cache", {})
+    monkeypatch.setattr(cookie, "resource_bundle_loaded", False)
+
+def test_loose_files_next_to_the_script(fresh_cache, monkeypatch):
+    monkeypatch.delattr(sys, "_MEIPASS", raising=False)
+    assert cookie.get_resource_dir() == DEBUG_DIR
+    monkeypatch.setattr(cookie, "RESOURCE_DIR", cookie.get_resource_dir())
+    assert cookie.resolve_resource("Icons/error.png") == str(DEBUG_DIR / "Icons" / "error.png")
+    assert cookie.resolve_resource("Icons/missing.png") is None
+
+def test_frozen_assets_come_from_the_unpacked_bundle(fresh_cache, monkeypatch, tmp_path):
+    (tmp_path / "Icons").mkdir()
+    (tmp_path / "Icons" / "error.png").write_bytes((DEBUG_DIR / "Icons" / "error.png").read_bytes())
+    monkeypatch.setattr(sys, "_MEIPASS", str(tmp_path), raising=False)
+    assert cookie.get_resource_dir() == tmp_path
+    monkeypatch.setattr(cookie, "RESOURCE_DIR", cookie.get_resource_dir())
+    assert cookie.resolve_resource("Icons/error.png") == str(tmp_path / "Icons" / "error.png")
+    # Only the bundle is searched, never the folder of the script
+    assert cookie.resolve_resource("Icons/favicon.ico") is None
+
+def test_compiled_bundle_is_preferred_and_cached(fresh_cache, monkeypatch):
+    monkeypatch.setattr(cookie, "resource_bundle_loaded", True)
+    probes = []
+    monkeypatch.setattr(cookie.QFile, "exists", lambda path: probes.append(path) or path.endswith("error.png"))
+    for _ in range(3):
+        assert cookie.resolve_resource("Icons/error.png") == ":/cookiebatch/Icons/error.png"
+    assert probes == [":/cookiebatch/Icons/error.png"]
+    # Assets the bundle lacks fall back to the loose file
+    assert cookie.resolve_resource("Icons/favicon.ico") == str(cookie.RESOURCE_DIR / "Icons" / "favicon.ico")
@@ -0,0 +1,125 @@
+import io
+import os
+import tempfile
+import zipfile
+
+import CookieInstallerDebug as installer
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def silent_install(*argv):
+    return installer.silent_install(installer.parse_silent_args([installer.SILENT_FLAG, "--no-shortcut", "--no-close-apps", *argv]))
+
+def leftover_run_dirs():
+    return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith("cookiebatch_")}
+
+def test_install_from_local_archive_reports_previous_install_dir(tmp_path):
+    zip_path = tmp_path / "release.zip"
+    zip_path.write_bytes(make_archive({"cookie.bat": b"v1"}))
+    targets = [str(tmp_path / "a" / "CookieBatch"), str(tmp_path / "b" / "CookieBatch")]
+    args = [arg for target in targets for arg in ("--install-dir", target)]
+
+    result, code = silent_install("--source", str(zip_path), *args)
+    assert code == installer.EXIT_SUCCESS, result
+    assert [target["previous_install_dir"] for target in result["targets"]] == [None, None]
+
+    zip_path.write_bytes(make_archive({"cookie.bat": b"v2"}))
+    result, code = silent_install("--source", str(zip_path), *args)
+    assert code == installer.EXIT_SUCCESS, result
+    for target, install_dir in zip(result["targets"], targets):
+        assert target["previous_install_dir"] == installer.get_previous_install_path(install_dir)
+        assert open(os.path.join(install_dir, "cookie.bat")).read() == "v2"
+    assert zip_path.exists()
+
+def test_download_goes_to_a_per_run_file(stand_in, tmp_path):
+    stand_in.files["CookieBatch.zip"] = make_archive({"cookie.bat": b"v1"})
+    stand_in.files["CookieBatch.zip.sha256"] = installer.hashlib.sha256(stand_in.files["CookieBatch.zip"]).hexdigest().encode()
+    before = leftover_run_dirs()
+    shared_zip = installer.ZIP_PATH
+    shared_existed = os.path.exists(shared_zip)
+
+    result, code = silent_install("--source", stand_in.url("CookieBatch.zip"), "--no-cache",
+                                  "--install-dir", str(tmp_path / "CookieBatch"))
+    assert code == installer.EXIT_SUCCESS, result
+    assert open(tmp_path / "CookieBatch" / "cookie.bat").read() == "v1"
+    assert os.path.exists(shared_zip) == shared_existed
+    assert leftover_run_dirs() == before
+
+def test_failed_download_cleans_up(stand_in, tmp_path, monkeypatch):
+    monkeypatch.setattr(installer.time, "sleep", lambda seconds: None)
+    stand_in.status = 500
+    before = leftover_run_dirs()
+    result, code = silent_install("--source", stand_in.url("CookieBatch.zip"), "--no-cache",
+                                  "--install-dir", str(tmp_path / "CookieBatch"))
+    assert code == installer.EXIT_DOWNLOAD_FAILED
+    assert leftover_run_dirs() == before
+
+def test_unverified_download_needs_the_flag(stand_in, tmp_path):
+    stand_in.files["CookieBatch.zip"] = make_archive({"cookie.bat": b"v1"})
+    args = ["--source", stand_in.url("CookieBatch.zip"), "--no-cache", "--install-dir", str(tmp_path / "CookieBatch")]
+    result, code = silent_install(*args)
+    assert code == installer.EXIT_DOWNLOAD_FAILED
+    assert "No SHA-256 is published" in result["error"]
+    assert not (tmp_path / "CookieBatch").exists()
+
+    result, code = silent_install("--allow-unverified", *args)
+    assert code == installer.EXIT_SUCCESS, result
+    assert len(result["warnings"]) == 1
+
+def read_reports(report_path):
+    with open(report_path, encoding="utf-8") as f:
+        return [installer.json.loads(line) for line in f]
+
+def stage_statuses(stages):
+    return {stage["stage"]: stage["status"] for stage in stages}
+
+def test_report_times_each_stage(monkeypatch):
+    clock = iter([10.0, 12.5, 20.0, 20.25])
+    monkeypatch.setattr(installer.time, "monotonic", lambda: next(clock))
+    report = installer.InstallReport()
+    with report.stage("extract"):
+        report.record("extract", 5000, files=2)
+    try:
+        with report.stage("install"):
+            report.record("install", retries=1)
+            raise PermissionError("cookie.exe is in use")
+    except PermissionError:
+        pass
+
+    extract, install = report.to_dict()["stages"]
+    assert extract == {"stage": "extract", "status": "ok", "seconds": 2.5, "bytes": 5000, "retries": 0, "files": 2,
+                       "bytes_per_second": 2000}
+    assert install == {"stage": "install", "status": "failed", "seconds": 0.25, "bytes": 0, "retries": 1,
+                       "bytes_per_second": None}
+
+def test_successful_and_failed_installs_append_a_report_line(tmp_path):
+    zip_path = tmp_path / "release.zip"
+    zip_path.write_bytes(make_archive({"cookie.bat": b"v1" * 5000}))
+    report_path = tmp_path / "reports" / "install-reports.jsonl"
+    common = [installer.SILENT_FLAG, "--no-shortcut", "--no-close-apps", "--report-file", str(report_path),
+              "--source", str(zip_path)]
+
+    assert installer.run_silent_install([*common, "--install-dir", str(tmp_path / "CookieBatch")]) == installer.EXIT_SUCCESS
+    # A damaged member fails its CRC check part way through the extract
+    data = zip_path.read_bytes()
+    zip_path.write_bytes(data.replace(b"v1v1", b"v2v1", 1))
+    assert installer.run_silent_install([*common, "--install-dir", str(tmp_path / "Other")]) != installer.EXIT_SUCCESS
+
+    success, failure = read_reports(report_path)
+    assert (success["status"], success["mode"], success["error"]) == ("success", "silent", None)
+    assert stage_statuses(success["stages"]) == {"verify": "ok", "cleanup": "ok"}
+    target_stages = success["targets"][0]["stages"]
+    assert stage_statuses(target_stages) == {"extract": "ok", "install": "ok", "cleanup": "ok"}
+    assert target_stages[0]["bytes"] == 10000 and target_stages[0]["files"] == 1
+    assert all(stage["seconds"] >= 0 for stage in success["stages"] + target_stages)
+
+    assert (failure["status"], failure["mode"]) == ("failed", "silent")
+    target = failure["targets"][0]
+    assert target["status"] == "failed" and target["error"]
+    assert stage_statuses(target["stages"])["extract"] == "failed"
+    assert not (tmp_path / "Other").exists()